@@ -321,6 +321,27 @@ export const useIssueDeanDecision = () => {
   });
 };
 
+export const useIssueDeanDecisionsBulk = () => {
+  const queryClient = useQueryClient();
+  const { toast } = useToast();
+
+  return useMutation({
+    mutationFn: (data: { students: (number | string)[]; decision_type: string; notes?: string }) =>
+      apiService.issueDeanDecisionsBulk(data),
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: ['deanAcademicDecisions'] });
+      queryClient.invalidateQueries({ queryKey: ['deanStudentsAttention'] });
+    },
+    onError: () => {
+      toast({
+        title: "Error",
+        description: "Failed to issue decisions",
+        variant: "destructive",
+      });
+    },
+  });
+};
+
 export const useDeanPlanApproval = () => {
   return useQuery({
     queryKey: ['deanPlanApproval'],
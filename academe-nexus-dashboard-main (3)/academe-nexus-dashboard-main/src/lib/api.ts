@@ -26,6 +26,7 @@ export const API_ENDPOINTS = {
   DEAN_ACADEMIC_DECISIONS: '/api/dean/academic-decisions/',
   DEAN_STUDENTS_ATTENTION: '/api/dean/academic-decisions/students/',
   DEAN_ISSUE_DECISION: '/api/dean/academic-decisions/issue/',
+  DEAN_ISSUE_DECISIONS_BULK: '/api/dean/academic-decisions/issue-bulk/',
   DEAN_PLAN_APPROVAL: '/api/dean/plan-approval/',
   DEAN_APPROVE_PLAN: (id: number) => `/api/dean/plan-approval/${id}/approve/`,
   DEAN_RETURN_PLAN: (id: number) => `/api/dean/plan-approval/${id}/return/`,
@@ -243,7 +244,20 @@ class ApiService {
   }
 
   async getDeanStudentsAttention() {
-    return await this.request(API_ENDPOINTS.DEAN_STUDENTS_ATTENTION);
+    // The list is paginated; follow `next` so no student is left out
+    const students: any[] = [];
+    let endpoint: string | null = API_ENDPOINTS.DEAN_STUDENTS_ATTENTION;
+    while (endpoint) {
+      const response = await this.request<any>(endpoint);
+      if (Array.isArray(response)) return [...students, ...response];
+      if (!response || !Array.isArray(response.results)) break;
+      students.push(...response.results);
+      if (!response.next) break;
+      // `next` is an absolute URL; request() adds the base URL itself
+      const next = new URL(response.next);
+      endpoint = next.pathname + next.search;
+    }
+    return students;
   }
 
   async issueDeanDecision(data: any) {
@@ -253,6 +267,13 @@ class ApiService {
     });
   }
 
+  async issueDeanDecisionsBulk(data: { students: (number | string)[]; decision_type: string; notes?: string }) {
+    return await this.request(API_ENDPOINTS.DEAN_ISSUE_DECISIONS_BULK, {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  }
+
   async getDeanPlanApproval() {
     return await this.request(API_ENDPOINTS.DEAN_PLAN_APPROVAL);
   }
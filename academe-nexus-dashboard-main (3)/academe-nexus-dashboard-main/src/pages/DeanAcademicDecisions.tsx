@@ -11,7 +11,7 @@ import { Dialog, DialogContent, DialogDescription, DialogHeader, DialogTitle, Di
 import { Badge } from "@/components/ui/badge";
 import { AlertTriangle, Filter, FileWarning } from "lucide-react";
 import { useToast } from "@/hooks/use-toast";
-import { useDeanStudentsAttention, useIssueDeanDecision } from "@/hooks/use-api";
+import { useDeanStudentsAttention, useIssueDeanDecisionsBulk } from "@/hooks/use-api";
 
 interface Student {
   id: string;
@@ -26,7 +26,7 @@ interface Student {
 export default function DeanAcademicDecisions() {
   const { toast } = useToast();
   const { data: students, isLoading, error } = useDeanStudentsAttention();
-  const issueDecision = useIssueDeanDecision();
+  const issueDecisions = useIssueDeanDecisionsBulk();
 
   const [filters, setFilters] = useState({
     gpaThreshold: "2.0",
@@ -81,9 +81,7 @@ export default function DeanAcademicDecisions() {
       toast({ title: "Error", description: "Please enter your password to confirm", variant: "destructive" });
       return;
     }
-    selectedStudents.forEach(student => {
-      issueDecision.mutate({ student: student.id, decision_type: decisionType, notes: "" });
-    });
+    issueDecisions.mutate({ students: selectedStudents.map(student => student.id), decision_type: decisionType, notes: "" });
     toast({
       title: "Decision Issued Successfully",
       description: `${decisionType} issued for ${selectedStudents.length} students. Email notifications sent.`,
@@ -0,0 +1,213 @@
+"""Buffered writer for RecentActivity.
+
+Entries are queued in process once their transaction commits and written
+with one bulk_create per tenant schema. By default (ACTIVITY_LOG_MODE =
+'thread') a background thread, started with the first entry, flushes every
+ACTIVITY_LOG_FLUSH_INTERVAL seconds, so entries reach the table within that
+time however quiet the process is. 'after_response' flushes once a response
+has been sent and the buffer is due; nothing is written while no requests
+finish (the queue is still flushed at exit). 'sync' writes each entry as
+soon as it commits.
+"""
+import atexit
+import contextvars
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection, transaction, close_old_connections
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from django_tenants.utils import schema_context
+
+from .models import RecentActivity, User, Schedule, Meeting, StudyPlan, AcademicDecision
+
+logger = logging.getLogger(__name__)
+
+MODE = getattr(settings, 'ACTIVITY_LOG_MODE', 'thread')
+BATCH_SIZE = getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', 200)
+FLUSH_INTERVAL = getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', 2.0)
+MAX_BUFFER = getattr(settings, 'ACTIVITY_LOG_MAX_BUFFER', 10000)
+
+# The request being handled, so model signals can attribute entries to its user.
+current_request = contextvars.ContextVar('activity_request', default=None)
+
+
+class ActivityBuffer:
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_size=MAX_BUFFER):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self.entries = []
+        self.dropped = 0
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+
+    def add(self, schema_name, description, user_id, timestamp):
+        with self.lock:
+            if len(self.entries) >= self.max_size:
+                # The database is not keeping up; shed load instead of growing without bound.
+                self.dropped += 1
+                return
+            self.entries.append((schema_name, description, user_id, timestamp))
+
+    def due(self):
+        return len(self.entries) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval
+
+    def take(self):
+        with self.lock:
+            entries, self.entries = self.entries, []
+            self.last_flush = time.monotonic()
+        return entries
+
+    def clear(self):
+        self.take()
+
+    def flush(self):
+        """Writes everything queued so far; returns the number of rows inserted."""
+        with self.flush_lock:
+            entries = self.take()
+            if not entries:
+                return 0
+            by_schema = defaultdict(list)
+            for schema_name, description, user_id, timestamp in entries:
+                by_schema[schema_name].append((description, user_id, timestamp))
+            written = 0
+            for schema_name, rows in by_schema.items():
+                try:
+                    with schema_context(schema_name):
+                        written += self._write(rows)
+                except Exception:
+                    logger.exception('Dropped %d activity entries for schema %s', len(rows), schema_name)
+            return written
+
+    def _write(self, rows):
+        # A user may have been deleted between logging and flushing.
+        user_ids = {user_id for _, user_id, _ in rows if user_id is not None}
+        existing = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True)) if user_ids else set()
+        RecentActivity.objects.bulk_create(
+            [
+                RecentActivity(description=description, timestamp=timestamp,
+                               user_id=user_id if user_id in existing else None)
+                for description, user_id, timestamp in rows
+            ],
+            batch_size=self.batch_size,
+        )
+        return len(rows)
+
+
+buffer = ActivityBuffer()
+
+
+def log_activity(description, user=None):
+    """Queues an activity entry for the current tenant once the transaction commits."""
+    if user is None:
+        request = current_request.get()
+        user = getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else None
+    entry = (connection.schema_name, description, user_id, timezone.now())
+    transaction.on_commit(lambda: _enqueue(*entry))
+
+
+def _enqueue(*entry):
+    buffer.add(*entry)
+    if MODE == 'thread':
+        start_flusher()
+    elif MODE == 'sync' or (MODE == 'after_response' and current_request.get() is None and buffer.due()):
+        # Outside a request (shell, commands) nothing else will trigger a flush.
+        buffer.flush()
+
+
+class ActivityMiddleware:
+    """Exposes the request to the activity hooks; must come after TenantMainMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            current_request.reset(token)
+
+
+def flush_after_response(sender, **kwargs):
+    # request_finished fires once the response has been sent to the client.
+    if buffer.entries and buffer.due():
+        buffer.flush()
+        # Django closed the request's connection in an earlier request_finished receiver;
+        # hand back the one the flush opened instead of keeping it out of the pool until
+        # this thread's next request
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+class FlushThread(threading.Thread):
+    def __init__(self, interval=FLUSH_INTERVAL):
+        super().__init__(name='activity-log-flusher', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                buffer.flush()
+            finally:
+                close_old_connections()
+
+
+flusher = None
+flusher_lock = threading.Lock()
+
+
+def start_flusher():
+    """Starts this process's FlushThread unless it is running (a forked worker needs its own)."""
+    global flusher
+    if flusher is not None and flusher.is_alive():
+        return
+    with flusher_lock:
+        if flusher is None or not flusher.is_alive():
+            flusher = FlushThread()
+            flusher.start()
+
+
+# Generic hooks: one entry per create/update/delete of these models. A view
+# can set ``instance._activity_description`` before saving to say more.
+# Names come from plain columns; StudyPlan.__str__ would fetch the teacher.
+LOGGED_MODELS = {
+    Schedule: ('schedule', lambda obj: obj.course_name),
+    Meeting: ('meeting', lambda obj: obj.title),
+    StudyPlan: ('study plan', lambda obj: obj.subject_name),
+    AcademicDecision: ('academic decision', lambda obj: obj.get_decision_type_display()),
+}
+
+
+def describe(instance, verb):
+    description = instance.__dict__.pop('_activity_description', None)
+    if description:
+        return description
+    label, name = LOGGED_MODELS[type(instance)]
+    return f'{verb} {label} "{name(instance)}"'
+
+
+def log_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        log_activity(describe(instance, 'Created' if created else 'Updated'))
+
+
+def log_delete(sender, instance, **kwargs):
+    log_activity(describe(instance, 'Deleted'))
+
+
+for _model in LOGGED_MODELS:
+    post_save.connect(log_save, sender=_model, dispatch_uid=f'activity-save-{_model.__name__}')
+    post_delete.connect(log_delete, sender=_model, dispatch_uid=f'activity-delete-{_model.__name__}')
+
+if MODE == 'after_response':
+    request_finished.connect(flush_after_response, dispatch_uid='activity-flush-after-response')
+atexit.register(buffer.flush)
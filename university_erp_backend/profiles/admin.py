@@ -29,4 +29,6 @@ admin.site.register(Schedule)
 admin.site.register(Meeting)
 admin.site.register(RecentActivity)
 admin.site.register(AcademicDecision)
-admin.site.register(Student)
\ No newline at end of file
+admin.site.register(Student)
+admin.site.register(Enrollment)
+admin.site.register(Grade)
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class ProfilesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'profiles'
+
+    def ready(self):
+        from .deployment import require_shared_default_cache
+        require_shared_default_cache()
+        from . import stats  # noqa: F401  (connects the dashboard counter signals)
+        from . import standing  # noqa: F401  (keeps Student's decision summary current)
+        from . import gpa  # noqa: F401  (recomputes a student's GPA when their grades change)
+        from . import activity  # noqa: F401  (connects the activity log hooks)
+        from . import occupancy  # noqa: F401  (keeps the room occupancy index current)
+        from . import authentication  # noqa: F401  (drops cached auth state when users change)
+        from . import response_cache  # noqa: F401  (invalidates cached responses on writes)
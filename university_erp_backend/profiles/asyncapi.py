@@ -0,0 +1,115 @@
+"""Async API views and concurrent ORM queries.
+
+DRF's APIView is synchronous, so AsyncAPIView runs authentication,
+permissions and throttling in the request's sync thread as usual and awaits
+the coroutine handler. Under ASGI the handler runs on the server's event
+loop; under WSGI Django starts one for the request.
+
+gather_queries() runs independent ORM calls at the same time. Each one
+runs on a worker thread with its own database connection, switched to the
+request's tenant. Worker connections stay open (checked out of the pool)
+between queries, so a process holds at most ASYNC_QUERY_WORKERS of them on
+top of its request connections until shutdown() closes them. Inside a
+transaction the calls run one after another on the request's connection
+instead, because other connections cannot see rows the transaction has not
+committed yet.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from rest_framework.views import APIView
+
+from .metrics import record_sql
+
+WORKERS = getattr(settings, 'ASYNC_QUERY_WORKERS', 4)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='async-query')
+    return _executor
+
+
+def shutdown():
+    """Closes every worker thread's connection and stops the threads (process exit, tests)."""
+    global _executor
+    with _executor_lock:
+        pool, _executor = _executor, None
+    if pool is None:
+        return
+    # One task per thread: each waits until all of them are running, so every thread closes its own
+    barrier = threading.Barrier(WORKERS)
+
+    def close():
+        barrier.wait(timeout=30)
+        connection.close()
+
+    for future in [pool.submit(close) for _ in range(WORKERS)]:
+        future.result()
+    pool.shutdown()
+
+
+def _request_state():
+    return connection.tenant, connection.in_atomic_block
+
+
+def _run_on_worker(tenant, query):
+    # Without the connection pool set_tenant makes the next query reissue SET search_path
+    if getattr(connection, 'schema_name', None) != tenant.schema_name:
+        connection.set_tenant(tenant)
+    try:
+        with connection.execute_wrapper(record_sql):
+            return query()
+    except Exception:
+        # Do not leave a possibly broken connection to the next query
+        connection.close()
+        raise
+
+
+async def gather_queries(*queries):
+    """Runs the callables concurrently in the current tenant; returns their results in order."""
+    tenant, in_transaction = await sync_to_async(_request_state)()
+    if in_transaction or not WORKERS:
+        return [await sync_to_async(query)() for query in queries]
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(
+        # The copied context carries the request's metrics timings into the worker
+        loop.run_in_executor(executor(), contextvars.copy_context().run, _run_on_worker, tenant, query)
+        for query in queries
+    ))
+
+
+class AsyncAPIView(APIView):
+    """APIView whose get/post/... handlers are coroutines."""
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # Authentication and permission checks may hit the database
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,79 @@
+"""Participant lookups and attendance counts over Meeting.participants.
+
+participants is a JSON list of names with a GIN (jsonb_path_ops) index, so
+"meetings this person attended" is a ``participants @> '["name"]'`` index
+lookup instead of reading every meeting. The attendance report expands the
+lists with jsonb_array_elements_text and counts in SQL; completed meetings
+in a date range are found through meeting_completed_date_idx.
+"""
+import datetime
+
+from django.db import connection
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+
+def attended_by(meetings, participant):
+    return meetings.filter(participants__contains=[participant])
+
+
+def attendance_report(meetings, participant=None):
+    """Per person: distinct meetings attended and the first/last date, most attended first."""
+    if participant is not None:
+        meetings = attended_by(meetings, participant)
+    inner, params = meetings.order_by().values_list('id', 'participants', 'date').query.sql_with_params()
+    sql = (
+        'SELECT person.name, COUNT(DISTINCT m.id), MIN(m.date), MAX(m.date) '
+        f'FROM ({inner}) AS m(id, participants, date) '
+        # Rows whose participants is not a list (null, an object) contribute nobody
+        "CROSS JOIN LATERAL jsonb_array_elements_text(CASE WHEN jsonb_typeof(m.participants) = 'array' "
+        "THEN m.participants ELSE '[]'::jsonb END) AS person(name) "
+        f"{'WHERE person.name = %s ' if participant is not None else ''}"
+        'GROUP BY person.name ORDER BY COUNT(DISTINCT m.id) DESC, person.name'
+    )
+    if participant is not None:
+        params = (*params, participant)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {'participant': name, 'attended': attended, 'first_attended': first, 'last_attended': last}
+            for name, attended, first, last in cursor.fetchall()
+        ]
+
+
+class ParticipantFilterMixin:
+    """
+    ?participant=<name> keeps the meetings whose participants list contains
+    exactly that name. GET <list url>/attendance/?from=&to=&department=
+    counts, per person, the completed meetings they attended.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        participant = self.request.query_params.get('participant')
+        if participant:
+            queryset = attended_by(queryset, participant)
+        return queryset
+
+    @action(detail=False, methods=['get'], url_path='attendance')
+    def attendance(self, request):
+        params = request.query_params
+        try:
+            start = datetime.date.fromisoformat(params['from']) if params.get('from') else None
+            end = datetime.date.fromisoformat(params['to']) if params.get('to') else None
+        except ValueError:
+            return Response({'error': 'from and to must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        # attendance_report applies ?participant= itself
+        meetings = super().filter_queryset(self.get_queryset()).filter(status='completed')
+        if start:
+            meetings = meetings.filter(date__gte=start)
+        if end:
+            meetings = meetings.filter(date__lte=end)
+        if params.get('department'):
+            meetings = meetings.filter(department=params['department'])
+        total = meetings.count()
+        rows = attendance_report(meetings, params.get('participant') or None)
+        for row in rows:
+            row['attendance_rate'] = row['attended'] / total
+        return Response({'from': start, 'to': end, 'meetings': total, 'participants': rows})
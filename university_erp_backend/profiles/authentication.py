@@ -0,0 +1,96 @@
+"""JWT authentication without a user query per request.
+
+Access tokens carry the user's id, username, role, department, staff flag and
+tenant schema (see CustomTokenObtainPairSerializer). ClaimJWTAuthentication
+builds the request user from those claims as a User instance whose other
+fields are deferred, so permission checks and ``issued_by=request.user``
+need no query and anything else is loaded on first access.
+
+With JWT_CLAIM_AUTH_REVOCATION_TTL set, the user's active, staff and
+superuser flags, role and department are also read from the database at most
+once per TTL and override the claims, so deactivations, demotions and role
+changes take effect without waiting for the token to expire. The values are
+kept in the 'default' cache and dropped whenever the user is saved or deleted;
+a queryset update() is only noticed after the TTL. With LocMemCache that
+cache belongs to one process, which is why profiles.deployment refuses to run
+more than one worker on it.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models.signals import post_save, post_delete
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+REVOCATION_TTL = getattr(settings, 'JWT_CLAIM_AUTH_REVOCATION_TTL', 60)
+
+# User field -> access token claim
+CLAIM_FIELDS = {
+    'username': 'username',
+    'role': 'role',
+    'department': 'department',
+    'is_staff': 'is_staff',
+}
+TENANT_CLAIM = 'tenant'
+# Re-read from the database every REVOCATION_TTL; these win over the claims
+STATE_FIELDS = ('is_active', 'role', 'department', 'is_staff', 'is_superuser')
+
+
+def add_user_claims(token, user):
+    for field, claim in CLAIM_FIELDS.items():
+        token[claim] = getattr(user, field)
+    token[TENANT_CLAIM] = connection.schema_name
+    return token
+
+
+def state_key(user_id):
+    return f'auth-state:{user_id}'
+
+
+def user_state(user_id):
+    """{STATE_FIELDS field: value} for the user, or None if they no longer exist; cached for the TTL."""
+    state = cache.get(state_key(user_id), False)
+    if state is False:
+        state = User.objects.filter(pk=user_id).values(*STATE_FIELDS).first()
+        cache.set(state_key(user_id), state, REVOCATION_TTL)
+    return state
+
+
+def forget_user_state(sender, instance, **kwargs):
+    cache.delete(state_key(instance.pk))
+
+
+class ClaimJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if TENANT_CLAIM not in validated_token or 'role' not in validated_token:
+            # Issued before these claims existed
+            return super().get_user(validated_token)
+        if validated_token[TENANT_CLAIM] != connection.schema_name:
+            raise AuthenticationFailed('Token was issued for another university', code='wrong_tenant')
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        values = {field: validated_token.get(claim) for field, claim in CLAIM_FIELDS.items()}
+        if REVOCATION_TTL:
+            state = user_state(user_id)
+            if state is None:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            values.update(state)
+            if not values['is_active']:
+                raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        values['id'] = user_id
+        # from_db takes the loaded values in model field order; the rest stay deferred
+        loaded = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+        user = User.from_db(connection.alias, loaded, [values[name] for name in loaded])
+        user._from_token = True
+        return user
+
+
+post_save.connect(forget_user_state, sender=User, dispatch_uid='auth-user-state-save')
+post_delete.connect(forget_user_state, sender=User, dispatch_uid='auth-user-state-delete')
@@ -0,0 +1,232 @@
+"""Load benchmark for the tenant API.
+
+ENDPOINTS drives every route in profiles/urls.py plus the JWT and djoser
+auth routes through the Django test client against a tenant seeded by
+the seed_tenants command, as the seeded dean, admin or teacher (or, for the
+process-wide operations routes, as a metrics scraper). Each one is
+sampled ``repeat`` times and reported as p50/p95 latency (response fully
+rendered and streamed) and the number of SQL statements issued. Writes run
+inside a transaction that is rolled back, so the tenant is left unchanged.
+Results are compared with a JSON baseline from an earlier run.
+"""
+import contextlib
+import math
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from .models import Schedule, Meeting, StudyPlan, RecentActivity, AcademicDecision, User
+from .response_cache import response_cache
+from .stats import invalidate_dashboard_stats
+
+# role -> seeded account the requests are made as
+ACCOUNTS = {'dean': 'seed-dean', 'admin': 'seed-admin', 'teacher': 'seed-teacher0'}
+# Requests that authenticate with METRICS_TOKEN (a throwaway one when none is configured)
+SCRAPER = 'scraper'
+SCRAPER_TOKEN = 'api-benchmark'
+# Not counted as queries: django-tenants' search_path and the savepoints the rollback wrapper adds
+IGNORED_STATEMENTS = ('SET ', 'SAVEPOINT ', 'RELEASE SAVEPOINT ', 'ROLLBACK TO SAVEPOINT ')
+
+
+@dataclass
+class Endpoint:
+    url_name: str
+    role: str = 'dean'  # an ACCOUNTS role, SCRAPER, or None for anonymous requests
+    method: str = 'get'
+    lookup: type = None  # model whose first row fills the pk of a detail route
+    params: object = field(default_factory=dict)  # dict, or callable(fixtures) -> dict
+    data: object = None  # dict, or callable(fixtures) -> dict
+    label: str = ''
+
+    @property
+    def name(self):
+        return self.label or f'{self.method.upper()} {self.url_name}'
+
+    @property
+    def writes(self):
+        return self.method != 'get'
+
+
+ENDPOINTS = [
+    Endpoint('api-root'),
+    Endpoint('schedule-list'),
+    Endpoint('schedule-detail', lookup=Schedule),
+    Endpoint('schedule-conflicts'),
+    Endpoint('schedule-free-rooms', params={'day': 'Tuesday', 'start': '10:00', 'end': '12:00'}),
+    Endpoint('schedule-export'),
+    Endpoint('meeting-list'),
+    Endpoint('meeting-detail', lookup=Meeting),
+    Endpoint('meeting-export'),
+    Endpoint('meeting-list', params=lambda fixtures: {'participant': fixtures['participant']},
+             label='GET meeting-list (participant)'),
+    Endpoint('meeting-attendance'),
+    Endpoint('studyplan-list', role='admin'),
+    Endpoint('studyplan-list', role='teacher', label='GET studyplan-list (teacher)'),
+    Endpoint('studyplan-detail', role='admin', lookup=StudyPlan),
+    Endpoint('studyplan-export', role='admin'),
+    Endpoint('recentactivity-list'),
+    Endpoint('recentactivity-detail', lookup=RecentActivity),
+    Endpoint('dean-meetings-list'),
+    Endpoint('dean-meetings-detail', lookup=Meeting),
+    Endpoint('dean-meetings-attendance', params={'from': '2020-01-01'}),
+    Endpoint('dean-academic-decisions-list'),
+    Endpoint('dean-academic-decisions-detail', lookup=AcademicDecision),
+    Endpoint('dean-academic-decisions-export'),
+    Endpoint('dean-academic-decisions-students-needing-attention', params={'gpa': '2.0'}),
+    Endpoint('dean-plan-approval-list'),
+    Endpoint('dean-plan-approval-detail', lookup=StudyPlan),
+    Endpoint('dean-dashboard'),
+    Endpoint('dean-dashboard-stats'),
+    Endpoint('dean-dashboard-recent-activity'),
+    Endpoint('search', params={'q': 'warnings or assessments'}),
+    Endpoint('cache-stats', role=SCRAPER),
+    Endpoint('metrics', role=SCRAPER),
+    # Writes, rolled back after each sample
+    Endpoint('schedule-list', method='post', data={
+        'course_name': 'Benchmark course', 'instructor': 'Benchmark instructor', 'day': 'Sunday',
+        'start_time': '20:00', 'end_time': '21:00', 'room': 'Benchmark room'}),
+    Endpoint('meeting-list', method='post', data={
+        'title': 'Benchmark meeting', 'date': '2030-01-01', 'time': '10:00 - 11:00', 'location': 'Hall 1',
+        'status': 'upcoming', 'participants': ['Benchmark member']}),
+    Endpoint('meeting-detail', method='patch', lookup=Meeting, data={'signedByDean': True}),
+    Endpoint('studyplan-list', role='teacher', method='post', data={'subject_name': 'Benchmark subject'}),
+    Endpoint('dean-academic-decisions-issue-decision', method='post',
+             data=lambda fixtures: {'student': fixtures['student'], 'decision_type': 'first-warning'}),
+    Endpoint('dean-academic-decisions-issue-bulk', method='post',
+             data={'filter': {'gpa': '1.5'}, 'decision_type': 'first-warning'}),
+    Endpoint('dean-plan-approval-approve-plan', method='post', lookup=StudyPlan),
+    Endpoint('dean-plan-approval-return-plan', method='post', lookup=StudyPlan, data={'notes': 'Revise'}),
+    # Auth routes
+    Endpoint('token_obtain_pair', role=None, method='post',
+             data=lambda fixtures: {'username': ACCOUNTS['dean'], 'password': fixtures['password']}),
+    Endpoint('token_refresh', role=None, method='post', data=lambda fixtures: {'refresh': fixtures['refresh']}),
+    Endpoint('jwt-create', role=None, method='post',
+             data=lambda fixtures: {'username': ACCOUNTS['dean'], 'password': fixtures['password']}),
+    Endpoint('jwt-verify', role=None, method='post', data=lambda fixtures: {'token': fixtures['tokens']['dean']}),
+    Endpoint('user-me'),
+]
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class APIBenchmark:
+    def __init__(self, tenant, password, repeat=20, warmup=2, warm_cache=False):
+        self.tenant = tenant
+        self.password = password
+        self.repeat = repeat
+        self.warmup = warmup
+        self.warm_cache = warm_cache
+        self.client = Client(HTTP_HOST=tenant.get_primary_domain().domain, raise_request_exception=False)
+
+    def fixtures(self, endpoints):
+        """Tokens for every role and the rows that detail routes and writes point at."""
+        fixtures = {'password': self.password, 'tokens': {}}
+        for role, username in ACCOUNTS.items():
+            response = self.client.post(reverse('token_obtain_pair'),
+                                        {'username': username, 'password': self.password})
+            if response.status_code != 200:
+                raise ValueError(f'Cannot log in as {username}; seed the tenant with seed_tenants first')
+            fixtures['tokens'][role] = response.json()['access']
+            fixtures.setdefault('refresh', response.json()['refresh'])
+        connection.set_tenant(self.tenant)
+        fixtures['pks'] = {
+            model: model.objects.order_by('pk').values_list('pk', flat=True).first()
+            for model in {endpoint.lookup for endpoint in endpoints if endpoint.lookup}
+        }
+        missing = [model.__name__ for model, pk in fixtures['pks'].items() if pk is None]
+        if missing:
+            raise ValueError(f'No {", ".join(sorted(missing))} rows to request; seed the tenant with seed_tenants first')
+        fixtures['student'] = User.objects.filter(role='student').order_by('pk').values_list('pk', flat=True).first()
+        participants = Meeting.objects.order_by('pk').values_list('participants', flat=True)[:100]
+        fixtures['participant'] = next((names[0] for names in participants if names), '')
+        return fixtures
+
+    def request(self, endpoint, fixtures):
+        kwargs = {'pk': fixtures['pks'][endpoint.lookup]} if endpoint.lookup else {}
+        url = reverse(endpoint.url_name, kwargs=kwargs)
+        data = endpoint.data(fixtures) if callable(endpoint.data) else endpoint.data
+        params = endpoint.params(fixtures) if callable(endpoint.params) else endpoint.params
+        headers = {}
+        scraper_token = contextlib.nullcontext()
+        if endpoint.role == SCRAPER:
+            if not settings.METRICS_TOKEN:
+                scraper_token = override_settings(METRICS_TOKEN=SCRAPER_TOKEN)
+            headers['HTTP_AUTHORIZATION'] = f'Metrics {settings.METRICS_TOKEN or SCRAPER_TOKEN}'
+        elif endpoint.role:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {fixtures["tokens"][endpoint.role]}'
+        if not self.warm_cache:
+            response_cache().clear()
+        started = time.perf_counter()
+        with scraper_token:
+            if endpoint.writes:
+                response = getattr(self.client, endpoint.method)(url, data or {}, content_type='application/json',
+                                                                 **headers)
+            else:
+                response = self.client.get(url, params, **headers)
+        # Streamed exports are only done once every chunk has been produced
+        if response.streaming:
+            b''.join(response.streaming_content)
+        else:
+            response.content
+        return response, time.perf_counter() - started
+
+    def sample(self, endpoint, fixtures):
+        """(status, milliseconds, SQL statements) for one request."""
+        with transaction.atomic() if endpoint.writes else contextlib.nullcontext():
+            with CaptureQueriesContext(connection) as ctx:
+                response, seconds = self.request(endpoint, fixtures)
+            if endpoint.writes:
+                transaction.set_rollback(True)
+        connection.set_tenant(self.tenant)
+        if endpoint.writes:
+            # Signal-maintained counters moved with the rolled-back write
+            invalidate_dashboard_stats()
+        queries = len([q for q in ctx.captured_queries if not q['sql'].startswith(IGNORED_STATEMENTS)])
+        return response.status_code, seconds * 1000, queries
+
+    def run(self, endpoints=ENDPOINTS):
+        """endpoint name -> {'status', 'p50_ms', 'p95_ms', 'queries'}"""
+        fixtures = self.fixtures(endpoints)
+        results = {}
+        for endpoint in endpoints:
+            for _ in range(self.warmup):
+                self.sample(endpoint, fixtures)
+            samples = [self.sample(endpoint, fixtures) for _ in range(self.repeat)]
+            timings = [ms for _, ms, _ in samples]
+            results[endpoint.name] = {
+                'status': samples[-1][0],
+                'p50_ms': round(percentile(timings, 50), 2),
+                'p95_ms': round(percentile(timings, 95), 2),
+                'queries': max(queries for _, _, queries in samples),
+            }
+        return results
+
+
+def regressions(results, baseline, tolerance=0.25, min_delta_ms=5.0):
+    """
+    Human-readable regressions of ``results`` against ``baseline``: a changed
+    status, more SQL statements, or a p95 more than ``tolerance`` slower and
+    at least ``min_delta_ms`` slower (so sub-millisecond noise is ignored).
+    """
+    found = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if current['status'] != previous['status']:
+            found.append(f'{name}: status {previous["status"]} -> {current["status"]}')
+        if current['queries'] > previous['queries']:
+            found.append(f'{name}: queries {previous["queries"]} -> {current["queries"]}')
+        slower = current['p95_ms'] - previous['p95_ms']
+        if slower >= min_delta_ms and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            found.append(f'{name}: p95 {previous["p95_ms"]:.1f}ms -> {current["p95_ms"]:.1f}ms')
+    return found
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.db import connection
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+
+def latest(timestamps):
+    return max((timestamp for timestamp in timestamps if timestamp is not None), default=None)
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified for list and retrieve.
+
+    The version of a list is MAX(updated_at) and COUNT(*) over the filtered
+    queryset (the count catches deletes), read with one aggregate query. A
+    request whose If-None-Match or If-Modified-Since still matches gets a 304
+    before anything is fetched or serialized. Writes that bypass save() (bulk
+    or queryset updates) must bump updated_at themselves.
+
+    A representation that includes fields of related rows lists their
+    change markers in related_version_fields (e.g. 'teacher__updated_at');
+    they are folded into the same aggregate, so editing a related row
+    changes the version too.
+    """
+    version_field = 'updated_at'
+    related_version_fields = ()
+
+    def list(self, request, *args, **kwargs):
+        fields = (self.version_field, *self.related_version_fields)
+        version = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            *(Max(field) for field in fields), count=Count('pk'),
+        )
+        last_modified = latest(version[f'{field}__max'] for field in fields)
+        return self.conditional_response(request, last_modified, version['count'],
+                                         lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        versions = (
+            self.filter_queryset(self.get_queryset()).filter(**lookup)
+            .values_list(self.version_field, *self.related_version_fields).first()
+        )
+        if versions is None:
+            # Let the normal path produce the 404
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(request, latest(versions), 1,
+                                         lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+    def conditional_response(self, request, last_modified, count, render):
+        # Same data seen by a different user or through other query params is a different representation
+        key = f'{connection.schema_name}|{request.get_full_path()}|{request.user.pk}|{last_modified}|{count}'
+        etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # Let browsers keep the body but revalidate on every poll
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ['Authorization', 'Cookie'])
+        return response
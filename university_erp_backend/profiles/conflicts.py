@@ -0,0 +1,77 @@
+"""Double-booking detection for Schedule.
+
+Two slots conflict when they share a day and a room (or an instructor) and
+their [start, end) intervals overlap; back-to-back slots are fine.
+"""
+import heapq
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import Schedule
+
+# Conflict kind -> Schedule field that must not be double-booked
+RESOURCES = ('room', 'instructor')
+
+
+def sweep(intervals):
+    """
+    Yields every overlapping pair among (start, end, slot_id) intervals.
+
+    Sorting by start and keeping a min-heap of the active intervals' ends
+    makes this O(n log n + k) for k reported pairs.
+    """
+    active = []  # (end, slot_id)
+    for start, end, slot_id in sorted(intervals):
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for other_end, other_id in active:
+            yield other_id, slot_id, start, min(end, other_end)
+        heapq.heappush(active, (end, slot_id))
+
+
+def find_conflicts(slots):
+    """
+    slots: iterable of (id, day, start_time, end_time, room, instructor).
+    Returns a list of conflicts, each naming the shared resource and the pair of slots.
+    """
+    groups = defaultdict(list)
+    for slot_id, day, start, end, room, instructor in slots:
+        for kind, value in zip(RESOURCES, (room, instructor)):
+            if value:
+                groups[kind, day, value].append((start, end, slot_id))
+    conflicts = []
+    for (kind, day, value), intervals in groups.items():
+        if len(intervals) < 2:
+            continue
+        for first, second, overlap_start, overlap_end in sweep(intervals):
+            conflicts.append({
+                'type': kind,
+                kind: value,
+                'day': day,
+                'slots': sorted((first, second)),
+                'overlap': {'start': overlap_start, 'end': overlap_end},
+            })
+    return conflicts
+
+
+def timetable_conflicts(queryset=None):
+    """Conflicts across a whole timetable, read with a single query."""
+    queryset = Schedule.objects.all() if queryset is None else queryset
+    return find_conflicts(queryset.values_list('id', 'day', 'start_time', 'end_time', 'room', 'instructor'))
+
+
+def slot_conflicts(day, start, end, room, instructor, exclude_pk=None):
+    """Existing slots that a new or edited slot would collide with (one indexed query)."""
+    clash = Q()
+    if room:
+        clash |= Q(room=room)
+    if instructor:
+        clash |= Q(instructor=instructor)
+    if not clash:
+        return Schedule.objects.none()
+    return (
+        Schedule.objects.filter(clash, day=day, start_time__lt=end, end_time__gt=start)
+        .exclude(pk=exclude_pk)
+        .order_by('start_time')
+    )
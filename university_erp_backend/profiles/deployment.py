@@ -0,0 +1,33 @@
+"""Guards for running more than one server process.
+
+SERVER_WORKERS is the number of processes serving requests (gunicorn's
+WEB_CONCURRENCY). The dashboard counters (profiles.stats) and the cached
+authentication state (profiles.authentication) live in the 'default'
+cache and are updated by whichever process handles a write. With a
+process-local backend such as LocMemCache every other process keeps its own
+stale copy, so require_shared_default_cache(), run from ProfilesConfig.ready(),
+refuses to start more than one worker on one. Use a shared backend (Redis,
+Memcached, DatabaseCache) before raising WEB_CONCURRENCY.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Backends whose entries exist only in the process that wrote them
+PROCESS_LOCAL_BACKENDS = {'django.core.cache.backends.locmem.LocMemCache'}
+
+
+def server_workers():
+    return getattr(settings, 'SERVER_WORKERS', 1)
+
+
+def is_process_local(alias):
+    return settings.CACHES[alias]['BACKEND'] in PROCESS_LOCAL_BACKENDS
+
+
+def require_shared_default_cache():
+    if server_workers() > 1 and is_process_local('default'):
+        raise ImproperlyConfigured(
+            f"SERVER_WORKERS is {server_workers()} but the 'default' cache is "
+            f"{settings.CACHES['default']['BACKEND']}, which each process keeps to itself; "
+            "configure a shared cache backend or run a single worker."
+        )
@@ -0,0 +1,124 @@
+"""values_list() read path for list endpoints.
+
+ValuesSerializer looks at a ModelSerializer once, works out which column
+each output field comes from and how DRF would format it, and then turns
+values_list() rows straight into the same dicts, with no model instances or
+field objects per row. Fields it cannot map by itself (SerializerMethodField
+and the like) must be given as ``extra`` lookups.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .metrics import serialize_timer
+
+# DRF fields whose to_representation returns database values unchanged
+PASSTHROUGH = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.FloatField, serializers.ReadOnlyField, serializers.ModelField,
+)
+
+
+def iso_date(value):
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def iso_datetime(value):
+    # DateTimeField.to_representation: current time zone, ISO 8601, 'Z' for UTC
+    if isinstance(value, str):
+        return value
+    if timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+class ValuesSerializer:
+    def __init__(self, serializer_class, extra=None):
+        self.serializer_class = serializer_class
+        self.extra = extra or {}
+        self._plan = None
+
+    @property
+    def plan(self):
+        # Built on first use, once the app registry is ready
+        if self._plan is None:
+            self._plan = self.build_plan()
+        return self._plan
+
+    def build_plan(self):
+        """[(output name, values lookup, converter or None)] in serializer field order."""
+        serializer = self.serializer_class()
+        model = serializer.Meta.model
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in self.extra:
+                plan.append((name, self.extra[name], None))
+                continue
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                lookup, converter = model._meta.get_field(field.source).attname, None
+            elif isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+                raise ImproperlyConfigured(f'{self.serializer_class.__name__}.{name} needs an extra lookup')
+            else:
+                lookup, converter = field.source.replace('.', '__'), self.converter(field)
+            plan.append((name, lookup, converter))
+        return plan
+
+    @staticmethod
+    def converter(field):
+        """A cheaper equivalent of field.to_representation for common cases, None for no conversion."""
+        if isinstance(field, serializers.DateTimeField):
+            iso = getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601
+            return iso_datetime if iso and not hasattr(field, 'timezone') else field.to_representation
+        if isinstance(field, serializers.DateField):
+            iso = getattr(field, 'format', api_settings.DATE_FORMAT) == ISO_8601
+            return iso_date if iso else field.to_representation
+        if isinstance(field, serializers.TimeField):
+            iso = getattr(field, 'format', api_settings.TIME_FORMAT) == ISO_8601
+            return iso_date if iso else field.to_representation
+        if isinstance(field, serializers.ChoiceField):
+            # Choice keys that are already strings come back unchanged
+            return None if all(isinstance(key, str) for key in field.choices) else field.to_representation
+        if isinstance(field, serializers.JSONField):
+            return field.to_representation if field.binary else None
+        if isinstance(field, PASSTHROUGH) and not isinstance(field, serializers.DecimalField):
+            return None
+        return field.to_representation
+
+    def values(self, queryset):
+        return queryset.values_list(*(lookup for _, lookup, _ in self.plan), named=True)
+
+    def represent(self, rows):
+        with serialize_timer():
+            return self.convert(rows)
+
+    def convert(self, rows):
+        names = [name for name, _, _ in self.plan]
+        converted = [(i, converter) for i, (_, _, converter) in enumerate(self.plan) if converter is not None]
+        data = []
+        for row in rows:
+            values = list(row)
+            for i, converter in converted:
+                if values[i] is not None:
+                    values[i] = converter(values[i])
+            data.append(dict(zip(names, values)))
+        return data
+
+
+class ValuesListMixin:
+    """
+    Serves list() through ``values_serializer`` instead of instantiating
+    models; the output is identical to ``serializer_class``.
+    """
+    values_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.values_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer.represent(page))
+        return Response(self.values_serializer.represent(queryset))
@@ -0,0 +1,245 @@
+"""Student GPAs derived from grades, computed with NumPy.
+
+load_grades() reads one row per GPA-bearing grade (student, term, credit
+hours, grade points) into flat arrays. compute() turns those into the GPA
+of every (student, term) and the cumulative GPA after each term in a single
+vectorized pass: the rows are sorted by student and term, np.add.reduceat
+sums quality points (credits x points) and credits per term, and a cumulative
+sum that restarts at each student's first term gives the running totals.
+There is no Python loop over students or grades, so a cohort of tens of
+thousands of students is recomputed in seconds.
+
+recompute_gpas() stores the cumulative GPA and the latest term's GPA on
+Student (gpa, term_gpa) for the given students, or for everyone, and marks
+them gpa_from_grades. Saving or deleting a Grade or an Enrollment recomputes
+its student (and the student it was moved away from), inside the same
+transaction; bulk imports call recompute_gpas() for the students they
+touched, or run the recompute_gpas command afterwards. A GPA entered by hand
+stays until the student's first grade is recorded; a student whose last
+GPA-bearing grade goes away (deleted, or changed to P/W/I) has the derived
+GPA cleared, since there is no hand-entered value left to go back to.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .models import Enrollment, Grade, Student
+
+# Stored GPAs are rounded to this many decimals
+GPA_DECIMALS = 2
+# term key = year * TERM_STRIDE + position of the semester within the year
+TERM_STRIDE = 10
+SEMESTERS = [value for value, _ in Enrollment.SEMESTER_CHOICES]
+
+
+def term_key(year, semester):
+    return year * TERM_STRIDE + SEMESTERS.index(semester)
+
+
+def term_label(key):
+    year, semester = divmod(int(key), TERM_STRIDE)
+    return year, SEMESTERS[semester]
+
+
+@dataclass
+class GradeArrays:
+    """One entry per GPA-bearing grade."""
+    student: np.ndarray  # user id, int64
+    term: np.ndarray  # term_key(), int64
+    credits: np.ndarray  # float64
+    points: np.ndarray  # float64
+
+    ROW = np.dtype([('student', np.int64), ('term', np.int64), ('credits', np.float64), ('points', np.float64)])
+
+    @classmethod
+    def from_rows(cls, rows, count=-1):
+        """From an iterable of (student, term key, credit hours, grade points) tuples."""
+        table = np.fromiter(rows, dtype=cls.ROW, count=count)
+        return cls(*(table[name] for name in cls.ROW.names))
+
+
+@dataclass
+class TermGPAs:
+    """One entry per (student, term) with GPA-bearing grades, ordered by student and term."""
+    student: np.ndarray
+    term: np.ndarray
+    credits: np.ndarray  # GPA credit hours taken in the term
+    term_gpa: np.ndarray
+    cumulative_gpa: np.ndarray  # over this and all earlier terms
+
+    def latest(self):
+        """(student, cumulative GPA, term GPA) arrays for each student's most recent term."""
+        last = np.flatnonzero(np.r_[self.student[1:] != self.student[:-1], True]) if len(self.student) else []
+        return self.student[last], self.cumulative_gpa[last], self.term_gpa[last]
+
+
+def load_grades(user_ids=None):
+    """GradeArrays of these students' grades (every student's when None)."""
+    grades = Grade.objects.filter(letter__in=Grade.POINTS)
+    if user_ids is not None:
+        grades = grades.filter(enrollment__student_id__in=user_ids)
+    rows = grades.values_list(
+        'enrollment__student_id',
+        F('enrollment__year') * TERM_STRIDE + Case(
+            *(When(enrollment__semester=semester, then=Value(i)) for i, semester in enumerate(SEMESTERS)),
+            output_field=IntegerField(),
+        ),
+        Cast('enrollment__credit_hours', FloatField()),
+        Case(*(When(letter=letter, then=Value(points)) for letter, points in Grade.POINTS.items()),
+             output_field=FloatField()),
+    )
+    # Straight from the cursor into the arrays: no model instances or lists of millions of rows
+    sql, params = rows.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return GradeArrays.from_rows(cursor, cursor.rowcount)
+
+
+def compute(grades):
+    """TermGPAs for GradeArrays, in one vectorized pass."""
+    order = np.lexsort((grades.term, grades.student))
+    student, term = grades.student[order], grades.term[order]
+    credits = grades.credits[order]
+    quality = credits * grades.points[order]
+    if not len(student):
+        empty = np.empty(0)
+        return TermGPAs(student, term, empty, empty, empty)
+
+    # First row of every (student, term)
+    starts = np.flatnonzero(np.r_[True, (student[1:] != student[:-1]) | (term[1:] != term[:-1])])
+    term_quality = np.add.reduceat(quality, starts)
+    term_credits = np.add.reduceat(credits, starts)
+    student, term = student[starts], term[starts]
+
+    # Running totals that restart at each student's first term
+    first_term = np.r_[True, student[1:] != student[:-1]]
+    student_start = np.maximum.accumulate(np.where(first_term, np.arange(len(student)), 0))
+    running_quality = np.cumsum(term_quality)
+    running_credits = np.cumsum(term_credits)
+    cumulative_quality = running_quality - (running_quality - term_quality)[student_start]
+    cumulative_credits = running_credits - (running_credits - term_credits)[student_start]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Terms with only zero-credit courses have no GPA (NaN)
+        term_gpa = term_quality / term_credits
+        cumulative_gpa = cumulative_quality / cumulative_credits
+    return TermGPAs(student, term, term_credits, term_gpa, cumulative_gpa)
+
+
+def scalar_gpas(rows):
+    """
+    The same results as compute(), one grade at a time in plain Python:
+    {(student, term): (credits, term GPA, cumulative GPA)} for
+    (student, term key, credit hours, grade points) rows. The reference
+    that compute() is tested and benchmarked against.
+    """
+    terms = {}
+    for student, term, credits, points in rows:
+        quality, total = terms.get((student, term), (0.0, 0.0))
+        terms[student, term] = (quality + credits * points, total + credits)
+    results = {}
+    running = {}
+    for (student, term), (quality, credits) in sorted(terms.items()):
+        cumulative_quality, cumulative_credits = running.get(student, (0.0, 0.0))
+        cumulative_quality += quality
+        cumulative_credits += credits
+        running[student] = (cumulative_quality, cumulative_credits)
+        results[student, term] = (
+            credits,
+            quality / credits if credits else float('nan'),
+            cumulative_quality / cumulative_credits if cumulative_credits else float('nan'),
+        )
+    return results
+
+
+def store(student, gpa, term_gpa):
+    """Writes the GPAs to Student in one statement; only rows whose values change are updated."""
+    if not len(student):
+        return 0
+    gpa, term_gpa = (
+        [None if np.isnan(value) else value for value in np.round(values, GPA_DECIMALS).tolist()]
+        for values in (gpa, term_gpa)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {Student._meta.db_table} AS s '
+            'SET gpa = v.gpa, term_gpa = v.term_gpa, gpa_from_grades = true '
+            'FROM unnest(%s::bigint[], %s::float8[], %s::float8[]) AS v(user_id, gpa, term_gpa) '
+            'WHERE s.user_id = v.user_id AND (NOT s.gpa_from_grades '
+            'OR s.gpa IS DISTINCT FROM v.gpa OR s.term_gpa IS DISTINCT FROM v.term_gpa)',
+            [student.tolist(), gpa, term_gpa],
+        )
+        return cursor.rowcount
+
+
+def clear(user_ids, keep):
+    """
+    Clears the derived GPA of these students (everyone's when None), except
+    the user ids in keep; they no longer have a GPA-bearing grade.
+    """
+    students = Student.objects.filter(gpa_from_grades=True)
+    if user_ids is not None:
+        students = students.filter(user_id__in=user_ids)
+    return students.exclude(user_id__in=keep).update(gpa=None, term_gpa=None, gpa_from_grades=False)
+
+
+def recompute_gpas(user_ids=None, lock=False):
+    """
+    Recomputes and stores the GPAs of these students (everyone's when None);
+    returns how many Student rows changed. Students left without a
+    GPA-bearing grade have their derived GPA cleared. lock=True first locks the
+    students' rows, in user id order, so concurrent grade changes for the
+    same student are applied one after the other.
+    """
+    if user_ids is not None:
+        user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+        if not user_ids:
+            return 0
+    with transaction.atomic():
+        if lock and user_ids is not None:
+            students = Student.objects.filter(user_id__in=user_ids).order_by('user_id')
+            list(students.select_for_update().values_list('pk', flat=True))
+        student, gpa, term_gpa = compute(load_grades(user_ids)).latest()
+        return store(student, gpa, term_gpa) + clear(user_ids, student.tolist())
+
+
+def affected_students(sender, instance, created=False):
+    """The user ids a saved or deleted Grade or Enrollment belongs to, and belonged to before a move."""
+    field = 'student_id' if sender is Enrollment else 'enrollment_id'
+    ids = {getattr(instance, field), None if created else getattr(instance, '_gpa_previous', None)} - {None}
+    instance._gpa_previous = getattr(instance, field)
+    if sender is Enrollment:
+        return ids
+    # A query rather than instance.enrollment: when an enrollment is deleted its grade goes
+    # first, and the enrollment's own post_delete recomputes the student
+    return set(Enrollment.objects.filter(pk__in=ids).values_list('student_id', flat=True))
+
+
+def remember_previous(sender, instance, **kwargs):
+    # The student (or enrollment) a loaded row belonged to, in case a save moves it
+    field = 'student_id' if sender is Enrollment else 'enrollment_id'
+    instance._gpa_previous = instance.__dict__.get(field)
+
+
+def recompute_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    user_ids = affected_students(sender, instance, created)
+    if sender is Enrollment and created:
+        # A new enrollment has no grade yet
+        return
+    recompute_gpas(user_ids, lock=True)
+
+
+def recompute_on_delete(sender, instance, **kwargs):
+    recompute_gpas(affected_students(sender, instance), lock=True)
+
+
+for _model in (Grade, Enrollment):
+    post_init.connect(remember_previous, sender=_model, dispatch_uid=f'gpa-init-{_model.__name__}')
+    post_save.connect(recompute_on_save, sender=_model, dispatch_uid=f'gpa-save-{_model.__name__}')
+    post_delete.connect(recompute_on_delete, sender=_model, dispatch_uid=f'gpa-delete-{_model.__name__}')
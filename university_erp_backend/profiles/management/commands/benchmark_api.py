@@ -0,0 +1,78 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from profiles.benchmarks import ENDPOINTS, APIBenchmark, regressions
+from profiles.seeding import DEFAULT_PASSWORD
+from public_tenant.models import Client
+
+
+class Command(BaseCommand):
+    help = (
+        "Drives every API and auth endpoint against a tenant seeded by seed_tenants and records "
+        "p50/p95 latency and SQL statement counts per endpoint. Compares them with --baseline and "
+        "fails on regressions; the baseline is written when it does not exist yet or with "
+        "--update-baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', default='bench0', help='Seeded tenant to benchmark.')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD)
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint first.')
+        parser.add_argument('--only', default='', help='Only endpoints whose name contains this text.')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep the response cache between requests instead of clearing it.')
+        parser.add_argument('--baseline', default='api-benchmark-baseline.json')
+        parser.add_argument('--update-baseline', action='store_true')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed p95 slowdown as a fraction of the baseline.')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help='p95 slowdowns smaller than this are never regressions.')
+
+    def handle(self, *args, **options):
+        tenant = Client.objects.filter(schema_name=options['schema']).first()
+        if tenant is None:
+            raise CommandError(f'No tenant {options["schema"]}; create one with seed_tenants')
+        endpoints = [endpoint for endpoint in ENDPOINTS if options['only'] in endpoint.name]
+        benchmark = APIBenchmark(tenant, options['password'], options['repeat'], options['warmup'],
+                                 options['warm_cache'])
+        try:
+            results = benchmark.run(endpoints)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'{"endpoint":<60} {"status":>6} {"p50 ms":>9} {"p95 ms":>9} {"queries":>8}')
+        for name, result in results.items():
+            self.stdout.write(f'{name:<60} {result["status"]:>6} {result["p50_ms"]:>9.2f} '
+                              f'{result["p95_ms"]:>9.2f} {result["queries"]:>8}')
+
+        path = options['baseline']
+        if options['update_baseline'] or not os.path.exists(path):
+            self.write_baseline(path, tenant, options, results)
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {path}'))
+            return
+        with open(path) as f:
+            baseline = json.load(f)['endpoints']
+        found = regressions(results, baseline, options['tolerance'], options['min_delta_ms'])
+        for regression in found:
+            self.stderr.write(f'REGRESSION {regression}')
+        if found:
+            raise CommandError(f'{len(found)} regressions against {path}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path}'))
+
+    @staticmethod
+    def write_baseline(path, tenant, options, results):
+        document = {
+            'recorded_at': timezone.now().isoformat(),
+            'schema': tenant.schema_name,
+            'repeat': options['repeat'],
+            'warm_cache': options['warm_cache'],
+            'endpoints': results,
+        }
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        os.replace(tmp, path)
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from profiles import gpa
+from profiles.benchmarks import percentile
+from profiles.models import User, Student, Enrollment, Grade
+
+MARKER = 'gpa-benchmark'
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the NumPy GPA engine. Inserts --students students with --courses graded courses each "
+        "(five per term), recomputes every student's term and cumulative GPA, checks the result "
+        "against the plain-Python reference and times the single-student update that follows a "
+        "grade change. Everything runs in a transaction that is rolled back. Runs in the current "
+        "schema; use 'tenant_command benchmark_gpa --schema=<name>' for a tenant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50_000)
+        parser.add_argument('--courses', type=int, default=40, help='Graded courses per student.')
+        parser.add_argument('--repeat', type=int, default=20, help='Samples of the single-student update.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            user_ids = self.seed(options['students'], options['courses'])
+            self.stdout.write(f'Seeded {len(user_ids):,} students x {options["courses"]} grades '
+                              f'in {time.perf_counter() - started:.0f}s')
+
+            timings = {}
+            started = time.perf_counter()
+            grades = gpa.load_grades(user_ids)
+            timings['load'] = time.perf_counter() - started
+            started = time.perf_counter()
+            terms = gpa.compute(grades)
+            timings['compute'] = time.perf_counter() - started
+            started = time.perf_counter()
+            gpa.store(*terms.latest())
+            timings['store'] = time.perf_counter() - started
+            self.stdout.write(
+                f'Cohort recompute: {sum(timings.values()):.2f}s '
+                f'({", ".join(f"{step} {seconds:.2f}s" for step, seconds in timings.items())})')
+
+            rows = list(zip(grades.student.tolist(), grades.term.tolist(),
+                            grades.credits.tolist(), grades.points.tolist()))
+            started = time.perf_counter()
+            reference = gpa.scalar_gpas(rows)
+            scalar = time.perf_counter() - started
+            expected = np.array([reference[key] for key in zip(terms.student.tolist(), terms.term.tolist())])
+            error = np.nanmax(np.abs(expected - np.column_stack(
+                [terms.credits, terms.term_gpa, terms.cumulative_gpa])))
+            self.stdout.write(f'Plain Python: {scalar:.2f}s for the compute step '
+                              f'(NumPy x{scalar / timings["compute"]:.0f}); largest difference {error:.1e}')
+
+            latencies = []
+            grade_rows = Grade.objects.filter(enrollment__student_id__in=user_ids[:options['repeat']])
+            for grade in grade_rows.select_related('enrollment')[:options['repeat']]:
+                grade.letter = 'A' if grade.letter != 'A' else 'B'
+                started = time.perf_counter()
+                grade.save()
+                latencies.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(f'Single grade change: p50 {percentile(latencies, 50):.1f} ms, '
+                              f'p95 {percentile(latencies, 95):.1f} ms')
+            transaction.set_rollback(True)
+
+    def seed(self, students, courses):
+        users = User.objects.bulk_create(
+            (User(username=f'{MARKER}-{i}', email=f'{MARKER}-{i}@example.com', role='student', password='!')
+             for i in range(students)),
+            batch_size=5000,
+        )
+        Student.objects.bulk_create((Student(user=user, department='Benchmarks') for user in users),
+                                    batch_size=5000)
+        user_ids = [user.pk for user in users]
+        semesters = [value for value, _ in Enrollment.SEMESTER_CHOICES]
+        with connection.cursor() as cursor:
+            # Five courses per term, terms in calendar order from spring 2018
+            cursor.execute(
+                f'INSERT INTO {Enrollment._meta.db_table} '
+                '(student_id, course_code, course_name, credit_hours, year, semester) '
+                "SELECT u, 'C' || c, '', (ARRAY[1, 2, 3, 3, 4])[1 + floor(random() * 5)::int], "
+                '2018 + c / 5 / %s, (%s::text[])[1 + (c / 5) %% %s] '
+                'FROM unnest(%s::bigint[]) AS u, generate_series(0, %s - 1) AS c',
+                [len(semesters), semesters, len(semesters), user_ids, courses],
+            )
+            letters = [letter for letter, _ in Grade.LETTER_CHOICES]
+            cursor.execute(
+                f'INSERT INTO {Grade._meta.db_table} (enrollment_id, letter, graded_at) '
+                'SELECT e.id, (%s::text[])[1 + floor(random() * %s)::int], now() '
+                f'FROM {Enrollment._meta.db_table} AS e WHERE e.student_id = ANY(%s::bigint[])',
+                [letters, len(letters), user_ids],
+            )
+            for model in (Enrollment, Grade):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+        return user_ids
@@ -0,0 +1,130 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from profiles import search
+from profiles.benchmarks import percentile
+from profiles.models import User, Meeting, StudyPlan
+from profiles.response_cache import CACHED_MODELS, bump_generation
+from profiles.stats import invalidate_dashboard_stats
+
+MARKER = 'search-benchmark'
+VOCABULARY = [
+    'curriculum', 'syllabus', 'semester', 'exam', 'retake', 'grading', 'attendance', 'warning', 'probation',
+    'academic', 'council', 'department', 'faculty', 'laboratory', 'thesis', 'supervisor', 'lecture', 'seminar',
+    'workshop', 'assessment', 'quiz', 'project', 'deadline', 'timetable', 'room', 'budget', 'scholarship',
+    'transfer', 'credit', 'elective', 'prerequisite', 'internship', 'accreditation', 'plagiarism', 'appeal',
+    'committee', 'approval', 'revision', 'schedule', 'student', 'teacher', 'dean', 'library', 'research',
+    'publication', 'conference', 'exchange', 'enrollment', 'graduation', 'diploma', 'certificate', 'tuition',
+    'discipline', 'misconduct', 'mentoring', 'tutoring', 'evaluation', 'feedback', 'survey', 'quality',
+]
+# Words are drawn from this many terms, the VOCABULARY first and then 'term<n>', so a
+# word is in a few percent of the rows rather than in all of them
+TERMS = 3000
+QUERIES = [
+    'council',  # in every meeting's description: the broadest possible query
+    'curriculum',
+    'plagiarism appeal',
+    '"academic probation"',
+    'accreditation or scholarship',
+    'exam -retake',
+    'nonexistentword',
+]
+
+
+def random_text(words):
+    # Correlated on g so every row draws its own words; v.w is the VOCABULARY array
+    return (
+        f"(SELECT string_agg(CASE WHEN k <= {len(VOCABULARY)} THEN v.w[k] ELSE 'term' || k END, ' ') "
+        f"FROM (SELECT 1 + floor(random() * {TERMS})::int + g * 0 AS k FROM generate_series(1, {words})) AS r)"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures /api/search/ latency over a synthetic corpus. Inserts --meetings meetings and --plans "
+        "study plans (a million rows by default) with random academic text in batches, through the "
+        "search_vector triggers, then reports p50/p95 of ranking a page of hits with snippets for a "
+        "few queries. The corpus is deleted afterwards unless --keep is given. Runs in the current "
+        "schema; use 'tenant_command benchmark_search --schema=<name>' for a tenant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meetings', type=int, default=500_000)
+        parser.add_argument('--plans', type=int, default=500_000)
+        parser.add_argument('--batch', type=int, default=50_000, help='Rows per INSERT.')
+        parser.add_argument('--repeat', type=int, default=20, help='Samples per query.')
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--keep', action='store_true', help='Keep the corpus for another run.')
+
+    def handle(self, *args, **options):
+        teacher, _ = User.objects.get_or_create(
+            username=MARKER, defaults={'email': f'{MARKER}@example.com', 'role': 'teacher'})
+        try:
+            if not Meeting.objects.filter(title__startswith=MARKER).exists():
+                self.seed(teacher, options)
+            self.stdout.write(f'{"query":<32} {"hits":>8} {"p50 ms":>8} {"p95 ms":>8}')
+            for text in QUERIES:
+                hits, latencies = self.measure(text, options)
+                self.stdout.write(f'{text:<32} {hits:>8} {percentile(latencies, 50):>8.2f} '
+                                  f'{percentile(latencies, 95):>8.2f}')
+        finally:
+            if not options['keep']:
+                self.cleanup(teacher)
+
+    @staticmethod
+    def refresh_caches():
+        # The raw INSERTs and DELETEs send no signals, so refresh what they maintain
+        invalidate_dashboard_stats()
+        for model in CACHED_MODELS:
+            bump_generation(model)
+
+    def seed(self, teacher, options):
+        started = time.perf_counter()
+        for model, total, columns, values in (
+            (Meeting, options['meetings'],
+             'title, date, time, location, description, attendees, status, agenda, participants, minutes, '
+             '"signedByDean", department, updated_at',
+             f"%s || ' ' || g || ' ' || {random_text(3)}, DATE '2015-01-01' + mod(g, 3650), '10:00 - 11:00', "
+             f"'Hall', 'Faculty council: ' || {random_text(10)}, 0, 'completed', {random_text(20)}, "
+             f"'[]'::jsonb, {random_text(40)}, false, 'Benchmarks', now()"),
+            (StudyPlan, options['plans'],
+             'teacher_id, subject_name, submission_status, students_count, plan_content, progress_percentage, '
+             'created_at, updated_at',
+             f"%s, %s || ' ' || g || ' ' || {random_text(3)}, 'submitted', 0, {random_text(60)}, 0, "
+             "now() - g * interval '1 minute', now()"),
+        ):
+            params = [VOCABULARY, teacher.pk, MARKER] if model is StudyPlan else [VOCABULARY, MARKER]
+            with connection.cursor() as cursor:
+                for start in range(0, total, options['batch']):
+                    stop = min(start + options['batch'], total)
+                    cursor.execute(
+                        f'INSERT INTO {model._meta.db_table} ({columns}) '
+                        f'WITH v AS (SELECT %s::text[] AS w) '
+                        f'SELECT {values} FROM generate_series(%s, %s) AS g, v',
+                        params + [start + 1, stop])
+                    self.stdout.write(f'{model.__name__}: {stop:,}/{total:,}', ending='\r')
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+            self.stdout.write('')
+        self.refresh_caches()
+        self.stdout.write(f'Seeded in {time.perf_counter() - started:.0f}s')
+
+    @staticmethod
+    def measure(text, options):
+        query = search.search_query(text)
+        latencies = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            # What SearchView does for the first page
+            rows, hits = search.ranked_page(query, tuple(search.SOURCES), 0, options['page_size'])
+            search.hits(rows, query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return hits, latencies
+
+    def cleanup(self, teacher):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {Meeting._meta.db_table} WHERE title LIKE %s', [f'{MARKER} %'])
+            cursor.execute(f'DELETE FROM {StudyPlan._meta.db_table} WHERE teacher_id = %s', [teacher.pk])
+        teacher.delete()
+        self.refresh_caches()
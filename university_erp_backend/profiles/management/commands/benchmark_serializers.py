@@ -0,0 +1,87 @@
+import datetime
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from profiles.models import User, Schedule, Meeting, StudyPlan
+from profiles.renderers import FastJSONRenderer
+from profiles.serializers import ScheduleSerializer, MeetingSerializer, StudyPlanSerializer
+from profiles.views import ScheduleViewSet, MeetingViewSet, StudyPlanViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares rows/sec of the ModelSerializer + JSONRenderer list path with the values_list() + "
+        "FastJSONRenderer path for schedules, meetings and study plans. Inserts --rows synthetic rows "
+        "per model in a transaction that is rolled back. Runs in the current schema; use "
+        "'tenant_command benchmark_serializers --schema=<name>' for a tenant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5, help='Best of this many runs is reported.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with transaction.atomic():
+            querysets = self.seed(rows)
+            for model, serializer_class, viewset in (
+                (Schedule, ScheduleSerializer, ScheduleViewSet),
+                (Meeting, MeetingSerializer, MeetingViewSet),
+                (StudyPlan, StudyPlanSerializer, StudyPlanViewSet),
+            ):
+                queryset = querysets[model]
+                values = viewset.values_serializer
+
+                def serializer_path():
+                    return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+                def values_path():
+                    return FastJSONRenderer().render(values.represent(values.values(queryset.all())))
+
+                assert serializer_path() == values_path(), f'{model.__name__} outputs differ'
+                slow, fast = self.best(serializer_path, repeat), self.best(values_path, repeat)
+                self.stdout.write(
+                    f'{model.__name__:<10} serializer {rows / slow:>10,.0f} rows/s   '
+                    f'values {rows / fast:>10,.0f} rows/s   x{slow / fast:.1f}'
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def best(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def seed(self, rows):
+        teacher = User.objects.create(username='benchmark-teacher', email='benchmark-teacher@example.com',
+                                      role='teacher', department='Benchmarks')
+        marker = f'benchmark-{connection.schema_name}'
+        Schedule.objects.bulk_create(
+            Schedule(course_name=f'{marker} {i}', instructor=f'Instructor {i % 50}', day='Monday',
+                     start_time=datetime.time(8 + i % 8), end_time=datetime.time(9 + i % 8), room=f'R{i % 40}')
+            for i in range(rows)
+        )
+        Meeting.objects.bulk_create(
+            Meeting(title=f'{marker} {i}', date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365),
+                    time='10:00 - 11:00', location='Hall', status='completed', agenda='Agenda ' * 10,
+                    participants=[f'Member {j}' for j in range(i % 8)], department='Benchmarks')
+            for i in range(rows)
+        )
+        StudyPlan.objects.bulk_create(
+            StudyPlan(teacher=teacher, subject_name=f'{marker} {i}', semester='Fall',
+                      submission_status='submitted', progress_percentage=Decimal(i % 100),
+                      students_count=i % 60, plan_content='Week by week plan ' * 5)
+            for i in range(rows)
+        )
+        return {
+            Schedule: Schedule.objects.filter(course_name__startswith=marker).order_by('id'),
+            Meeting: Meeting.objects.filter(title__startswith=marker).order_by('id'),
+            StudyPlan: StudyPlan.objects.filter(subject_name__startswith=marker).select_related('teacher').order_by('id'),
+        }
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+from datetime import timedelta
+
+from profiles.models import RecentActivity
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes RecentActivity rows older than --days, one time window per transaction. "
+        "Runs in the current schema; use 'all_tenants_command prune_activity' for every tenant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Keep this many days of activity.')
+        parser.add_argument('--window-hours', type=int, default=24,
+                            help='Size of each delete window; smaller windows mean shorter locks.')
+        parser.add_argument('--archive', help='Append pruned rows to this file as JSON lines first.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        window = timedelta(hours=options['window_hours'])
+        start = RecentActivity.objects.filter(timestamp__lt=cutoff).aggregate(oldest=Min('timestamp'))['oldest']
+        archive = open(options['archive'], 'a') if options['archive'] else None
+        total = 0
+        try:
+            while start is not None and start < cutoff:
+                end = min(start + window, cutoff)
+                with transaction.atomic():
+                    rows = RecentActivity.objects.filter(timestamp__gte=start, timestamp__lt=end)
+                    if archive:
+                        for row in rows.values('id', 'description', 'timestamp', 'user_id').iterator():
+                            row['timestamp'] = row['timestamp'].isoformat()
+                            row['schema'] = connection.schema_name
+                            archive.write(json.dumps(row) + '\n')
+                    deleted, _ = rows.delete()
+                total += deleted
+                start = end
+        finally:
+            if archive:
+                archive.close()
+        self.stdout.write(f'Pruned {total} activity rows older than {cutoff:%Y-%m-%d %H:%M} '
+                          f'from schema {connection.schema_name}')
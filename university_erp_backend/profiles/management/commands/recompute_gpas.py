@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from profiles.gpa import recompute_gpas
+from profiles.models import Student
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the cumulative and latest-term GPA of every student, or of one --department, from "
+        "their grades in a single pass. Needed after grades are imported with bulk_create(), queryset "
+        "update() or raw SQL, which skip the per-student recompute. Runs in the current schema; use "
+        "'all_tenants_command recompute_gpas' for every tenant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--department', help='Only the students of this department.')
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['department']:
+            user_ids = Student.objects.filter(department=options['department']).values_list('user_id', flat=True)
+        changed = recompute_gpas(user_ids)
+        self.stdout.write(f'Updated the GPA of {changed} students in schema {connection.schema_name}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from profiles.models import Student
+from profiles.standing import refresh_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every student's warnings_count, latest_decision_type and latest_decision_at from "
+        "their academic decisions, --batch-size students per transaction. Needed after writes that "
+        "bypass the model (queryset update(), raw SQL, restores). Runs in the current schema; use "
+        "'all_tenants_command repair_decision_summaries' for every tenant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Students locked and updated per transaction; smaller batches mean shorter locks.')
+
+    def handle(self, *args, **options):
+        user_ids = list(Student.objects.order_by('user_id').values_list('user_id', flat=True))
+        total = 0
+        for start in range(0, len(user_ids), options['batch_size']):
+            total += refresh_summaries(user_ids[start:start + options['batch_size']])
+        self.stdout.write(f'Recomputed the decision summary of {total} students in schema {connection.schema_name}')
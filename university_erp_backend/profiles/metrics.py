@@ -0,0 +1,282 @@
+"""Per-request timings and in-process Prometheus metrics.
+
+MetricsMiddleware times every request and, through a database execute
+wrapper, each SQL statement it runs (no DEBUG query log needed). Time spent
+turning rows into response data and rendering it is added up as
+"serialize". The totals go out in a Server-Timing header and into per-view,
+per-tenant histograms that /api/metrics/ serves in the Prometheus text
+format. A request slower than METRICS_SLOW_REQUEST_MS logs its slowest
+statements (SQL text only, never parameters). The response and tenant cache
+counters and the database connection pool's occupancy and waits are
+appended to the same page.
+
+The numbers are per process: scrape every worker.
+"""
+import bisect
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500)
+SERVER_TIMING = getattr(settings, 'METRICS_SERVER_TIMING', True)
+# Statements kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 200
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestTimings:
+    __slots__ = ('sql_count', 'sql_seconds', 'serialize_seconds', 'serialize_depth', 'queries')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.serialize_depth = 0
+        self.queries = []
+
+
+current = contextvars.ContextVar('request_timings', default=None)
+
+
+@contextlib.contextmanager
+def serialize_timer():
+    """Counts the enclosed time as serialization; nested timers count once."""
+    timings = current.get()
+    if timings is None or timings.serialize_depth:
+        yield
+        return
+    timings.serialize_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serialize_seconds += time.perf_counter() - started
+        timings.serialize_depth -= 1
+
+
+class TimedSerializerMixin:
+    """Adds a serializer's to_representation time to the request's serialize timing."""
+
+    def to_representation(self, instance):
+        with serialize_timer():
+            return super().to_representation(instance)
+
+
+def record_sql(execute, sql, params, many, context):
+    timings = current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings.sql_count += 1
+        timings.sql_seconds += elapsed
+        if len(timings.queries) < MAX_LOGGED_QUERIES:
+            timings.queries.append((elapsed, sql))
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.responses = {}  # (method, status) -> count
+        self.slow = 0
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.sql_duration = Histogram(DURATION_BUCKETS)
+        self.serialize_duration = Histogram(DURATION_BUCKETS)
+        self.sql_queries = Histogram(QUERY_BUCKETS)
+
+
+# name -> (help, ViewMetrics attribute)
+HISTOGRAMS = {
+    'erp_request_duration_seconds': ('Total request time.', 'duration'),
+    'erp_request_sql_duration_seconds': ('Time spent in SQL per request.', 'sql_duration'),
+    'erp_request_serialize_duration_seconds': ('Time spent building and rendering response data.',
+                                               'serialize_duration'),
+    'erp_request_sql_queries': ('SQL statements per request.', 'sql_queries'),
+}
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values):
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in values.items()) + '}'
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.views = {}  # (view, tenant) -> ViewMetrics
+
+    def observe(self, view, tenant, method, status, timings, seconds, slow):
+        with self.lock:
+            metrics = self.views.get((view, tenant))
+            if metrics is None:
+                metrics = self.views[view, tenant] = ViewMetrics()
+            key = (method, status)
+            metrics.responses[key] = metrics.responses.get(key, 0) + 1
+            metrics.slow += slow
+            metrics.duration.observe(seconds)
+            metrics.sql_duration.observe(timings.sql_seconds)
+            metrics.serialize_duration.observe(timings.serialize_seconds)
+            metrics.sql_queries.observe(timings.sql_count)
+
+    def render(self):
+        """The registry and the process caches' counters in the Prometheus text format."""
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = [
+                '# HELP erp_requests_total Requests handled, by view, tenant, method and status.',
+                '# TYPE erp_requests_total counter',
+            ]
+            for (view, tenant), metrics in views:
+                for (method, status), count in sorted(metrics.responses.items()):
+                    series = labels(view=view, tenant=tenant, method=method, status=status)
+                    lines.append(f'erp_requests_total{series} {count}')
+            lines += [
+                f'# HELP erp_slow_requests_total Requests slower than {SLOW_REQUEST_MS} ms.',
+                '# TYPE erp_slow_requests_total counter',
+            ]
+            lines += [f'erp_slow_requests_total{labels(view=view, tenant=tenant)} {metrics.slow}'
+                      for (view, tenant), metrics in views]
+            for name, (help_text, attribute) in HISTOGRAMS.items():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (view, tenant), metrics in views:
+                    histogram = getattr(metrics, attribute)
+                    for bound, count in histogram.cumulative():
+                        lines.append(f'{name}_bucket{labels(view=view, tenant=tenant, le=bound)} {count}')
+                    lines.append(f'{name}_sum{labels(view=view, tenant=tenant)} {histogram.sum:.6f}')
+                    lines.append(f'{name}_count{labels(view=view, tenant=tenant)} {histogram.count}')
+        lines += cache_lines()
+        lines += pool_lines()
+        return '\n'.join(lines) + '\n'
+
+
+def cache_lines():
+    from public_tenant.middleware import tenant_cache
+    from .response_cache import stats as response_cache_stats
+
+    lines = []
+    for cache_name, stats in (('response', response_cache_stats.as_dict()), ('tenant', tenant_cache.stats())):
+        for counter in ('hits', 'misses'):
+            name = f'erp_{cache_name}_cache_{counter}_total'
+            lines += [f'# TYPE {name} counter', f'{name} {stats[counter]}']
+    return lines
+
+
+# name -> (help, type, ConnectionPool.stats() key)
+POOL_SERIES = {
+    'erp_db_pool_max_connections': ('Connections the pool may open.', 'gauge', 'max_size'),
+    'erp_db_pool_idle_connections': ('Open connections waiting in the pool.', 'gauge', 'idle'),
+    'erp_db_pool_in_use_connections': ('Connections checked out by requests.', 'gauge', 'in_use'),
+    'erp_db_pool_peak_in_use_connections': ('Most connections checked out at once.', 'gauge', 'peak_in_use'),
+    'erp_db_pool_checkouts_total': ('Connections handed out.', 'counter', 'checkouts'),
+    'erp_db_pool_tenant_hits_total': ('Checkouts served by a connection already on the tenant.', 'counter',
+                                      'tenant_hits'),
+    'erp_db_pool_waits_total': ('Checkouts that waited for a connection to come back.', 'counter', 'waits'),
+    'erp_db_pool_timeouts_total': ('Checkouts that gave up waiting.', 'counter', 'timeouts'),
+    'erp_db_pool_wait_seconds_total': ('Time spent getting a connection from the pool.', 'counter', 'wait_seconds'),
+    'erp_db_pool_max_wait_seconds': ('Longest wait for a connection.', 'gauge', 'max_wait_seconds'),
+    'erp_db_pool_opened_total': ('Connections opened.', 'counter', 'opened'),
+    'erp_db_pool_discarded_total': ('Broken or expired connections closed.', 'counter', 'discarded'),
+}
+
+
+def pool_lines():
+    from public_tenant.postgresql_backend.base import pool_stats, search_path_stats
+
+    pools = sorted(pool_stats().items())
+    lines = []
+    for name, (help_text, kind, key) in POOL_SERIES.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        lines += [f'{name}{labels(alias=alias)} {stats[key]}' for alias, stats in pools]
+    for counter, count in search_path_stats.as_dict().items():
+        name = f'erp_db_search_path_{counter}_total'
+        lines += [f'# TYPE {name} counter', f'{name} {count}']
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+def server_timing(timings, seconds):
+    return (
+        f'total;dur={seconds * 1000:.1f}, '
+        f'db;dur={timings.sql_seconds * 1000:.1f};desc="{timings.sql_count} queries", '
+        f'serialize;dur={timings.serialize_seconds * 1000:.1f}'
+    )
+
+
+def log_slow_request(request, view, tenant, timings, seconds):
+    slowest = sorted(timings.queries, key=lambda query: query[0], reverse=True)[:20]
+    logger.warning(
+        'Slow request %s %s (%s, tenant %s): %.0f ms, %d queries in %.0f ms, serialize %.0f ms\n%s',
+        request.method, request.path, view, tenant, seconds * 1000, timings.sql_count,
+        timings.sql_seconds * 1000, timings.serialize_seconds * 1000,
+        '\n'.join(f'  {elapsed * 1000:8.1f} ms  {sql}' for elapsed, sql in slowest),
+    )
+
+
+class MetricsMiddleware:
+    """Times requests for Server-Timing and /api/metrics/; goes first in MIDDLEWARE."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = current.set(timings)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(record_sql):
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        seconds = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unmatched'
+        tenant = getattr(getattr(request, 'tenant', None), 'schema_name', '')
+        slow = seconds * 1000 >= SLOW_REQUEST_MS
+        registry.observe(view, tenant, request.method, response.status_code, timings, seconds, slow)
+        if slow:
+            log_slow_request(request, view, tenant, timings, seconds)
+        if SERVER_TIMING:
+            response['Server-Timing'] = server_timing(timings, seconds)
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('profiles', '0011_alter_user_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='academicdecision',
+            index=models.Index(fields=['student', 'decision_type'], name='decision_student_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='academicdecision',
+            index=models.Index(condition=models.Q(('decision_type__in', ['first-warning', 'second-warning'])), fields=['student'], name='decision_warning_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['status', 'signedByDean'], name='meeting_status_signed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(condition=models.Q(('signedByDean', False), ('status', 'completed')), fields=['date'], name='meeting_to_sign_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recentactivity',
+            index=models.Index(fields=['-timestamp'], name='activity_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['gpa', 'department'], name='student_gpa_department_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['department', 'gpa'], name='student_department_gpa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studyplan',
+            index=models.Index(fields=['submission_status'], name='studyplan_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studyplan',
+            index=models.Index(fields=['teacher', 'submission_status'], name='studyplan_teacher_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'is_staff'], name='user_role_staff_idx'),
+        ),
+    ]
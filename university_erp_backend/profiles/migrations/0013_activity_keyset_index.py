@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0012_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='recentactivity',
+            name='activity_timestamp_idx',
+        ),
+        migrations.AddIndex(
+            model_name='recentactivity',
+            index=models.Index(fields=['-timestamp', '-id'], name='activity_timestamp_id_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0013_activity_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recentactivity',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0014_activity_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['day', 'room', 'start_time'], name='schedule_day_room_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['day', 'instructor', 'start_time'], name='schedule_day_instructor_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:57
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0016_schedule_meeting_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='meeting',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['participants'], name='meeting_participants_gin', opclasses=['jsonb_path_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['date'], name='meeting_completed_date_idx'),
+        ),
+    ]
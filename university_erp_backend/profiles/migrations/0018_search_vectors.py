@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Must match profiles.search.CONFIG
+CONFIG = 'english'
+
+
+def search_trigger(table, weighted_columns):
+    """RunSQL that keeps table.search_vector in sync with weighted_columns on every insert and update."""
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{CONFIG}', coalesce(NEW.{column}, '')), '{weight}')"
+        for column, weight in weighted_columns
+    )
+    columns = ', '.join(column for column, _ in weighted_columns)
+    first = weighted_columns[0][0]
+    return migrations.RunSQL(
+        sql=[
+            f"""CREATE FUNCTION {table}_search_vector() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql""",
+            f"""CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {columns} ON {table}
+            FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()""",
+            # Existing rows
+            f'UPDATE {table} SET {first} = {first}',
+        ],
+        reverse_sql=[
+            f'DROP TRIGGER {table}_search_vector ON {table}',
+            f'DROP FUNCTION {table}_search_vector()',
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0017_meeting_participant_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='meeting',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='studyplan',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        search_trigger('profiles_meeting', [('title', 'A'), ('agenda', 'B'), ('minutes', 'B'), ('description', 'C')]),
+        search_trigger('profiles_studyplan', [('subject_name', 'A'), ('plan_content', 'B')]),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='meeting_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studyplan',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='studyplan_search_idx'),
+        ),
+    ]
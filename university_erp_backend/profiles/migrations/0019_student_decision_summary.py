@@ -0,0 +1,50 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+# Students without decisions keep the defaults (0, NULL, NULL)
+BACKFILL = """
+UPDATE profiles_student AS s
+SET warnings_count = d.n, latest_decision_type = d.decision_type, latest_decision_at = d.issued_at
+FROM (
+    SELECT DISTINCT ON (student_id) student_id, decision_type, issued_at,
+           COUNT(*) OVER (PARTITION BY student_id) AS n
+    FROM profiles_academicdecision
+    ORDER BY student_id, issued_at DESC, id DESC
+) AS d
+WHERE d.student_id = s.user_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0018_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='latest_decision_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='latest_decision_type',
+            field=models.CharField(blank=True, choices=[('first-warning', 'First Warning'), ('second-warning', 'Second Warning'), ('dismissal', 'Academic Dismissal')], editable=False, max_length=20, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='warnings_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL, reverse_sql=migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['warnings_count', 'gpa'], name='student_warnings_gpa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['latest_decision_at'], name='student_latest_decision_idx'),
+        ),
+    ]
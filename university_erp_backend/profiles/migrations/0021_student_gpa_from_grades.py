@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 13:07
+
+from django.db import migrations, models
+
+# Students whose GPA profiles.gpa has already derived: those with a GPA-bearing grade
+BACKFILL = """
+UPDATE profiles_student AS s
+SET gpa_from_grades = true
+WHERE EXISTS (
+    SELECT 1
+    FROM profiles_grade AS g
+    JOIN profiles_enrollment AS e ON e.id = g.enrollment_id
+    WHERE e.student_id = s.user_id AND g.letter NOT IN ('P', 'W', 'I')
+)
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0020_enrollment_grade'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='gpa_from_grades',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='term_gpa',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+# profiles.occupancy compares each process's room occupancy index against this; a
+# sequence because nextval() is visible to every connection at once, committed or not
+SEQUENCE = 'profiles_room_occupancy_version'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0021_student_gpa_from_grades'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}',
+            reverse_sql=f'DROP SEQUENCE IF EXISTS {SEQUENCE}',
+        ),
+    ]
@@ -1,6 +1,9 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import authenticate
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -16,6 +19,9 @@ class User(AbstractUser):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='coordinator')
     department = models.CharField(max_length=255, null=True, blank=True)  # Added department field
     email = models.EmailField(unique=True, blank=False, null=False)  # Enforce unique email
+    # Versions responses that show a user's username or department (ETag); last_login and
+    # password changes are saved with update_fields and leave it alone
+    updated_at = models.DateTimeField(auto_now=True)
     # Custom fields if needed
     
     groups = models.ManyToManyField(
@@ -33,10 +39,20 @@ class User(AbstractUser):
 
     class Meta:
         db_table = 'profiles_user'  # Explicit table name
+        indexes = [
+            models.Index(fields=['role', 'is_staff'], name='user_role_staff_idx'),
+        ]
 
     def __str__(self):
         return self.username
 
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # A user built from JWT claims loads all of its remaining fields on
+        # first access instead of one query per deferred field.
+        if fields is not None and self.__dict__.get('_from_token'):
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using, fields, from_queryset)
+
 class Schedule(models.Model):
     """Manages course schedules and classroom assignments."""
     # Renamed from 'title' to 'course_name' to match React's 'courseName'
@@ -53,10 +69,24 @@ class Schedule(models.Model):
     # Renamed from 'location' to 'room' to match React's 'room'
     room = models.CharField(max_length=100)
     # You might want to add a 'course' foreign key here if you have a Course model
+    updated_at = models.DateTimeField(auto_now=True)  # versions list/detail responses (ETag)
+
+    class Meta:
+        indexes = [
+            # Double-booking checks look up overlapping slots per day and room/instructor
+            models.Index(fields=['day', 'room', 'start_time'], name='schedule_day_room_idx'),
+            models.Index(fields=['day', 'instructor', 'start_time'], name='schedule_day_instructor_idx'),
+        ]
 
     def __str__(self):
         return f"{self.course_name} by {self.instructor} on {self.day} at {self.start_time}"
 
+class SearchableManager(models.Manager):
+    """Leaves search_vector out of model queries; profiles.search reads it in SQL."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('search_vector')
+
 class Meeting(models.Model):
     """Organizes and tracks college council meetings and decisions."""
     title = models.CharField(max_length=255)
@@ -75,7 +105,26 @@ class Meeting(models.Model):
     signedByDean = models.BooleanField(default=False)
     department = models.CharField(max_length=255, null=True)
     signature = models.TextField(blank=True, null=True)  # New field for dean's signature
-    
+    updated_at = models.DateTimeField(auto_now=True)  # versions list/detail responses (ETag)
+    # title, agenda, minutes and description; filled by a database trigger (migration 0018)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = SearchableManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'signedByDean'], name='meeting_status_signed_idx'),
+            # Meetings waiting for the dean's signature (dashboard counter)
+            models.Index(
+                fields=['date'], name='meeting_to_sign_idx',
+                condition=models.Q(status='completed', signedByDean=False),
+            ),
+            # participants @> '["name"]' (participant filter, attendance report)
+            GinIndex(fields=['participants'], name='meeting_participants_gin', opclasses=['jsonb_path_ops']),
+            models.Index(fields=['date'], name='meeting_completed_date_idx', condition=models.Q(status='completed')),
+            GinIndex(fields=['search_vector'], name='meeting_search_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} on {self.date} at {self.time}"
 
@@ -111,9 +160,18 @@ class StudyPlan(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # subject_name and plan_content; filled by a database trigger (migration 0018)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = SearchableManager()
 
     class Meta:
         verbose_name_plural = "Study Plans"
+        indexes = [
+            models.Index(fields=['submission_status'], name='studyplan_status_idx'),
+            models.Index(fields=['teacher', 'submission_status'], name='studyplan_teacher_status_idx'),
+            GinIndex(fields=['search_vector'], name='studyplan_search_idx'),
+        ]
 
     def __str__(self):
         return f"Study Plan for {self.teacher.username} - {self.subject_name} ({self.submission_status})"
@@ -121,12 +179,16 @@ class StudyPlan(models.Model):
 class RecentActivity(models.Model):
     # ... (Keep your RecentActivity model as it was) ...
     description = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the activity happens, not when the buffered logger writes it
+    timestamp = models.DateTimeField(default=timezone.now)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='activities')
 
     class Meta:
         ordering = ['-timestamp']
         verbose_name_plural = "Recent Activities"
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='activity_timestamp_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.description} ({self.timestamp.strftime('%Y-%m-%d %H:%M')})"
@@ -144,18 +206,130 @@ class AcademicDecision(models.Model):
     notes = models.TextField(blank=True, null=True)
     gpa = models.CharField(max_length=20,null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', 'decision_type'], name='decision_student_type_idx'),
+            # Outstanding warnings (dashboard counter)
+            models.Index(
+                fields=['student'], name='decision_warning_idx',
+                condition=models.Q(decision_type__in=['first-warning', 'second-warning']),
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # The student's decision summary (profiles.standing) is refreshed by post_save
+        # inside this transaction, so the two are committed together
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.decision_type} for student ID {str(self.student_id)} by Dean ID {str(self.issued_by_id)}"
 
 class Student(models.Model):
+    # Written only by profiles.gpa and profiles.standing, with queryset updates
+    MAINTAINED_FIELDS = ('term_gpa', 'gpa_from_grades', 'warnings_count', 'latest_decision_type',
+                         'latest_decision_at')
+
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='student_profile')
+    # Cumulative and latest-term GPA, derived from Grades by profiles.gpa once the student
+    # has a GPA-bearing grade (gpa_from_grades); until then gpa is the value entered by hand
     gpa = models.FloatField(null=True, blank=True)
+    term_gpa = models.FloatField(null=True, blank=True, editable=False)
+    gpa_from_grades = models.BooleanField(default=False, editable=False)
     department = models.CharField(max_length=255, null=True, blank=True)
+    # Summary of the student's AcademicDecisions, maintained by profiles.standing
+    warnings_count = models.PositiveIntegerField(default=0, editable=False)
+    latest_decision_type = models.CharField(max_length=20, choices=AcademicDecision.DECISION_TYPE_CHOICES,
+                                            null=True, blank=True, editable=False)
+    latest_decision_at = models.DateTimeField(null=True, blank=True, editable=False)
     # Add any other student-specific fields here
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['gpa', 'department'], name='student_gpa_department_idx'),
+            models.Index(fields=['department', 'gpa'], name='student_department_gpa_idx'),
+            # ?warnings=N&gpa=... and sorting by warnings
+            models.Index(fields=['warnings_count', 'gpa'], name='student_warnings_gpa_idx'),
+            models.Index(fields=['latest_decision_at'], name='student_latest_decision_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get('force_insert') or kwargs.get('update_fields') is not None:
+            return super().save(*args, **kwargs)
+        # A full-row save (the admin, a serializer) would write back the copies of the maintained
+        # columns loaded with the instance, undoing any recompute since; gpa too once it is derived
+        using = kwargs.get('using') or router.db_for_write(Student, instance=self)
+        with transaction.atomic(using=using):
+            derived = (Student._base_manager.using(using).select_for_update()
+                       .filter(pk=self.pk).values_list('gpa_from_grades', flat=True).first())
+            if derived is None:
+                # No row to update; Django inserts one
+                return super().save(*args, **kwargs)
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+                and not (derived and field.name == 'gpa')
+            ]
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return self.user.get_full_name() or self.user.username
 
+class Enrollment(models.Model):
+    """A student taking a course in one term."""
+    # In calendar order within a year
+    SEMESTER_CHOICES = [
+        ('spring', 'Spring'),
+        ('summer', 'Summer'),
+        ('fall', 'Fall'),
+    ]
+    student = models.ForeignKey('User', on_delete=models.CASCADE, related_name='enrollments')
+    course_code = models.CharField(max_length=20)
+    course_name = models.CharField(max_length=255, blank=True)
+    credit_hours = models.DecimalField(max_digits=4, decimal_places=1)
+    year = models.PositiveSmallIntegerField()
+    semester = models.CharField(max_length=10, choices=SEMESTER_CHOICES)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'year', 'semester', 'course_code'],
+                                    name='enrollment_student_term_course_uniq'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # post_save recomputes the student's GPA inside this transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.course_code} {self.semester} {self.year} for student ID {self.student_id}"
+
+class Grade(models.Model):
+    """The final grade of an enrollment; student GPAs are derived from these (profiles.gpa)."""
+    LETTER_CHOICES = [
+        ('A', 'A'), ('A-', 'A-'), ('B+', 'B+'), ('B', 'B'), ('B-', 'B-'), ('C+', 'C+'), ('C', 'C'),
+        ('C-', 'C-'), ('D+', 'D+'), ('D', 'D'), ('F', 'F'),
+        ('P', 'Pass'), ('W', 'Withdrawn'), ('I', 'Incomplete'),
+    ]
+    # Grade points per letter; P, W and I do not count towards the GPA
+    POINTS = {
+        'A': 4.0, 'A-': 3.7, 'B+': 3.3, 'B': 3.0, 'B-': 2.7, 'C+': 2.3, 'C': 2.0,
+        'C-': 1.7, 'D+': 1.3, 'D': 1.0, 'F': 0.0,
+    }
+    enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name='grade')
+    letter = models.CharField(max_length=2, choices=LETTER_CHOICES)
+    graded_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='grades_given')
+    graded_at = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        # post_save recomputes the student's GPA inside this transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.letter} in enrollment ID {self.enrollment_id}"
+
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_student_profile(sender, instance, created, **kwargs):
     if created and instance.role == 'student':
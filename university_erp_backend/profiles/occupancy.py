@@ -0,0 +1,165 @@
+"""Room occupancy index for free-room searches.
+
+Each room has one bitmap per weekday, one bit per ROOM_OCCUPANCY_RESOLUTION
+minutes (5 by default, so 288 bits a day). A room is free for a range when
+its bitmap ANDed with the range's mask is zero.
+
+The index lives in process, one per tenant schema. It is built from Schedule
+on first use and then patched on every committed save and delete. Each
+write also bumps the schema's version sequence (migration 0022), which
+every worker reads from the database, not from a per-process cache. A
+process whose index has fallen behind that number (another worker wrote)
+rebuilds it on its next search. The index also remembers which sequence it
+was built against: a schema that is dropped and created again (seed_tenants
+--reset) starts a new sequence from zero, and the same number there does
+not mean the same timetable.
+"""
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import Schedule
+
+RESOLUTION = getattr(settings, 'ROOM_OCCUPANCY_RESOLUTION', 5)  # minutes per bit
+VERSION_SEQUENCE = 'profiles_room_occupancy_version'
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+def range_mask(start, end):
+    """Bits covering [start, end); partly covered buckets count as taken."""
+    first = int(to_minutes(start) // RESOLUTION)
+    last = math.ceil(to_minutes(end) / RESOLUTION)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+class RoomOccupancyIndex:
+    def __init__(self, version=0, sequence=None):
+        self.version = version
+        self.sequence = sequence  # oid of the version sequence it was built against
+        self.slots = {}  # slot id -> (room, day, mask)
+        self.slot_masks = defaultdict(dict)  # (room, day) -> {slot id: mask}
+        self.occupancy = defaultdict(dict)  # room -> {day: bitmap}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls, version=0, queryset=None, sequence=None):
+        index = cls(version, sequence)
+        queryset = Schedule.objects.all() if queryset is None else queryset
+        for slot in queryset.values_list('id', 'room', 'day', 'start_time', 'end_time').iterator(chunk_size=5000):
+            index._add(*slot)
+        return index
+
+    def add(self, slot_id, room, day, start, end):
+        with self.lock:
+            self._remove(slot_id)
+            self._add(slot_id, room, day, start, end)
+
+    def remove(self, slot_id):
+        with self.lock:
+            self._remove(slot_id)
+
+    def free_rooms(self, day, start, end):
+        mask = range_mask(start, end)
+        with self.lock:
+            return sorted(room for room, days in self.occupancy.items() if not days.get(day, 0) & mask)
+
+    def is_free(self, room, day, start, end):
+        with self.lock:
+            return not self.occupancy.get(room, {}).get(day, 0) & range_mask(start, end)
+
+    def _add(self, slot_id, room, day, start, end):
+        mask = range_mask(start, end)
+        self.slots[slot_id] = (room, day, mask)
+        self.slot_masks[room, day][slot_id] = mask
+        self.occupancy[room][day] = self.occupancy[room].get(day, 0) | mask
+
+    def _remove(self, slot_id):
+        if slot_id not in self.slots:
+            return
+        room, day, _ = self.slots.pop(slot_id)
+        masks = self.slot_masks[room, day]
+        del masks[slot_id]
+        # Overlapping slots can share bits, so re-OR whatever is left
+        bitmap = 0
+        for mask in masks.values():
+            bitmap |= mask
+        self.occupancy[room][day] = bitmap
+        if not masks:
+            del self.slot_masks[room, day]
+
+
+_indexes = {}  # schema name -> RoomOccupancyIndex
+_indexes_lock = threading.Lock()
+
+
+def shared_version():
+    """(sequence oid, version) of the schema as every process sees it; version 0 before the first write."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT %s::regclass::oid, CASE WHEN is_called THEN last_value ELSE 0 END '
+                       f'FROM {VERSION_SEQUENCE}', [VERSION_SEQUENCE])
+        return cursor.fetchone()
+
+
+def bump_version():
+    """(sequence oid, new version)"""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT %s::regclass::oid, nextval(%s)', [VERSION_SEQUENCE, VERSION_SEQUENCE])
+        return cursor.fetchone()
+
+
+def get_index():
+    """The current tenant's index, rebuilt if another process has written since it was built."""
+    schema = connection.schema_name
+    sequence, version = shared_version()
+    index = _indexes.get(schema)
+    if index is None or (index.sequence, index.version) != (sequence, version):
+        index = RoomOccupancyIndex.build(version, sequence=sequence)
+        with _indexes_lock:
+            _indexes[schema] = index
+    return index
+
+
+def invalidate_room_occupancy():
+    """Forces a rebuild everywhere; use after bulk writes that bypass model signals."""
+    bump_version()
+
+
+def _apply(schema, change):
+    sequence, version = bump_version()
+    index = _indexes.get(schema)
+    if index is None:
+        return
+    if index.sequence == sequence and index.version == version - 1:
+        change(index)
+        index.version = version
+    else:
+        # Missed someone else's write; rebuild on the next search.
+        with _indexes_lock:
+            _indexes.pop(schema, None)
+
+
+def update_on_save(sender, instance, raw=False, **kwargs):
+    schema = connection.schema_name
+    # Values assigned as strings are only converted when the row is read back
+    start = Schedule._meta.get_field('start_time').to_python(instance.start_time)
+    end = Schedule._meta.get_field('end_time').to_python(instance.end_time)
+    slot = (instance.pk, instance.room, instance.day, start, end)
+    transaction.on_commit(lambda: _apply(schema, lambda index: index.add(*slot)))
+
+
+def update_on_delete(sender, instance, **kwargs):
+    schema, slot_id = connection.schema_name, instance.pk
+    transaction.on_commit(lambda: _apply(schema, lambda index: index.remove(slot_id)))
+
+
+post_save.connect(update_on_save, sender=Schedule, dispatch_uid='room-occupancy-save')
+post_delete.connect(update_on_delete, sender=Schedule, dispatch_uid='room-occupancy-delete')
@@ -0,0 +1,176 @@
+import base64
+import json
+from functools import reduce
+import operator
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a unique ordering key such as ('-timestamp', '-id').
+
+    Pages are found with a WHERE on the last row's key instead of an OFFSET,
+    and no COUNT(*) is issued, so deep pages cost the same as the first one.
+    The cursor is an opaque base64 token of the boundary row's key values.
+    Views pick the key with a ``keyset_ordering`` attribute; every field in it
+    must be non-null and the last one must make the key unique.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    ordering = ('-id',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.descending = self.ordering[0].startswith('-')
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['r'])
+        if reverse:
+            queryset = queryset.order_by(*(self._flip(field) for field in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            # Walking backwards through a descending key means looking for larger values.
+            lookup = 'lt' if self.descending != reverse else 'gt'
+            queryset = queryset.filter(self._after(cursor['p'], lookup))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            # Ran off the end (e.g. rows were deleted); point back at the first page.
+            return replace_query_param(self.base_url, self.cursor_query_param, '')
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        position = [getattr(row, field) for field in self.fields]
+        payload = json.dumps({'p': [self._dump(value) for value in position], 'r': int(reverse)},
+                             separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            position = [
+                model._meta.get_field('id' if field == 'pk' else field).to_python(value)
+                for field, value in zip(self.fields, payload['p'], strict=True)
+            ]
+            return {'p': position, 'r': bool(payload.get('r'))}
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def _after(self, position, lookup):
+        # Lexicographic "key > position": (a > x) OR (a = x AND b > y) OR ...
+        clauses = []
+        for i, field in enumerate(self.fields):
+            equal = {name: value for name, value in zip(self.fields[:i], position[:i])}
+            clauses.append(Q(**equal, **{f'{field}__{lookup}': position[i]}))
+        # The redundant a >= x bound gives the planner an index range to scan.
+        return Q(**{f'{self.fields[0]}__{lookup}e': position[0]}) & reduce(operator.or_, clauses)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    @staticmethod
+    def _dump(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; a request carrying a ``cursor``
+    parameter (``?cursor=`` for the first page) switches to keyset paging.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        if not queryset.ordered and getattr(view, 'keyset_ordering', None):
+            queryset = queryset.order_by(*view.keyset_ordering)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Page-number pagination of ranked search hits, ?page_size= up to
+    max_page_size. paginate() takes fetch(offset, limit) -> (rows, total)
+    instead of a queryset, so the page and the total can come from one query.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+    def paginate(self, fetch, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            number = int(page_number)
+        except ValueError:
+            number = 0
+        if number < 1:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message='Invalid page.'))
+        rows, total = fetch((number - 1) * page_size, page_size)
+        paginator = self.django_paginator_class(rows, page_size)
+        paginator.count = total
+        if number > paginator.num_pages:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message='That page contains no results'))
+        self.page = paginator._get_page(rows, number, paginator)
+        return rows
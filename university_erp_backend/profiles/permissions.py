@@ -1,4 +1,8 @@
+import hmac
+
+from django.conf import settings
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from django_tenants.utils import get_public_schema_name
 
 class IsDean(BasePermission):
     def has_permission(self, request, view):
@@ -19,4 +23,20 @@ class IsTeacherOrAdminOrReadOnly(BasePermission):
     def has_permission(self, request, view):
         if request.method in SAFE_METHODS:
             return True
-        return request.user.is_authenticated and request.user.role in ['teacher', 'admin'] 
\ No newline at end of file
+        return request.user.is_authenticated and request.user.role in ['teacher', 'admin'] 
+
+class IsCentralAdmin(BasePermission):
+    """Admins of the public schema, who see numbers across every tenant."""
+    def has_permission(self, request, view):
+        tenant = getattr(request, 'tenant', None)
+        return (
+            IsAdmin().has_permission(request, view)
+            and tenant is not None and tenant.schema_name == get_public_schema_name()
+        )
+
+class HasMetricsToken(BasePermission):
+    """Scrapers sending ``Authorization: Metrics <METRICS_TOKEN>``; JWT authentication ignores that scheme."""
+    def has_permission(self, request, view):
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(token) and hmac.compare_digest(header.encode(), f'Metrics {token}'.encode())
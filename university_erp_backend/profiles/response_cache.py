@@ -0,0 +1,167 @@
+"""Cached list/retrieve responses for read-heavy viewsets.
+
+Entries hold the serialized response data and live in the cache named by
+RESPONSE_CACHE_ALIAS, so any Django backend (local memory, file, database,
+Redis...) can be plugged in. Keys carry the tenant schema, the model's
+generation number, the path, the sorted query parameters and the user's
+role. Committing a save or delete of the model bumps its generation, which
+makes every older entry for that model and tenant unreachable; they simply
+expire.
+
+The generation numbers live in the same cache, so invalidation reaches
+every process only when the backend is shared between them. A process-local
+backend (LocMemCache) is for single-process use: with more than one server
+worker (SERVER_WORKERS) a write would only bump the generation in the
+worker that handled it, so enabled() turns the cache off instead.
+"""
+import hashlib
+import pickle
+import threading
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models.signals import post_save, post_delete
+from django_tenants.utils import schema_context
+from rest_framework.response import Response
+
+from .deployment import is_process_local, server_workers
+from .models import Schedule, Meeting
+
+ALIAS = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+class ResponseCacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.hits = self.misses = self.stores = self.bytes_stored = self.largest_entry = 0
+
+    def hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def miss(self, size):
+        with self.lock:
+            self.misses += 1
+            if size is not None:
+                self.stores += 1
+                self.bytes_stored += size
+                self.largest_entry = max(self.largest_entry, size)
+
+    def as_dict(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'alias': ALIAS,
+                'enabled': enabled(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries_stored': self.stores,
+                'average_entry_bytes': self.bytes_stored // self.stores if self.stores else 0,
+                'largest_entry_bytes': self.largest_entry,
+            }
+
+
+stats = ResponseCacheStats()
+
+
+def response_cache():
+    return caches[ALIAS]
+
+
+def enabled():
+    """False when the workers cannot see each other's invalidations."""
+    return server_workers() <= 1 or not is_process_local(ALIAS)
+
+
+def generation_key(model):
+    return f'response-cache:{connection.schema_name}:{model._meta.label_lower}:generation'
+
+
+def generation(model):
+    key = generation_key(model)
+    value = response_cache().get(key)
+    if value is None:
+        response_cache().add(key, 0, None)
+        value = response_cache().get(key, 0)
+    return value
+
+
+def bump_generation(model):
+    key = generation_key(model)
+    cache = response_cache()
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr; a fresh generation works just as well
+        cache.set(key, 1, None)
+
+
+def invalidate_on_commit(sender, **kwargs):
+    schema = connection.schema_name
+    transaction.on_commit(lambda: _bump_in_schema(schema, sender))
+
+
+def _bump_in_schema(schema, model):
+    # on_commit normally runs while the connection is still on the writer's schema
+    if connection.schema_name == schema:
+        bump_generation(model)
+    else:
+        with schema_context(schema):
+            bump_generation(model)
+
+
+class ResponseCacheMixin:
+    """
+    Serves list and retrieve from the response cache. Only successful
+    responses are stored. The viewset's model must be in CACHED_MODELS so
+    its writes invalidate the entries.
+    """
+    cache_timeout = TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(ResponseCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(ResponseCacheMixin, self).retrieve(request, *args, **kwargs))
+
+    def response_cache_key(self, request):
+        model = self.get_queryset().model
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        role = getattr(request.user, 'role', None)
+        # The paginated body holds absolute next/previous links, so the scheme and host are part of it
+        digest = hashlib.md5(f'{request.scheme}://{request.get_host()}{request.path}?{query}|{role}'.encode()).hexdigest()
+        return f'response-cache:{connection.schema_name}:{model._meta.label_lower}:{generation(model)}:{digest}'
+
+    def cached_response(self, request, render):
+        if not enabled():
+            return render()
+        key = self.response_cache_key(request)
+        payload = response_cache().get(key)
+        if payload is not None:
+            stats.hit()
+            return Response(pickle.loads(payload))
+        response = render()
+        size = None
+        if response.status_code == 200:
+            # Stored pre-pickled so the entry size is known whatever the backend
+            payload = pickle.dumps(response.data, pickle.HIGHEST_PROTOCOL)
+            size = len(payload)
+            response_cache().set(key, payload, self.cache_timeout)
+        stats.miss(size)
+        return response
+
+
+# Models whose writes invalidate cached responses
+CACHED_MODELS = (Schedule, Meeting)
+
+for _model in CACHED_MODELS:
+    post_save.connect(invalidate_on_commit, sender=_model, dispatch_uid=f'response-cache-save-{_model.__name__}')
+    post_delete.connect(invalidate_on_commit, sender=_model, dispatch_uid=f'response-cache-delete-{_model.__name__}')
@@ -0,0 +1,100 @@
+"""Full-text search over meetings and study plans.
+
+Meeting (title, agenda, minutes, description) and StudyPlan (subject_name,
+plan_content) store a weighted search_vector that a database trigger
+rebuilds whenever those columns are written, bulk writes included, and a
+GIN index over it (migration 0018). matches() finds a web-style query
+("exact phrase", or, -word) in both tables with one UNION ALL and ranks
+the hits together with ts_rank; ranked_page() takes one page of them and
+hits() builds highlighted snippets only for the rows of that page.
+"""
+import html
+from dataclasses import dataclass
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, TextField, Value
+from django.db.models.functions import Concat
+
+from .models import Meeting, StudyPlan
+
+CONFIG = 'english'  # the trigger functions in migration 0018 use the same configuration
+# ts_headline marks matches with these; the snippet is HTML-escaped before they become <mark>
+START_SEL, STOP_SEL = '\x02', '\x03'
+
+
+@dataclass(frozen=True)
+class Source:
+    model: type
+    title: str
+    date: str
+    text: tuple  # the columns the trigger indexes, in order
+
+
+SOURCES = {
+    'meeting': Source(Meeting, 'title', 'date', ('title', 'agenda', 'minutes', 'description')),
+    'study_plan': Source(StudyPlan, 'subject_name', 'created_at', ('subject_name', 'plan_content')),
+}
+
+
+def search_query(text):
+    return SearchQuery(text, search_type='websearch', config=CONFIG)
+
+
+def matches(query, kinds=tuple(SOURCES)):
+    """(kind, id, rank) rows of every match, best first; slice it to get a page."""
+    querysets = [
+        SOURCES[kind].model.objects.filter(search_vector=query)
+        .annotate(kind=Value(kind), rank=SearchRank(F('search_vector'), query))
+        .values_list('kind', 'id', 'rank')
+        for kind in kinds
+    ]
+    combined = querysets[0].union(*querysets[1:], all=True) if len(querysets) > 1 else querysets[0]
+    return combined.order_by('-rank', 'kind', '-id')
+
+
+def ranked_page(query, kinds, offset, limit):
+    """
+    (rows, total): a slice of matches() and the number of matches, in one query.
+    Ranking has to read every match anyway, so a separate COUNT would read
+    them all a second time.
+    """
+    sql, params = matches(query, kinds).order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT kind, id, rank, COUNT(*) OVER () FROM ({sql}) AS m(kind, id, rank) '
+            'ORDER BY rank DESC, kind, id DESC LIMIT %s OFFSET %s',
+            (*params, limit, offset),
+        )
+        rows = cursor.fetchall()
+    if rows:
+        return [row[:3] for row in rows], rows[0][3]
+    # Past the last match the window has no row to report the total on
+    return [], matches(query, kinds).count() if offset else 0
+
+
+def snippet(headline):
+    return html.escape(headline).replace(START_SEL, '<mark>').replace(STOP_SEL, '</mark>')
+
+
+def hits(rows, query):
+    """The page's (kind, id, rank) rows as results with title, date and a highlighted snippet."""
+    details = {}
+    for kind, source in SOURCES.items():
+        ids = [pk for row_kind, pk, _ in rows if row_kind == kind]
+        if not ids:
+            continue
+        text = Concat(*(part for column in source.text for part in (column, Value(' '))),
+                      output_field=TextField())
+        headline = SearchHeadline(text, query, config=CONFIG, start_sel=START_SEL, stop_sel=STOP_SEL,
+                                  max_fragments=2, max_words=30, min_words=10)
+        for pk, title, date, headline_text in (
+            source.model.objects.filter(pk__in=ids).annotate(headline=headline)
+            .values_list('id', source.title, source.date, 'headline')
+        ):
+            details[kind, pk] = (title, date, snippet(headline_text))
+    return [
+        {'type': kind, 'id': pk, 'title': details[kind, pk][0], 'date': details[kind, pk][1],
+         'rank': rank, 'snippet': details[kind, pk][2]}
+        for kind, pk, rank in rows if (kind, pk) in details
+    ]
@@ -0,0 +1,183 @@
+"""Synthetic tenant data for load tests and benchmarks.
+
+seed_tenant() bulk-loads users, student profiles, academic decisions, study
+plans, meetings, schedules and activity into the current schema with
+distributions close to a real faculty: GPAs cluster around 2.9, warnings
+follow low GPAs, a few departments and teachers own most of the rows, past
+meetings are completed and mostly signed, and the timetable has no double
+bookings. The same ``seed`` always produces the same rows.
+"""
+import datetime
+import math
+import random
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .models import User, Student, AcademicDecision, StudyPlan, Meeting, RecentActivity, Schedule
+from .occupancy import invalidate_room_occupancy
+from .response_cache import CACHED_MODELS, bump_generation
+from .stats import invalidate_dashboard_stats
+from .standing import refresh_summaries
+
+# Password given to seeded accounts by the seed_tenants command
+DEFAULT_PASSWORD = 'seed-password'
+
+FIRST_NAMES = ['Adam', 'Lina', 'Omar', 'Sara', 'Yusuf', 'Maya', 'Karim', 'Nour', 'Ali', 'Huda',
+               'Sami', 'Rana', 'Ziad', 'Dana', 'Fadi', 'Leen', 'Tariq', 'Jana', 'Hadi', 'Aya']
+LAST_NAMES = ['Haddad', 'Khalil', 'Nasser', 'Saleh', 'Mansour', 'Farah', 'Aziz', 'Hamdan',
+              'Qasim', 'Rahman', 'Darwish', 'Yousef', 'Salem', 'Ibrahim', 'Najjar', 'Bakr']
+SEMESTERS = ['Fall 2024', 'Spring 2025', 'Summer 2025', 'Fall 2025']
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+HOURS = range(8, 18)
+# status -> share of plans; most plans of a running semester are already through review
+PLAN_STATUSES = {'approved': 55, 'submitted': 20, 'pending_review': 10, 'not_submitted': 15}
+ACTIVITY_TEMPLATES = [
+    'Created study plan "{subject}"', 'Updated schedule "{subject}"', 'Approved study plan "{subject}"',
+    'Created meeting "{meeting}"', 'Issued First Warning to {student}', 'Updated meeting "{meeting}"',
+]
+
+
+def department_weights(departments):
+    # A few large departments and a long tail, roughly Zipf
+    return [1 / (rank + 1) for rank in range(departments)]
+
+
+def random_gpa(rng):
+    return round(min(4.0, max(0.0, rng.gauss(2.9, 0.6))), 2)
+
+
+def warnings_for(gpa, rng):
+    """The decisions a student with this GPA has collected so far, oldest first."""
+    if gpa is None or gpa >= 2.0:
+        return ['first-warning'] if gpa is not None and gpa < 2.5 and rng.random() < 0.03 else []
+    decisions = ['first-warning'] if rng.random() < 0.8 else []
+    if decisions and gpa < 1.7 and rng.random() < 0.5:
+        decisions.append('second-warning')
+        if gpa < 1.3 and rng.random() < 0.3:
+            decisions.append('dismissal')
+    return decisions
+
+
+def timetable(rng, count, instructors):
+    """``count`` (day, hour, room, instructor) slots with no room or instructor booked twice."""
+    rooms = max(1, math.ceil(count / (len(WEEKDAYS) * len(HOURS) * 0.8)))
+    cells = [(day, hour, room) for day in WEEKDAYS for hour in HOURS for room in range(rooms)]
+    rng.shuffle(cells)
+    busy, slots = set(), []
+    for day, hour, room in cells:
+        if len(slots) == count:
+            break
+        free = [name for name in rng.sample(instructors, min(len(instructors), 5)) if (day, hour, name) not in busy]
+        if free:
+            busy.add((day, hour, free[0]))
+            slots.append((day, hour, f'Room {room + 1:03d}', free[0]))
+    return slots
+
+
+def seed_tenant(students=0, teachers=0, plans=0, meetings=0, activities=0, schedules=0,
+                departments=20, password=None, seed=42):
+    """Bulk-loads synthetic rows into the current tenant schema; returns the number of rows per model."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    hashed = make_password(password)
+    weights = department_weights(departments)
+
+    def department():
+        return f'Dept {rng.choices(range(departments), weights)[0]}'
+
+    def name(i):
+        return FIRST_NAMES[i % len(FIRST_NAMES)], LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]
+
+    dean = User.objects.create(username='seed-dean', email='seed-dean@example.com', role='dean',
+                               department='Dept 0', password=hashed)
+    User.objects.create(username='seed-admin', email='seed-admin@example.com', role='admin',
+                        is_staff=True, password=hashed)
+    teacher_users = User.objects.bulk_create(
+        User(username=f'seed-teacher{i}', email=f'seed-teacher{i}@example.com', role='teacher',
+             first_name=name(i)[0], last_name=name(i)[1], department=f'Dept {i % departments}', password=hashed)
+        for i in range(teachers)
+    )
+    student_users = User.objects.bulk_create(
+        (User(username=f'seed-student{i}', email=f'seed-student{i}@example.com', role='student',
+              first_name=name(i)[0], last_name=name(i)[1], password=hashed)
+         for i in range(students)),
+        batch_size=1000,
+    )
+    # bulk_create skips the post_save hook that creates profiles; new students have no GPA yet
+    profiles = Student.objects.bulk_create(
+        (Student(user=user, gpa=random_gpa(rng) if rng.random() > 0.02 else None, department=department())
+         for user in student_users),
+        batch_size=1000,
+    )
+    decisions = AcademicDecision.objects.bulk_create(
+        (AcademicDecision(student=profile.user, issued_by=dean, decision_type=decision_type,
+                          gpa=str(profile.gpa), notes='Generated')
+         for profile in profiles for decision_type in warnings_for(profile.gpa, rng)),
+        batch_size=1000,
+    )
+
+    # Some teachers own many plans, most own a few
+    teacher_weights = [rng.paretovariate(1.5) for _ in teacher_users]
+    plan_rows = []
+    for i in range(plans if teacher_users else 0):
+        submission_status = rng.choices(list(PLAN_STATUSES), list(PLAN_STATUSES.values()))[0]
+        submitted = submission_status != 'not_submitted'
+        plan_rows.append(StudyPlan(
+            teacher=rng.choices(teacher_users, teacher_weights)[0], subject_name=f'Subject {i}',
+            instructor_name=' '.join(name(i)), semester=rng.choice(SEMESTERS), submission_status=submission_status,
+            submitted_at=now - datetime.timedelta(days=rng.randint(1, 120)) if submitted else None,
+            students_count=rng.randint(8, 120),
+            progress_percentage=Decimal(rng.randint(40, 100) if submitted else rng.randint(0, 40)),
+            plan_content='Weekly topics, assessments and reading list.',
+        ))
+    StudyPlan.objects.bulk_create(plan_rows, batch_size=1000)
+
+    participants = [u.get_full_name() for u in teacher_users] or [' '.join(name(i)) for i in range(30)]
+    meeting_rows = []
+    for i in range(meetings):
+        # Two years of history and the next two months
+        date = now.date() + datetime.timedelta(days=rng.randint(-730, 60))
+        past = date < now.date()
+        hour = rng.choice(HOURS)
+        members = rng.sample(participants, min(len(participants), rng.randint(2, 8)))
+        meeting_rows.append(Meeting(
+            title=f'Meeting {i}', date=date, time=f'{hour}:00 - {hour + 1}:30',
+            location=f'Hall {rng.randint(1, 5)}', description='Council meeting', agenda='Plans, warnings, schedules',
+            participants=members, attendees=len(members), status='completed' if past else 'upcoming',
+            signedByDean=past and rng.random() < 0.9, department=department(),
+            minutes='Decisions recorded.' if past else None,
+        ))
+    Meeting.objects.bulk_create(meeting_rows, batch_size=1000)
+
+    instructors = [u.username for u in teacher_users] or [f'Instructor {i}' for i in range(max(1, schedules // 20))]
+    schedule_rows = Schedule.objects.bulk_create(
+        (Schedule(course_name=f'Course {i}', instructor=instructor, day=day, room=room,
+                  start_time=datetime.time(hour), end_time=datetime.time(hour, 50))
+         for i, (day, hour, room, instructor) in enumerate(timetable(rng, schedules, instructors))),
+        batch_size=1000,
+    )
+
+    actors = [dean] + teacher_users
+    RecentActivity.objects.bulk_create(
+        (RecentActivity(
+            description=rng.choice(ACTIVITY_TEMPLATES).format(
+                subject=f'Subject {rng.randrange(max(plans, 1))}', meeting=f'Meeting {rng.randrange(max(meetings, 1))}',
+                student=f'seed-student{rng.randrange(max(students, 1))}'),
+            timestamp=now - datetime.timedelta(seconds=rng.randint(0, 90 * 24 * 3600)), user=rng.choice(actors),
+        ) for _ in range(activities)),
+        batch_size=1000,
+    )
+
+    # bulk_create sends no signals, so refresh what they maintain
+    refresh_summaries(profile.user_id for profile in profiles)
+    invalidate_dashboard_stats()
+    invalidate_room_occupancy()
+    for model in CACHED_MODELS:
+        bump_generation(model)
+    return {
+        'users': 2 + len(teacher_users) + len(student_users), 'students': len(profiles),
+        'decisions': len(decisions), 'plans': len(plan_rows), 'meetings': len(meeting_rows),
+        'schedules': len(schedule_rows), 'activities': activities,
+    }
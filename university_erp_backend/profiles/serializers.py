@@ -2,13 +2,16 @@ from rest_framework import serializers
 from .models import Schedule, Meeting, StudyPlan, RecentActivity, User, AcademicDecision
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from .conflicts import slot_conflicts
+from .authentication import add_user_claims
+from .metrics import TimedSerializerMixin
 
 class CustomUserCreateSerializer(UserCreateSerializer):
     class Meta(UserCreateSerializer.Meta):
         model = User
         fields = ('id', 'username', 'email', 'password')
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
     class Meta(UserSerializer.Meta):
         model = User
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'role') # Include role field
@@ -17,38 +20,54 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        # Add custom claims
-        token['role'] = user.role
-        return token
+        # Add custom claims; ClaimJWTAuthentication builds request.user from them
+        return add_user_claims(token, user)
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Schedule
         fields = '__all__'
 
-class MeetingSerializer(serializers.ModelSerializer):
+    def validate(self, attrs):
+        # Partial updates are checked against the slot as it would be saved
+        slot = {field: attrs.get(field, getattr(self.instance, field, None))
+                for field in ('day', 'start_time', 'end_time', 'room', 'instructor')}
+        if slot['start_time'] >= slot['end_time']:
+            raise serializers.ValidationError({'end_time': 'End time must be after start time.'})
+        clashes = slot_conflicts(slot['day'], slot['start_time'], slot['end_time'], slot['room'],
+                                 slot['instructor'], exclude_pk=getattr(self.instance, 'pk', None))
+        messages = [
+            f"{'Room' if clash.room == slot['room'] else 'Instructor'} already booked for "
+            f"{clash.course_name} ({clash.start_time:%H:%M}-{clash.end_time:%H:%M}, slot {clash.pk})"
+            for clash in clashes[:10]
+        ]
+        if messages:
+            raise serializers.ValidationError({'conflicts': messages})
+        return attrs
+
+class MeetingSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Meeting
-        fields = '__all__'
+        exclude = ['search_vector']
 
-class StudyPlanSerializer(serializers.ModelSerializer):
+class StudyPlanSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     teacher_username = serializers.CharField(source='teacher.username', read_only=True)
     department = serializers.SerializerMethodField()
 
     class Meta:
         model = StudyPlan
-        fields = '__all__'
+        exclude = ['search_vector']
         read_only_fields = ['teacher'] # Teacher should be set based on the logged-in user
 
     def get_department(self, obj):
         return obj.teacher.department if obj.teacher and hasattr(obj.teacher, 'department') else None
 
-class RecentActivitySerializer(serializers.ModelSerializer):
+class RecentActivitySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = RecentActivity
         fields = '__all__'
 
-class AcademicDecisionSerializer(serializers.ModelSerializer):
+class AcademicDecisionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     student_username = serializers.CharField(source='student.username', read_only=True)
     issued_by_username = serializers.CharField(source='issued_by.username', read_only=True)
 
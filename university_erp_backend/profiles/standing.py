@@ -0,0 +1,69 @@
+"""Academic decision summary stored on Student.
+
+Student.warnings_count (every AcademicDecision of the student, which is what
+the dean screens show as previous warnings), latest_decision_type and
+latest_decision_at are kept in step with the student's decisions, so
+filters and sorts on them are indexed column predicates instead of a COUNT
+over academic_decisions per student.
+
+refresh_summaries() recomputes the summary of some students from their
+decisions. It locks their Student rows first (in user id order, so
+concurrent writers cannot deadlock); the recompute then runs after any
+concurrent writer to the same student has committed and sees its decision.
+Saving or deleting a decision refreshes its student in the same transaction
+(AcademicDecision.save() and deletes are atomic); bulk_create() callers call
+refresh_summaries() themselves. Writes that skip both, such as a queryset
+update() of decisions or raw SQL, are fixed by the repair_decision_summaries
+command.
+"""
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_init, post_save, post_delete
+
+from .models import AcademicDecision, Student
+
+
+def summary_columns():
+    """Student.update() kwargs that recompute the summary from academic_decisions."""
+    decisions = AcademicDecision.objects.filter(student=OuterRef('user_id'))
+    latest = decisions.order_by('-issued_at', '-id')
+    return {
+        'warnings_count': Coalesce(
+            Subquery(decisions.order_by().values('student').annotate(n=Count('pk')).values('n')), Value(0)),
+        'latest_decision_type': Subquery(latest.values('decision_type')[:1]),
+        'latest_decision_at': Subquery(latest.values('issued_at')[:1]),
+    }
+
+
+def refresh_summaries(user_ids):
+    """Recomputes the summary of the students with these user ids; returns how many were updated."""
+    user_ids = sorted({user_id for user_id in user_ids if user_id is not None})
+    if not user_ids:
+        return 0
+    with transaction.atomic():
+        students = Student.objects.filter(user_id__in=user_ids)
+        # A separate statement, so the UPDATE below reads with a snapshot taken after the lock
+        list(students.order_by('user_id').select_for_update().values_list('pk', flat=True))
+        return students.update(**summary_columns())
+
+
+def remember_student(sender, instance, **kwargs):
+    # The student a loaded decision belonged to, in case a save moves it to another one
+    instance._standing_student_id = instance.__dict__.get('student_id')
+
+
+def refresh_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_summaries([instance.student_id, None if created else getattr(instance, '_standing_student_id', None)])
+    instance._standing_student_id = instance.student_id
+
+
+def refresh_on_delete(sender, instance, **kwargs):
+    refresh_summaries([instance.student_id])
+
+
+post_init.connect(remember_student, sender=AcademicDecision, dispatch_uid='standing-init')
+post_save.connect(refresh_on_save, sender=AcademicDecision, dispatch_uid='standing-save')
+post_delete.connect(refresh_on_delete, sender=AcademicDecision, dispatch_uid='standing-delete')
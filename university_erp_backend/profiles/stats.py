@@ -0,0 +1,216 @@
+"""Cached counters behind the dean dashboard.
+
+Each counter lives under its own cache key (tenant-prefixed by the cache
+KEY_FUNCTION) so saves and deletes can adjust it with ``cache.incr`` instead
+of recounting. A miss on any key rebuilds all of them with one conditional
+aggregate per table.
+
+Deltas are applied once the writer's transaction commits, so a rollback
+leaves the counters alone. The keys also carry an epoch number: a rebuild
+stores its counts (with add(), never overwriting) under the epoch it read
+before counting, and a writer that finds its counter missing bumps the
+epoch instead of dropping the delta. A rebuild that counted before a
+commit therefore lands on keys nobody reads, and the next read counts
+again. What remains is the moment between a commit and its callback: a
+rebuild counting in that gap sees the row and the delta still follows, so
+DEAN_STATS_CACHE_TIMEOUT stays as a bound.
+"""
+import operator
+from functools import partial, reduce
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_init, post_save, post_delete
+
+from django_tenants.utils import schema_context
+
+from .asyncapi import gather_queries
+from .models import AcademicDecision, StudyPlan, Meeting
+
+WARNING_TYPES = ['first-warning', 'second-warning']
+
+# counter name -> (model, filter used by the rebuild aggregate)
+COUNTERS = {
+    'pending_decisions': (AcademicDecision, Q(decision_type__in=WARNING_TYPES, student__isnull=False)),
+    'plans_to_review': (StudyPlan, Q(submission_status='submitted')),
+    'meetings_to_sign': (Meeting, Q(status='completed', signedByDean=False)),
+    'approved_plans': (StudyPlan, Q(submission_status='approved')),
+}
+
+# Fields each model's counters depend on, snapshotted when an instance loads.
+TRACKED_FIELDS = {
+    AcademicDecision: ('decision_type', 'student_id'),
+    StudyPlan: ('submission_status',),
+    Meeting: ('status', 'signedByDean'),
+}
+
+# The same predicates as COUNTERS, evaluated against an instance snapshot.
+MATCHERS = {
+    'pending_decisions': lambda s: s['decision_type'] in WARNING_TYPES and s['student_id'] is not None,
+    'plans_to_review': lambda s: s['submission_status'] == 'submitted',
+    'meetings_to_sign': lambda s: s['status'] == 'completed' and not s['signedByDean'],
+    'approved_plans': lambda s: s['submission_status'] == 'approved',
+}
+
+CACHE_TIMEOUT = getattr(settings, 'DEAN_STATS_CACHE_TIMEOUT', 60 * 60)
+EPOCH_KEY = 'dean-stats:epoch'
+
+
+def current_epoch():
+    epoch = cache.get(EPOCH_KEY)
+    if epoch is None:
+        cache.add(EPOCH_KEY, 0, None)
+        epoch = cache.get(EPOCH_KEY, 0)
+    return epoch
+
+
+def cache_key(name, epoch):
+    return f'dean-stats:{epoch}:{name}'
+
+
+def dashboard_stats_queries():
+    """One callable per table returning its counters; they do not depend on each other."""
+    queries = []
+    for model in TRACKED_FIELDS:
+        filters = {name: q for name, (counter_model, q) in COUNTERS.items() if counter_model is model}
+        # The OR of the filters in WHERE lets the status/partial indexes narrow the scan.
+        queryset = model.objects.filter(reduce(operator.or_, filters.values()))
+        queries.append(partial(queryset.aggregate, **{name: Count('pk', filter=q) for name, q in filters.items()}))
+    return queries
+
+
+def compute_dashboard_stats():
+    """Counts every dashboard counter with one query per table."""
+    stats = {}
+    for query in dashboard_stats_queries():
+        stats.update(query())
+    return stats
+
+
+def cached_dashboard_stats():
+    """(counters, epoch): the cached counters, or None when any of them has to be rebuilt."""
+    epoch = current_epoch()
+    keys = {name: cache_key(name, epoch) for name in COUNTERS}
+    cached = cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        return {name: cached[key] for name, key in keys.items()}, epoch
+    return None, epoch
+
+
+def store_dashboard_stats(stats, epoch):
+    """Stores counts made after reading epoch; values already cached (newer deltas) win."""
+    for name, value in stats.items():
+        cache.add(cache_key(name, epoch), value, CACHE_TIMEOUT)
+
+
+def get_dashboard_stats():
+    stats, epoch = cached_dashboard_stats()
+    if stats is None:
+        stats = compute_dashboard_stats()
+        store_dashboard_stats(stats, epoch)
+    return stats
+
+
+async def aget_dashboard_stats():
+    """get_dashboard_stats() for async views; a rebuild counts the tables concurrently."""
+    stats, epoch = await sync_to_async(cached_dashboard_stats)()
+    if stats is None:
+        stats = {}
+        for counts in await gather_queries(*dashboard_stats_queries()):
+            stats.update(counts)
+        await sync_to_async(store_dashboard_stats)(stats, epoch)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    """Makes the next read recount; use after bulk writes that bypass model signals."""
+    cache.add(EPOCH_KEY, 0, None)
+    try:
+        cache.incr(EPOCH_KEY)
+    except ValueError:
+        # Evicted between add and incr; any epoch nobody has stored under works
+        cache.set(EPOCH_KEY, 1, None)
+
+
+def _on_commit_in_schema(func):
+    # Cache keys are tenant-prefixed from the connection's schema at call time
+    schema = connection.schema_name
+
+    def run():
+        if connection.schema_name == schema:
+            func()
+        else:
+            with schema_context(schema):
+                func()
+    transaction.on_commit(run)
+
+
+def _snapshot(instance):
+    fields = TRACKED_FIELDS[type(instance)]
+    # Read from __dict__ so deferred fields are not fetched one by one.
+    if any(field not in instance.__dict__ for field in fields):
+        return None
+    return {field: instance.__dict__[field] for field in fields}
+
+
+def _deltas(model, old, new):
+    deltas = {}
+    for name, (counter_model, _) in COUNTERS.items():
+        if counter_model is not model:
+            continue
+        delta = (1 if new and MATCHERS[name](new) else 0) - (1 if old and MATCHERS[name](old) else 0)
+        if delta:
+            deltas[name] = delta
+    return deltas
+
+
+def _apply_deltas(deltas):
+    epoch = current_epoch()
+    for name, delta in deltas.items():
+        try:
+            cache.incr(cache_key(name, epoch), delta)
+        except ValueError:
+            # Not cached, possibly because a rebuild is counting right now without this write:
+            # move everyone to a new epoch so that rebuild's result is never read
+            invalidate_dashboard_stats()
+            return
+
+
+def _apply_delta(model, old, new):
+    deltas = _deltas(model, old, new)
+    if deltas:
+        _on_commit_in_schema(lambda: _apply_deltas(deltas))
+
+
+def remember_counted_fields(sender, instance, **kwargs):
+    instance._dean_stats_state = _snapshot(instance) if instance.pk else False
+
+
+def update_counters_on_save(sender, instance, created, **kwargs):
+    old = False if created else getattr(instance, '_dean_stats_state', None)
+    new = _snapshot(instance)
+    if old is None or new is None:
+        # Previous state unknown (e.g. deferred fields): fall back to a rebuild.
+        _on_commit_in_schema(invalidate_dashboard_stats)
+    else:
+        _apply_delta(sender, old, new)
+    instance._dean_stats_state = new
+
+
+def update_counters_on_delete(sender, instance, **kwargs):
+    old = getattr(instance, '_dean_stats_state', None)
+    if old is None:
+        _on_commit_in_schema(invalidate_dashboard_stats)
+    else:
+        _apply_delta(sender, old, False)
+
+
+# Connected per model: a sender-less post_init would run for every row of
+# every model, and a sender-less post_delete disables fast deletes globally.
+for _model in TRACKED_FIELDS:
+    post_init.connect(remember_counted_fields, sender=_model, dispatch_uid=f'dean-stats-init-{_model.__name__}')
+    post_save.connect(update_counters_on_save, sender=_model, dispatch_uid=f'dean-stats-save-{_model.__name__}')
+    post_delete.connect(update_counters_on_delete, sender=_model, dispatch_uid=f'dean-stats-delete-{_model.__name__}')
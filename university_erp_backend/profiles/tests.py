@@ -1,3 +1,1549 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import itertools
+import json
+import math
+import os
+import random
+import tempfile
+from unittest import mock
+import time
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection, connections, transaction
+from django.utils import timezone
+from django.test import AsyncClient, Client as HttpClient, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django_tenants.test.cases import FastTenantTestCase
+from django_tenants.test.client import TenantClient
+from django_tenants.utils import schema_context
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
+
+from public_tenant import provisioning
+from public_tenant.middleware import tenant_cache
+from public_tenant.models import Client as Tenant, Domain
+
+from .models import User, Student, AcademicDecision, StudyPlan, Meeting, RecentActivity, Schedule, Enrollment, Grade
+from . import stats as stats_module
+from .stats import compute_dashboard_stats
+from .activity import buffer as activity_buffer, log_activity
+from .conflicts import find_conflicts, timetable_conflicts
+from . import activity, asyncapi, benchmarks, deployment, gpa, metrics, occupancy, response_cache, urls as profile_urls
+from .urls import router
+from .authentication import ClaimJWTAuthentication, add_user_claims
+from .renderers import FastJSONRenderer
+from .serializers import MeetingSerializer, StudyPlanSerializer
+from .views import ScheduleViewSet, MeetingViewSet, StudyPlanViewSet
+from .seeding import DEFAULT_PASSWORD, seed_tenant
+
+
+class TenantAPITestCase(FastTenantTestCase):
+    """Runs API requests against the test tenant as a dean."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        response_cache.response_cache().clear()
+        activity_buffer.clear()
+        self.addCleanup(activity_buffer.clear)
+        # Entries are flushed by the tests (or inline outside requests), never by a thread
+        # writing outside the test transaction
+        manual_flush = mock.patch.object(activity, 'MODE', 'after_response')
+        manual_flush.start()
+        self.addCleanup(manual_flush.stop)
+        # Password hashing makes the token endpoints slow enough to be logged
+        slow_log = mock.patch.object(metrics, 'SLOW_REQUEST_MS', float('inf'))
+        slow_log.start()
+        self.addCleanup(slow_log.stop)
+        self.client = TenantClient(self.tenant)
+        self.dean = User.objects.create_user(username='dean', email='dean@example.com', password='pass', role='dean')
+        self.client.force_login(self.dean)
+
+    def make_students(self, count, gpa=1.5, department='CS', warnings=0):
+        for _ in range(count):
+            n = User.objects.count()
+            user = User.objects.create_user(username=f'student{n}', email=f'student{n}@example.com', role='student')
+            Student.objects.filter(user=user).update(gpa=gpa, department=department)
+            for _ in range(warnings):
+                AcademicDecision.objects.create(student=user, decision_type='first-warning', issued_by=self.dean)
+
+    def count_queries(self, url, **params):
+        """Counts the statements a GET issues, ignoring django-tenants' SET search_path."""
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len([q for q in ctx.captured_queries if not q['sql'].startswith('SET ')])
+
+
+class QueryBudgetMixin:
+    """Fails when a list endpoint's query count grows with the number of rows.
+
+    ``seed(n)`` must add ``n`` rows that the endpoint returns. The endpoint is
+    measured with one row and with a full page, bypassing the response
+    cache; an optional ``budget`` also caps the absolute count.
+    """
+    page_size = 10
+
+    def assertQueryBudget(self, url, seed, budget=None, **params):
+        seed(1)
+        response_cache.response_cache().clear()
+        single = self.count_queries(url, **params)
+        seed(self.page_size)
+        response_cache.response_cache().clear()
+        full_page = self.count_queries(url, **params)
+        self.assertEqual(full_page, single, f'{url} issues more queries as rows are added')
+        if budget is not None:
+            self.assertLessEqual(full_page, budget, f'{url} exceeds its budget of {budget} queries')
+
+
+class StudentsNeedingAttentionTests(TenantAPITestCase):
+    url = '/api/dean/academic-decisions/students/'
+
+    def test_filters_in_sql(self):
+        self.make_students(2, gpa=1.0, department='CS', warnings=1)
+        self.make_students(1, gpa=1.0, department='Math')
+        self.make_students(1, gpa=3.5, department='CS')
+        response = self.client.get(self.url, {'gpa': 2.0, 'warnings': 1, 'department': 'CS'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['count'], 2)
+        self.assertEqual({row['previousWarnings'] for row in body['results']}, {1})
+        self.assertEqual({row['department'] for row in body['results']}, {'CS'})
+
+    def test_student_without_profile(self):
+        user = User.objects.create_user(username='orphan', email='orphan@example.com', role='student')
+        Student.objects.filter(user=user).delete()
+        row = self.client.get(self.url).json()['results'][0]
+        self.assertEqual((row['gpa'], row['department'], row['previousWarnings']), (0.0, 'N/A', 0))
+
+    def test_query_count_is_constant(self):
+        self.make_students(3, warnings=1)
+        small = self.count_queries(self.url)
+        self.make_students(30, warnings=2)
+        self.assertEqual(self.count_queries(self.url), small)
+
+    def test_ordering(self):
+        self.make_students(1, warnings=2)
+        self.make_students(1, warnings=0)
+        self.make_students(1, warnings=1)
+        rows = self.client.get(self.url, {'ordering': '-warnings'}).json()['results']
+        self.assertEqual([row['previousWarnings'] for row in rows], [2, 1, 0])
+        self.assertEqual([row['latestDecisionType'] for row in rows], ['first-warning', 'first-warning', None])
+        rows = self.client.get(self.url, {'ordering': '-latest_decision'}).json()['results']
+        self.assertEqual(rows[-1]['latestDecisionAt'], None)
+        self.assertEqual(self.client.get(self.url, {'ordering': 'name'}).status_code, 400)
+
+    def test_invalid_filters_are_rejected(self):
+        for params in ({'gpa': 'low'}, {'gpa': 'nan'}, {'warnings': 'two'}, {'warnings': '1.5'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+
+class BulkIssueDecisionTests(TenantAPITestCase):
+    url = '/api/dean/academic-decisions/issue-bulk/'
+
+    def post(self, payload):
+        return self.client.post(self.url, payload, content_type='application/json')
+
+    def test_reports_each_row(self):
+        self.make_students(3)
+        ids = list(User.objects.filter(role='student').values_list('id', flat=True))
+        response = self.post({'decisions': [
+            {'student': ids[0], 'decision_type': 'first-warning'},
+            {'student': ids[1], 'decision_type': 'second-warning', 'notes': 'Second term'},
+            {'student': self.dean.pk, 'decision_type': 'first-warning'},
+            {'student': ids[2], 'decision_type': 'expelled'},
+        ]})
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual((body['created'], body['failed']), (2, 2))
+        self.assertEqual([r['status'] for r in body['results']], ['created', 'created', 'error', 'error'])
+        self.assertEqual(AcademicDecision.objects.get(pk=body['results'][1]['id']).notes, 'Second term')
+
+    def test_malformed_values_are_row_errors(self):
+        self.make_students(3)
+        ids = list(User.objects.filter(role='student').values_list('id', flat=True))
+        response = self.post({'decisions': [
+            {'student': ids[0], 'decision_type': ['first-warning']},
+            {'student': ids[1], 'decision_type': {'type': 'dismissal'}},
+            {'student': ids[2], 'decision_type': 'first-warning', 'notes': {'text': 'Late'}},
+            {'student': [ids[0]], 'decision_type': 'first-warning'},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r['error'] for r in response.json()['results']],
+                         ['Invalid decision_type', 'Invalid decision_type', 'notes must be text', 'Student not found'])
+        response = self.post({'students': ids[:1], 'decision_type': ['first-warning'], 'notes': ['Late']})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AcademicDecision.objects.exists())
+
+    def test_constant_queries(self):
+        self.make_students(3)
+        ids = list(User.objects.filter(role='student').values_list('id', flat=True))
+        # The first request in the process also looks the tenant's domain up
+        self.post({'students': [], 'decision_type': 'first-warning'})
+        with CaptureQueriesContext(connection) as small:
+            self.post({'students': ids[:1], 'decision_type': 'first-warning'})
+        self.make_students(100)
+        ids = list(User.objects.filter(role='student').values_list('id', flat=True))
+        with CaptureQueriesContext(connection) as large:
+            self.post({'students': ids, 'decision_type': 'first-warning'})
+        self.assertEqual(len(large.captured_queries), len(small.captured_queries))
+
+    def test_filter_matches_students_endpoint(self):
+        self.make_students(4, gpa=1.0, department='CS')
+        self.make_students(2, gpa=1.0, department='Math')
+        response = self.post({'filter': {'gpa': 2.0, 'department': 'CS'}, 'decision_type': 'first-warning'})
+        self.assertEqual(response.json()['created'], 4)
+        self.assertEqual(set(AcademicDecision.objects.values_list('student__student_profile__department', flat=True)),
+                         {'CS'})
+
+    def test_rejects_oversized_and_empty_requests(self):
+        self.assertEqual(self.post({'students': list(range(1001)), 'decision_type': 'first-warning'}).status_code, 400)
+        self.assertEqual(self.post({'students': [999999], 'decision_type': 'first-warning'}).status_code, 400)
+        self.assertEqual(self.post({}).status_code, 400)
+
+
+class ExportTests(TenantAPITestCase):
+
+    def test_csv_export_streams_every_row(self):
+        for i in range(25):
+            Schedule.objects.create(course_name=f'Course {i}', instructor='Prof', day='Monday',
+                                    start_time='09:00', end_time='10:00', room='A1')
+        response = self.client.get('/api/schedules/export/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(rows[0]['course_name'], 'Course 0')
+
+    def test_ndjson_export_matches_serializer_columns(self):
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role='teacher',
+                                           department='CS')
+        StudyPlan.objects.create(teacher=teacher, subject_name='Algebra')
+        self.dean.is_staff = True
+        self.dean.save()
+        response = self.client.get('/api/study-plans/export/', {'output': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        listed = self.client.get('/api/study-plans/').json()['results']
+        self.assertEqual(set(rows[0]), set(listed[0]))
+        self.assertEqual((rows[0]['teacher_username'], rows[0]['department']), ('teacher', 'CS'))
+
+    async def test_asgi_export_is_streamed_asynchronously(self):
+        # AsyncClient always sends Host: testserver
+        await Domain.objects.acreate(tenant=self.tenant, domain='testserver', is_primary=False)
+        for i in range(5):
+            await Schedule.objects.acreate(course_name=f'Course {i}', instructor='Prof', day='Monday',
+                                           start_time='09:00', end_time='10:00', room='A1')
+        client = AsyncClient()
+        await client.aforce_login(self.dean)
+        response = await client.get('/api/schedules/export/')
+        self.assertEqual(response.status_code, 200)
+        # An async iterator, so ASGI sends chunks as they are read instead of collecting them first
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(list(csv.DictReader(io.StringIO(body.decode())))), 5)
+
+    def test_export_keeps_viewset_permissions(self):
+        self.client.force_login(User.objects.create_user(username='t', email='t@example.com', role='teacher'))
+        self.assertEqual(self.client.get('/api/dean/academic-decisions/export/').status_code, 403)
+        self.assertEqual(self.client.get('/api/meetings/export/', {'output': 'xlsx'}).status_code, 400)
+
+
+class ScheduleConflictTests(TenantAPITestCase):
+
+    def slot(self, **fields):
+        data = {'course_name': 'Course', 'instructor': 'Prof A', 'day': 'Monday', 'start_time': '09:00',
+                'end_time': '10:00', 'room': 'A1'}
+        data.update(fields)
+        return self.client.post('/api/schedules/', data, content_type='application/json')
+
+    def test_create_and_update_are_validated(self):
+        self.assertEqual(self.slot().status_code, 201)
+        self.assertEqual(self.slot(start_time='10:00', end_time='11:00').status_code, 201)  # back to back
+        clash = self.slot(instructor='Prof B', start_time='09:30', end_time='10:30')
+        self.assertEqual(clash.status_code, 400)
+        self.assertIn('conflicts', clash.json())
+        self.assertEqual(self.slot(room='B2', start_time='09:30', end_time='10:30').status_code, 400)
+        self.assertEqual(self.slot(room='B2', instructor='Prof B', day='Tuesday').status_code, 201)
+
+        first = Schedule.objects.get(day='Monday', start_time='09:00')
+        # Editing a slot must not clash with itself
+        response = self.client.patch(f'/api/schedules/{first.pk}/', {'course_name': 'Renamed'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.patch(f'/api/schedules/{first.pk}/', {'end_time': '10:15'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_report_endpoint(self):
+        Schedule.objects.bulk_create([
+            Schedule(course_name='A', instructor='X', day='Monday', start_time='09:00', end_time='11:00', room='R1'),
+            Schedule(course_name='B', instructor='Y', day='Monday', start_time='10:00', end_time='12:00', room='R1'),
+            Schedule(course_name='C', instructor='X', day='Monday', start_time='10:30', end_time='11:30', room='R2'),
+        ])
+        body = self.client.get('/api/schedules/conflicts/').json()
+        self.assertEqual(body['count'], 2)
+        self.assertEqual(sorted((c['type'], c['overlap']['start'], c['overlap']['end']) for c in body['conflicts']),
+                         [('instructor', '10:30:00', '11:00:00'), ('room', '10:00:00', '11:00:00')])
+
+    def test_sweep_matches_brute_force(self):
+        rng = random.Random(7)
+        slots = []
+        for i in range(400):
+            start = rng.randrange(8 * 60, 18 * 60, 15)
+            end = start + rng.choice([30, 60, 90, 120])
+            slots.append((i, rng.choice(['Monday', 'Tuesday']), start, end, f'R{rng.randrange(10)}',
+                           f'P{rng.randrange(15)}'))
+        expected = set()
+        for a, b in itertools.combinations(slots, 2):
+            if a[1] == b[1] and a[2] < b[3] and b[2] < a[3]:
+                for kind, index in (('room', 4), ('instructor', 5)):
+                    if a[index] == b[index]:
+                        expected.add((kind, a[0], b[0]))
+        found = {(c['type'], *c['slots']) for c in find_conflicts(slots)}
+        self.assertEqual(found, expected)
+
+    def test_large_timetable(self):
+        rng = random.Random(3)
+        slots = [
+            (i, f'Day {rng.randrange(6)}', datetime.time(rng.randrange(8, 18)), datetime.time(rng.randrange(18, 20)),
+             f'R{rng.randrange(2000)}', f'P{rng.randrange(3000)}')
+            for i in range(20000)
+        ]
+        started = time.perf_counter()
+        find_conflicts(slots)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+
+class RoomOccupancyTests(TenantAPITestCase):
+    url = '/api/schedules/free-rooms/'
+
+    def setUp(self):
+        super().setUp()
+        occupancy._indexes.clear()
+
+    def free(self, day, start, end):
+        response = self.client.get(self.url, {'day': day, 'start': start, 'end': end})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['rooms']
+
+    def test_search_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            a = Schedule.objects.create(course_name='A', instructor='X', day='Tuesday', start_time='10:00',
+                                        end_time='11:00', room='R1')
+            Schedule.objects.create(course_name='B', instructor='Y', day='Tuesday', start_time='10:30',
+                                    end_time='12:00', room='R2')
+            Schedule.objects.create(course_name='C', instructor='Z', day='Monday', start_time='10:00',
+                                    end_time='12:00', room='R3')
+        self.assertEqual(self.free('Tuesday', '10:00', '12:00'), ['R3'])
+        self.assertEqual(self.free('Tuesday', '11:00', '12:00'), ['R1', 'R3'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            a.start_time, a.end_time = datetime.time(14), datetime.time(15)
+            a.save()
+        self.assertEqual(self.free('Tuesday', '10:00', '10:30'), ['R1', 'R2', 'R3'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Schedule.objects.filter(room='R2').delete()
+        self.assertEqual(self.free('Tuesday', '10:00', '12:00'), ['R1', 'R2', 'R3'])
+        self.assertEqual(self.client.get(self.url, {'day': 'Tuesday', 'start': '12:00', 'end': '10:00'}).status_code,
+                         400)
+
+    def test_overlapping_slots_keep_shared_bits(self):
+        index = occupancy.RoomOccupancyIndex()
+        index.add(1, 'R1', 'Monday', datetime.time(9), datetime.time(11))
+        index.add(2, 'R1', 'Monday', datetime.time(10), datetime.time(12))
+        index.remove(1)
+        self.assertFalse(index.is_free('R1', 'Monday', datetime.time(10, 30), datetime.time(11)))
+        self.assertTrue(index.is_free('R1', 'Monday', datetime.time(9), datetime.time(10)))
+
+    def test_stale_index_is_rebuilt(self):
+        self.free('Monday', '09:00', '10:00')
+        Schedule.objects.bulk_create([Schedule(course_name='A', instructor='X', day='Monday', start_time='09:00',
+                                               end_time='10:00', room='R9')])
+        occupancy.invalidate_room_occupancy()  # what another worker's write looks like from here
+        self.assertEqual(self.free('Monday', '09:00', '10:00'), [])
+
+    def test_write_in_another_process_is_seen(self):
+        self.assertEqual(self.free('Monday', '09:00', '10:00'), [])
+        slot = Schedule.objects.bulk_create([Schedule(course_name='A', instructor='X', day='Monday',
+                                                      start_time='09:00', end_time='10:00', room='R9')])[0]
+        # Another worker: its own memory and its own database session, running the post-commit hook
+        other = connection.copy()
+        other.set_schema(self.tenant.schema_name)
+        self.addCleanup(other.close)
+        with mock.patch.object(occupancy, 'connection', other), mock.patch.object(occupancy, '_indexes', {}):
+            occupancy._apply(self.tenant.schema_name, lambda index: index.add(
+                slot.pk, 'R9', 'Monday', datetime.time(9), datetime.time(10)))
+        self.assertEqual(self.free('Monday', '10:00', '11:00'), ['R9'])
+        self.assertEqual(self.free('Monday', '09:00', '10:00'), [])
+
+    def test_lookup_speed(self):
+        rng = random.Random(5)
+        index = occupancy.RoomOccupancyIndex()
+        for slot_id in range(20000):
+            start = rng.randrange(8, 18)
+            index.add(slot_id, f'R{rng.randrange(3000)}', 'Tuesday', datetime.time(start), datetime.time(start + 1))
+        started = time.perf_counter()
+        for _ in range(100):
+            index.free_rooms('Tuesday', datetime.time(10), datetime.time(12))
+        per_lookup = (time.perf_counter() - started) / 100
+        self.assertLess(per_lookup, 0.005)
+
+
+class ListQueryBudgetTests(QueryBudgetMixin, TenantAPITestCase):
+    """Every list endpoint in profiles/urls.py stays constant-query."""
+
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role='teacher')
+
+    def seed_schedules(self, n):
+        Schedule.objects.bulk_create(
+            Schedule(course_name='Course', instructor='Prof', day='Monday', start_time='09:00', end_time='10:00',
+                     room='A1')
+            for _ in range(n)
+        )
+
+    def seed_meetings(self, n):
+        Meeting.objects.bulk_create(
+            Meeting(title='Council', date='2025-01-01', time='10:00', location='Hall', status='upcoming')
+            for _ in range(n)
+        )
+
+    def seed_plans(self, n):
+        for _ in range(n):
+            # A distinct teacher per plan, so a missing select_related shows up
+            teacher = User.objects.create_user(username=f'teacher{User.objects.count()}',
+                                               email=f'teacher{User.objects.count()}@example.com', role='teacher')
+            StudyPlan.objects.create(teacher=teacher, subject_name='Algebra')
+            StudyPlan.objects.create(teacher=self.teacher, subject_name='Geometry')
+
+    def seed_activities(self, n):
+        for _ in range(n):
+            user = User.objects.create_user(username=f'user{User.objects.count()}',
+                                            email=f'user{User.objects.count()}@example.com')
+            RecentActivity.objects.create(description='Updated a plan', user=user)
+
+    def seed_decisions(self, n):
+        self.make_students(n, warnings=1)
+
+    def budgets(self):
+        return {
+            'schedules': (self.seed_schedules, {}),
+            'meetings': (self.seed_meetings, {}),
+            'study-plans': (self.seed_plans, {}),
+            'recent-activities': (self.seed_activities, {}),
+            'dean/meetings': (self.seed_meetings, {}),
+            'dean/academic-decisions': (self.seed_decisions, {}),
+            'dean/plan-approval': (self.seed_plans, {}),
+        }
+
+    def test_every_router_list_has_a_budget(self):
+        self.assertEqual({prefix for prefix, _, _ in router.registry}, set(self.budgets()))
+
+    def test_router_lists(self):
+        self.dean.is_staff = True  # so study-plans lists every teacher's plans
+        self.dean.save()
+        for prefix, (seed, params) in self.budgets().items():
+            with self.subTest(prefix):
+                self.assertQueryBudget(f'/api/{prefix}/', seed, budget=6, **params)
+
+    def test_teacher_study_plans(self):
+        self.client.force_login(self.teacher)
+        self.assertQueryBudget('/api/study-plans/', self.seed_plans, budget=6)
+
+    def test_dean_views(self):
+        self.assertQueryBudget('/api/dean/academic-decisions/students/', self.seed_decisions, budget=6)
+        self.assertQueryBudget('/api/dean/dashboard/recent-activity/', self.seed_activities, budget=6)
+
+
+class KeysetPaginationTests(TenantAPITestCase):
+    url = '/api/recent-activities/'
+
+    def setUp(self):
+        super().setUp()
+        RecentActivity.objects.bulk_create(RecentActivity(description=f'Activity {i}') for i in range(25))
+        # Ties on timestamp must be broken by id
+        first = RecentActivity.objects.order_by('id').first().timestamp
+        RecentActivity.objects.filter(id__in=RecentActivity.objects.order_by('id').values('id')[:12]).update(
+            timestamp=first)
+
+    def walk(self, url, link):
+        seen = []
+        while url:
+            body = self.client.get(url).json()
+            seen.append([row['description'] for row in body['results']])
+            url = body[link]
+        return seen
+
+    def test_walks_forward_and_back(self):
+        expected = list(RecentActivity.objects.order_by('-timestamp', '-id').values_list('description', flat=True))
+        pages = self.walk(self.url, 'next')
+        self.assertEqual([d for page in pages for d in page], expected)
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+
+        last_page = self.client.get(self.url).json()
+        while last_page['next']:
+            last_page = self.client.get(last_page['next']).json()
+        back = self.walk(last_page['previous'], 'previous')
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_skips_count(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_dean_recent_activity(self):
+        body = self.client.get('/api/dean/dashboard/recent-activity/').json()
+        self.assertEqual(len(body['results']), 10)
+        self.assertEqual(len(self.client.get(body['next']).json()['results']), 10)
+
+    def test_opt_in_for_page_number_viewsets(self):
+        for i in range(12):
+            Schedule.objects.create(course_name=f'Course {i}', instructor='Prof', day='Monday',
+                                    start_time='09:00', end_time='10:00', room='A1')
+        self.assertIn('count', self.client.get('/api/schedules/').json())
+        body = self.client.get('/api/schedules/', {'cursor': ''}).json()
+        self.assertNotIn('count', body)
+        rest = self.client.get(body['next']).json()['results']
+        self.assertEqual([row['course_name'] for row in body['results'] + rest], [f'Course {i}' for i in range(12)])
+
+
+class ActivityLogTests(TenantAPITestCase):
+
+    def test_dean_actions_are_logged_after_flush(self):
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role='teacher')
+        plan = StudyPlan.objects.create(teacher=teacher, subject_name='Algebra', submission_status='submitted')
+        meeting = Meeting.objects.create(title='Council', date='2025-01-01', time='10:00', location='Hall',
+                                         status='completed')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/dean/plan-approval/{plan.pk}/approve/')
+            self.client.patch(f'/api/dean/meetings/{meeting.pk}/', {'signedByDean': True},
+                              content_type='application/json')
+        self.assertFalse(RecentActivity.objects.exists())
+        self.assertEqual(activity_buffer.flush(), 2)
+        self.assertEqual(
+            set(RecentActivity.objects.values_list('description', 'user')),
+            {('Approved study plan "Algebra"', self.dean.pk), ('Signed meeting "Council"', self.dean.pk)},
+        )
+
+    def test_flush_is_one_insert(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(50):
+                log_activity(f'Entry {i}', user=self.dean)
+        with CaptureQueriesContext(connection) as ctx:
+            activity_buffer.flush()
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]), 1)
+        self.assertEqual(RecentActivity.objects.count(), 50)
+
+    def test_thread_mode_starts_one_flusher(self):
+        with mock.patch.object(activity, 'MODE', 'thread'), mock.patch.object(activity, 'flusher', None), \
+                mock.patch.object(activity, 'FlushThread') as flush_thread:
+            with self.captureOnCommitCallbacks(execute=True):
+                log_activity('First', user=self.dean)
+                log_activity('Second', user=self.dean)
+        flush_thread.assert_called_once_with()
+        flush_thread.return_value.start.assert_called_once_with()
+        # Left for the thread
+        self.assertEqual(len(activity_buffer.entries), 2)
+
+    def test_after_response_flush_gives_its_connection_back(self):
+        activity_buffer.add(connection.schema_name, 'Entry', None, timezone.now())
+        db = connections['default']
+        with mock.patch.object(activity_buffer, 'flush_interval', 0), \
+                mock.patch.object(activity_buffer, 'flush') as flush, mock.patch.object(db, 'close') as close:
+            activity.flush_after_response(sender=None)
+            flush.assert_called_once_with()
+            # Never inside a transaction, such as this test's
+            close.assert_not_called()
+            with mock.patch.object(db, 'in_atomic_block', False):
+                activity.flush_after_response(sender=None)
+            close.assert_called_once_with()
+
+    def test_rolled_back_writes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    Schedule.objects.create(course_name='Course', instructor='Prof', day='Monday',
+                                            start_time='09:00', end_time='10:00', room='A1')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+
+    def test_prune_deletes_old_rows_in_windows(self):
+        now = timezone.now()
+        RecentActivity.objects.bulk_create(
+            RecentActivity(description=f'Day {d}', timestamp=now - datetime.timedelta(days=d)) for d in range(100)
+        )
+        call_command('prune_activity', days=30, window_hours=240, stdout=io.StringIO())
+        self.assertEqual(RecentActivity.objects.count(), 30)
+
+
+class DashboardStatsCacheTests(TenantAPITestCase):
+    url = '/api/dean/dashboard/stats/'
+
+    def test_counters_follow_writes(self):
+        self.make_students(2)
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role='teacher')
+        plan = StudyPlan.objects.create(teacher=teacher, subject_name='Algebra', submission_status='submitted')
+        self.client.get(self.url)  # prime the cache
+
+        # Counters move when the writes commit
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting = Meeting.objects.create(title='Council', date='2025-01-01', time='10:00', location='Hall',
+                                             status='completed')
+            self.client.post(f'/api/dean/plan-approval/{plan.pk}/approve/')
+            decision = AcademicDecision.objects.create(student=User.objects.filter(role='student').first(),
+                                                       decision_type='first-warning', issued_by=self.dean)
+        self.assertEqual(self.client.get(self.url).json(), compute_dashboard_stats())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            meeting.signedByDean = True
+            meeting.save()
+            decision.delete()
+            StudyPlan.objects.get(pk=plan.pk).delete()
+        stats = self.client.get(self.url).json()
+        self.assertEqual(stats, compute_dashboard_stats())
+        self.assertEqual(stats, {'pending_decisions': 0, 'plans_to_review': 0, 'meetings_to_sign': 0,
+                                 'approved_plans': 0})
+
+    def test_rolled_back_writes_leave_the_counters_alone(self):
+        before = self.client.get(self.url).json()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Meeting.objects.create(title='Council', date='2025-01-01', time='10:00', location='Hall',
+                                       status='completed')
+                raise RuntimeError
+        self.assertEqual(self.client.get(self.url).json(), before)
+
+    def test_rebuild_racing_a_write_is_not_kept(self):
+        # A rebuild reads the epoch and counts; a write commits before the counts are stored
+        _, epoch = stats_module.cached_dashboard_stats()
+        counted = compute_dashboard_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Meeting.objects.create(title='Council', date='2025-01-01', time='10:00', location='Hall',
+                                   status='completed')
+        stats_module.store_dashboard_stats(counted, epoch)
+        self.assertEqual(self.client.get(self.url).json()['meetings_to_sign'], 1)
+
+    def test_cached_read_skips_counting(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        tables = ('profiles_studyplan', 'profiles_meeting', 'profiles_academicdecision')
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if any(t in q['sql'] for t in tables)])
+
+
+class QueryPlanTests(TenantAPITestCase):
+    """Seeds a synthetic tenant and fails if a hot endpoint's query has no index to use.
+
+    Plans are taken with enable_seqscan off, so a "Seq Scan" node only survives
+    when no index can serve the predicate; with it on, a small test tenant
+    would let the planner prefer seq scans for reasons unrelated to indexing.
+    """
+
+    hot_tables = (
+        'profiles_student', 'profiles_academicdecision', 'profiles_studyplan',
+        'profiles_meeting', 'profiles_recentactivity',
+    )
+
+    def setUp(self):
+        super().setUp()
+        seed_tenant(students=2000, teachers=100, plans=2000, meetings=2000, activities=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def plans_for(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        plans = []
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if sql.startswith('SELECT') and any(table in sql for table in self.hot_tables):
+                    cursor.execute('EXPLAIN ' + sql)
+                    plans.append((sql, '\n'.join(row[0] for row in cursor.fetchall())))
+        self.assertTrue(plans, f'{url} issued no queries against the hot tables')
+        return plans
+
+    def assertNoSeqScan(self, url, **params):
+        for sql, plan in self.plans_for(url, **params):
+            for table in self.hot_tables:
+                self.assertNotIn(f'Seq Scan on {table}', plan, f'{sql}\n\n{plan}')
+
+    def test_students_needing_attention(self):
+        self.assertNoSeqScan('/api/dean/academic-decisions/students/', gpa=1.0, department='Dept 3')
+
+    def test_dashboard_stats(self):
+        self.assertNoSeqScan('/api/dean/dashboard/stats/')
+
+    def test_recent_activity(self):
+        self.assertNoSeqScan('/api/dean/dashboard/recent-activity/')
+
+    def test_teacher_study_plans(self):
+        teacher = User.objects.filter(role='teacher').first()
+        self.client.force_login(teacher)
+        self.assertNoSeqScan('/api/study-plans/')
+
+    def test_meetings_by_participant(self):
+        participant = Meeting.objects.exclude(participants=[]).first().participants[0]
+        self.assertNoSeqScan('/api/meetings/', participant=participant)
+        self.assertNoSeqScan('/api/meetings/attendance/', participant=participant)
+
+    def test_attendance_report(self):
+        self.assertNoSeqScan('/api/dean/meetings/attendance/', **{'from': '2024-01-01', 'to': '2024-12-31'})
+
+    def test_search(self):
+        self.assertNoSeqScan('/api/search/', q='warnings')
+
+    def test_students_by_warnings(self):
+        self.assertNoSeqScan('/api/dean/academic-decisions/students/', gpa=1.0, warnings=2)
+        self.assertNoSeqScan('/api/dean/academic-decisions/students/', gpa=1.0, ordering='-warnings')
+
+
+class ClaimAuthTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pass',
+                                                role='teacher', department='CS', first_name='Ada')
+
+    def bearer(self, token):
+        client = TenantClient(self.tenant)
+        client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        return client
+
+    def login(self, username):
+        response = self.client.post('/api/token/', {'username': username, 'password': 'pass'})
+        self.assertEqual(response.status_code, 200, response.content)
+        return self.bearer(response.json()['access'])
+
+    def test_authenticated_requests_do_not_load_the_user(self):
+        client = self.login('dean')
+        client.get('/api/dean/dashboard/stats/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/dean/dashboard/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q['sql'] for q in ctx.captured_queries if 'profiles_user' in q['sql']])
+
+    def test_other_fields_load_on_first_access_in_one_query(self):
+        token = AccessToken(self.login('teacher').defaults['HTTP_AUTHORIZATION'].split()[1])
+        user = ClaimJWTAuthentication().get_user(token)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual((user.role, user.department, user.is_staff), ('teacher', 'CS', False))
+        self.assertEqual(len(ctx.captured_queries), 0)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual((user.first_name, user.email), ('Ada', 'teacher@example.com'))
+        self.assertEqual(len([q for q in ctx.captured_queries if not q['sql'].startswith('SET ')]), 1)
+
+    def test_claim_user_can_be_assigned_to_foreign_keys(self):
+        response = self.login('teacher').post('/api/study-plans/', {'subject_name': 'Algebra'})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(StudyPlan.objects.get(subject_name='Algebra').teacher, self.teacher)
+
+    def test_deactivation_and_role_changes_apply_before_expiry(self):
+        client = self.login('dean')
+        self.assertEqual(client.get('/api/dean/dashboard/stats/').status_code, 200)
+        self.dean.role = 'teacher'
+        self.dean.save()
+        self.assertEqual(client.get('/api/dean/dashboard/stats/').status_code, 403)
+        self.dean.is_active = False
+        self.dean.save()
+        self.assertEqual(client.get('/api/dean/dashboard/stats/').status_code, 401)
+
+    def test_staff_flag_is_taken_from_the_database(self):
+        StudyPlan.objects.create(teacher=self.teacher, subject_name='Algebra')
+        self.dean.is_staff = True
+        self.dean.save()
+        client = self.login('dean')
+        self.assertEqual(client.get('/api/study-plans/').json()['count'], 1)
+        self.dean.is_staff = False
+        self.dean.save()
+        # The token still says is_staff; the dean now only sees their own plans
+        self.assertEqual(client.get('/api/study-plans/').json()['count'], 0)
+
+    def test_tokens_are_bound_to_their_tenant(self):
+        token = add_user_claims(AccessToken.for_user(self.dean), self.dean)
+        token['tenant'] = 'another_university'
+        self.assertEqual(self.bearer(token).get('/api/dean/dashboard/stats/').status_code, 401)
+
+
+class ConditionalGetTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        seed_tenant(meetings=30)
+        self.meeting = Meeting.objects.order_by('id').first()
+
+    def etag(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIn('Last-Modified', response)
+        return response['ETag']
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.etag('/api/meetings/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/meetings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        meeting_queries = [q['sql'] for q in ctx.captured_queries if 'profiles_meeting' in q['sql']]
+        self.assertEqual(len(meeting_queries), 1, meeting_queries)
+        self.assertIn('MAX(', meeting_queries[0])
+
+    def test_writes_change_the_etag(self):
+        etag = self.etag('/api/meetings/')
+        self.assertNotEqual(self.etag('/api/meetings/', page=2), etag)
+
+        response = self.client.patch(f'/api/meetings/{self.meeting.pk}/', {'title': 'Renamed'},
+                                      content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        after_update = self.etag('/api/meetings/')
+        self.assertNotEqual(after_update, etag)
+        self.assertEqual(self.client.get('/api/meetings/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        Meeting.objects.order_by('-id').first().delete()
+        self.assertNotEqual(self.etag('/api/meetings/'), after_update)
+
+    def test_teacher_edits_change_the_study_plan_etag(self):
+        plan = StudyPlan.objects.create(teacher=self.dean, subject_name='Algebra')
+        list_etag = self.etag('/api/study-plans/')
+        detail_etag = self.etag(f'/api/study-plans/{plan.pk}/')
+        self.dean.department = 'Mathematics'
+        self.dean.save()
+        self.assertNotEqual(self.etag('/api/study-plans/'), list_etag)
+        self.assertNotEqual(self.etag(f'/api/study-plans/{plan.pk}/'), detail_etag)
+        rows = self.client.get('/api/study-plans/', HTTP_IF_NONE_MATCH=list_etag).json()['results']
+        self.assertEqual([row['department'] for row in rows], ['Mathematics'])
+
+    def test_detail_is_not_modified(self):
+        url = f'/api/meetings/{self.meeting.pk}/'
+        etag = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/meetings/999999/', HTTP_IF_NONE_MATCH=etag).status_code, 404)
+        Meeting.objects.filter(pk=self.meeting.pk).first().save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ResponseCacheTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        seed_tenant(meetings=15)
+        response_cache.stats.reset()
+
+    def meeting_queries(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response, [q for q in ctx.captured_queries if 'SELECT "profiles_meeting"' in q['sql']]
+
+    def test_repeated_reads_are_served_from_the_cache(self):
+        first, queries = self.meeting_queries('/api/dean/meetings/', page=2)
+        self.assertTrue(queries)
+        second, queries = self.meeting_queries('/api/dean/meetings/', page=2)
+        self.assertEqual(queries, [])
+        self.assertEqual(second.json(), first.json())
+        # Different query parameters are a different entry
+        _, queries = self.meeting_queries('/api/dean/meetings/', page=1)
+        self.assertTrue(queries)
+
+        stats = self.client.get('/api/cache/stats/')
+        self.assertEqual(stats.status_code, 403)
+        # The statistics cover every tenant in the process; a university's own admin may not read them
+        self.client.force_login(User.objects.create_user(username='admin', email='admin@example.com', role='admin'))
+        self.assertEqual(self.client.get('/api/cache/stats/').status_code, 403)
+        with self.settings(METRICS_TOKEN='scrape-secret'):
+            stats = self.client.get('/api/cache/stats/', HTTP_AUTHORIZATION='Metrics scrape-secret')
+        stats = stats.json()['response_cache']
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries_stored']), (1, 2, 2))
+        self.assertGreater(stats['largest_entry_bytes'], 0)
+
+    def test_links_follow_the_host_and_scheme(self):
+        Domain.objects.create(tenant=self.tenant, domain='alias.fast-test.com', is_primary=False)
+        self.addCleanup(tenant_cache.clear)
+        first = self.client.get('/api/dean/meetings/', {'page': 2}).json()
+        with self.settings(ALLOWED_HOSTS=['*']):
+            alias = self.client.get('/api/dean/meetings/', {'page': 2}, HTTP_HOST='alias.fast-test.com').json()
+            secure = self.client.get('/api/dean/meetings/', {'page': 2}, secure=True).json()
+        self.assertEqual(alias['results'], first['results'])
+        self.assertTrue(alias['previous'].startswith('http://alias.fast-test.com/'), alias['previous'])
+        self.assertTrue(secure['previous'].startswith('https://'), secure['previous'])
+        self.assertTrue(first['previous'].startswith(f'http://{self.get_test_tenant_domain()}/'), first['previous'])
+
+    def test_writes_invalidate_only_their_model(self):
+        url = '/api/dean/meetings/'
+        self.meeting_queries(url)
+        self.meeting_queries('/api/schedules/')
+        meeting = Meeting.objects.order_by('id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/dean/meetings/{meeting.pk}/', {'title': 'Renamed'},
+                                          content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        response, queries = self.meeting_queries(f'/api/dean/meetings/{meeting.pk}/')
+        self.assertTrue(queries)
+        self.assertEqual(response.json()['title'], 'Renamed')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/schedules/')
+        self.assertFalse([q for q in ctx.captured_queries if 'SELECT "profiles_schedule"' in q['sql']])
+
+    def test_process_local_cache_is_off_with_several_workers(self):
+        with override_settings(SERVER_WORKERS=4):
+            self.assertFalse(response_cache.enabled())
+            self.meeting_queries('/api/dean/meetings/')
+            _, queries = self.meeting_queries('/api/dean/meetings/')
+            self.assertTrue(queries)
+        self.assertEqual(response_cache.stats.as_dict()['entries_stored'], 0)
+        shared = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+        with override_settings(SERVER_WORKERS=4, CACHES={**settings.CACHES, 'responses': shared}):
+            self.assertTrue(response_cache.enabled())
+
+    def test_entries_are_keyed_by_role(self):
+        self.meeting_queries('/api/meetings/')
+        self.client.force_login(User.objects.create_user(username='coord', email='coord@example.com'))
+        _, queries = self.meeting_queries('/api/meetings/')
+        self.assertTrue(queries)
+
+
+class ValuesFastPathTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        seed_tenant(teachers=3, plans=25, meetings=25)
+        Meeting.objects.filter(id__in=Meeting.objects.order_by('id').values('id')[:5]).update(
+            participants=['Dr. Smith', 'Dr. "Quoted"'], description=None, agenda='Budget \u2013 2025\u2028Ünal')
+        StudyPlan.objects.filter(id__in=StudyPlan.objects.order_by('id').values('id')[:5]).update(
+            submitted_at=timezone.now(), progress_percentage='12.5')
+        Schedule.objects.bulk_create(
+            Schedule(course_name=f'Course {i}', instructor=f'Dr. {i}', day='Monday', room=f'R{i}',
+                     start_time=datetime.time(8 + i, 15, 30), end_time=datetime.time(9 + i))
+            for i in range(5)
+        )
+
+    def assertSameOutput(self, viewset, queryset):
+        expected = JSONRenderer().render(viewset.serializer_class(queryset, many=True).data)
+        values = viewset.values_serializer
+        fast = values.represent(values.values(queryset))
+        self.assertEqual(JSONRenderer().render(fast), expected)
+        self.assertEqual(FastJSONRenderer().render(fast), expected)
+
+    def test_values_path_matches_the_serializers(self):
+        self.assertSameOutput(ScheduleViewSet, Schedule.objects.order_by('id'))
+        self.assertSameOutput(MeetingViewSet, Meeting.objects.order_by('id'))
+        self.assertSameOutput(StudyPlanViewSet, StudyPlan.objects.select_related('teacher').order_by('id'))
+
+    def test_list_endpoints_match_the_serializers(self):
+        User.objects.filter(pk=self.dean.pk).update(is_staff=True)  # sees every study plan
+        for url, serializer_class, queryset in (
+            ('/api/meetings/', MeetingSerializer, Meeting.objects.order_by('-date', '-id')),
+            ('/api/study-plans/', StudyPlanSerializer, StudyPlan.objects.order_by('-created_at', '-id')),
+        ):
+            for params in ({}, {'cursor': ''}):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, 200, response.content)
+                expected = json.loads(JSONRenderer().render(serializer_class(queryset[:10], many=True).data))
+                self.assertEqual(response.json()['results'], expected, url)
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'when': timezone.now(), 'day': datetime.date(2025, 1, 2), 'at': datetime.time(9, 30, 15, 250),
+            'amount': Decimal('1.50'), 'text': 'Ünïcode \u2028 "quoted"', 'nested': [{'a': None}, (1, 2.5)],
+            1: 'int key',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=4'),
+                         JSONRenderer().render(data, 'application/json; indent=4'))
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_serializers', rows=50, repeat=1, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        self.assertFalse(Schedule.objects.filter(course_name__startswith='benchmark-').exists())
+
+
+class APIBenchmarkTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        seed_tenant(students=30, teachers=3, plans=10, meetings=10, schedules=12, activities=10,
+                    password=DEFAULT_PASSWORD)
+        Student.objects.filter(pk__in=Student.objects.order_by('pk').values('pk')[:3]).update(gpa=1.0)
+        AcademicDecision.objects.create(student=User.objects.filter(role='student').first(),
+                                        decision_type='first-warning', issued_by=self.dean)
+        self.addCleanup(connection.set_tenant, self.tenant)
+
+    def test_every_route_is_benchmarked(self):
+        benchmarked = {endpoint.url_name for endpoint in benchmarks.ENDPOINTS}
+        routes = {pattern.name for pattern in profile_urls.urlpatterns}
+        self.assertEqual(routes - benchmarked, set())
+        self.assertTrue({'token_obtain_pair', 'token_refresh', 'jwt-create', 'user-me'} <= benchmarked)
+
+    def test_seeded_timetable_has_no_double_bookings(self):
+        self.assertEqual(Schedule.objects.count(), 12)
+        self.assertEqual(timetable_conflicts(), [])
+
+    def test_every_endpoint_answers_and_writes_are_rolled_back(self):
+        def snapshot():
+            return (Schedule.objects.count(), Meeting.objects.count(), AcademicDecision.objects.count(),
+                    sorted(StudyPlan.objects.values_list('submission_status', flat=True)))
+
+        before = snapshot()
+        results = benchmarks.APIBenchmark(self.tenant, DEFAULT_PASSWORD, repeat=2, warmup=0).run()
+        connection.set_tenant(self.tenant)
+        self.assertEqual(snapshot(), before)
+        self.assertEqual(list(results), [endpoint.name for endpoint in benchmarks.ENDPOINTS])
+        for name, result in results.items():
+            self.assertIn(result['status'], (200, 201), name)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'], name)
+        self.assertGreater(results['GET schedule-list']['queries'], 0)
+
+    def test_regressions(self):
+        baseline = {'a': {'status': 200, 'p50_ms': 10, 'p95_ms': 20, 'queries': 3}}
+        self.assertEqual(benchmarks.regressions({'a': {'status': 200, 'p50_ms': 11, 'p95_ms': 23, 'queries': 3}},
+                                                baseline), [])
+        found = benchmarks.regressions({'a': {'status': 500, 'p50_ms': 30, 'p95_ms': 40, 'queries': 4},
+                                        'new': {'status': 200, 'p50_ms': 1, 'p95_ms': 1, 'queries': 1}}, baseline)
+        self.assertEqual(found, ['a: status 200 -> 500', 'a: queries 3 -> 4', 'a: p95 20.0ms -> 40.0ms'])
+
+    def test_command_records_and_checks_a_baseline(self):
+        path = os.path.join(tempfile.mkdtemp(), 'baseline.json')
+        options = dict(schema=self.tenant.schema_name, only='dashboard', repeat=1, warmup=0, baseline=path)
+        out = io.StringIO()
+        call_command('benchmark_api', stdout=out, **options)
+        self.assertIn('Baseline written', out.getvalue())
+        with open(path) as f:
+            document = json.load(f)
+        self.assertEqual(set(document['endpoints']),
+                         {'GET dean-dashboard', 'GET dean-dashboard-stats', 'GET dean-dashboard-recent-activity'})
+
+        document['endpoints']['GET dean-dashboard-recent-activity']['queries'] -= 1
+        with open(path, 'w') as f:
+            json.dump(document, f)
+        with self.assertRaisesMessage(CommandError, '1 regressions'):
+            call_command('benchmark_api', stdout=io.StringIO(), stderr=io.StringIO(), **options)
+
+
+class MetricsTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        seed_tenant(meetings=15)
+        metrics.registry.reset()
+        response_cache.stats.reset()
+        self.addCleanup(metrics.registry.reset)
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', role='admin')
+
+    def test_server_timing_reports_sql_and_serialization(self):
+        # A plain client, so the tenant client's own domain lookup is not captured
+        client = HttpClient(HTTP_HOST=self.tenant.get_primary_domain().domain)
+        client.force_login(self.dean)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/meetings/')
+        self.assertEqual(response.status_code, 200)
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'total', 'db', 'serialize'})
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', timing['db'])
+        self.assertGreater(float(timing['serialize'].split('=')[1]), 0)
+
+    def test_metrics_aggregate_per_view_and_tenant(self):
+        for _ in range(3):
+            self.client.get('/api/meetings/')
+        self.client.force_login(self.admin)
+        # The registry holds every tenant's series; a university's own admin may not read it
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with self.settings(METRICS_TOKEN='scrape-secret'):
+            response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Metrics scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        series = f'view="meeting-list",tenant="{self.tenant.schema_name}"'
+        self.assertIn(f'erp_requests_total{{{series},method="GET",status="200"}} 3', body)
+        self.assertIn(f'erp_request_duration_seconds_bucket{{{series},le="+Inf"}} 3', body)
+        self.assertIn(f'erp_request_sql_queries_count{{{series}}} 3', body)
+        self.assertIn('erp_response_cache_hits_total 2', body)
+
+    def test_metrics_access(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.client.logout()
+        with self.settings(METRICS_TOKEN='scrape-secret'):
+            self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Metrics wrong').status_code, 401)
+            response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Metrics scrape-secret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_slow_requests_log_their_sql(self):
+        with mock.patch.object(metrics, 'SLOW_REQUEST_MS', 0), self.assertLogs('profiles.metrics', 'WARNING') as logs:
+            self.client.get('/api/meetings/')
+        self.assertIn('Slow request GET /api/meetings/', logs.output[0])
+        self.assertIn('FROM "profiles_meeting"', logs.output[0])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((1, 5))
+        for value in (0, 1, 3, 9):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()), [(1, 2), (5, 3), ('+Inf', 4)])
+        self.assertEqual((histogram.count, histogram.sum), (4, 13))
+
+
+class DeanDashboardTests(TenantAPITestCase):
+    url = '/api/dean/dashboard/'
+
+    def setUp(self):
+        super().setUp()
+        seed_tenant(students=20, teachers=3, plans=30, meetings=30, activities=15)
+
+    def test_bundle_matches_the_separate_endpoints(self):
+        body = self.client.get(self.url).json()
+        self.assertEqual(body['stats'], compute_dashboard_stats())
+        self.assertEqual(body['stats'], self.client.get('/api/dean/dashboard/stats/').json())
+        self.assertEqual(body['recent_activity'],
+                         self.client.get('/api/dean/dashboard/recent-activity/').json()['results'][:10])
+
+        submitted = StudyPlan.objects.filter(submission_status='submitted').order_by('-created_at', '-id')
+        self.assertEqual([plan['id'] for plan in body['plans_to_review']],
+                         [plan.pk for plan in submitted[:10]])
+        self.assertEqual(body['plans_to_review'][0], StudyPlanSerializer(submitted[0]).data)
+        unsigned = Meeting.objects.filter(status='completed', signedByDean=False).order_by('-date', '-id')
+        self.assertEqual([meeting['id'] for meeting in body['meetings_to_sign']],
+                         [meeting.pk for meeting in unsigned[:10]])
+
+    def test_only_deans(self):
+        teacher = User.objects.get(username='seed-teacher0')
+        self.client.force_login(teacher)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get('/api/dean/dashboard/stats/').status_code, 403)
+
+    def test_queries_run_concurrently_outside_transactions(self):
+        def slow(value):
+            def query():
+                time.sleep(0.2)
+                return value
+            return query
+
+        with mock.patch.object(asyncapi, '_request_state', return_value=(self.tenant, False)), \
+                mock.patch.object(asyncapi, '_run_on_worker', lambda tenant, query: query()):
+            started = time.monotonic()
+            results = async_to_sync(asyncapi.gather_queries)(slow(1), slow(2), slow(3))
+            elapsed = time.monotonic() - started
+        self.assertEqual(results, [1, 2, 3])
+        self.assertLess(elapsed, 0.5)
+
+
+class DeploymentTests(SimpleTestCase):
+    def test_several_workers_need_a_shared_default_cache(self):
+        deployment.require_shared_default_cache()
+        with override_settings(SERVER_WORKERS=4):
+            with self.assertRaises(ImproperlyConfigured):
+                deployment.require_shared_default_cache()
+            shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'cache'}
+            with override_settings(CACHES={**settings.CACHES, 'default': shared}):
+                deployment.require_shared_default_cache()
+
+
+class GatherQueriesTests(TransactionTestCase):
+    """gather_queries() on its real worker threads, which need committed rows in real tenant schemas."""
+    databases = {'default'}
+    schemas = ('gather_a', 'gather_b')
+
+    def setUp(self):
+        self.addCleanup(self.drop_schemas, *self.schemas, provisioning.TEMPLATE_SCHEMA)
+        # Before the schemas go: the worker threads hold connections on them
+        self.addCleanup(asyncapi.shutdown)
+        call_command('create_tenant_template', stdout=io.StringIO())
+        self.tenants = []
+        for schema_name, users in zip(self.schemas, (2, 5)):
+            tenant = Tenant.objects.create(schema_name=schema_name, name=schema_name)
+            with schema_context(schema_name):
+                User.objects.bulk_create([User(username=f'{schema_name}-{i}', email=f'{schema_name}-{i}@example.com',
+                                               role='teacher') for i in range(users)])
+            self.tenants.append(tenant)
+
+    def drop_schemas(self, *names):
+        connection.set_schema_to_public()
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f'DROP SCHEMA IF EXISTS "{name}" CASCADE')
+
+    def gather(self, tenant, *queries):
+        connection.set_tenant(tenant)
+        timings = metrics.RequestTimings()
+        token = metrics.current.set(timings)
+        try:
+            return async_to_sync(asyncapi.gather_queries)(*queries), timings
+        finally:
+            metrics.current.reset(token)
+
+    def test_queries_run_on_workers_in_the_request_tenant(self):
+        def count_users():
+            time.sleep(0.05)  # keeps every worker thread busy, so each one serves both tenants
+            return User.objects.count()
+
+        workers = asyncapi.WORKERS
+        for tenant, users in zip(self.tenants, (2, 5)):
+            results, timings = self.gather(tenant, *[count_users] * workers)
+            self.assertEqual(results, [users] * workers)
+            # Statements on the worker connections count towards the request's SQL timings
+            self.assertEqual(len([sql for _, sql in timings.queries if 'profiles_user' in sql]), workers)
+
+    def test_worker_connection_is_closed_after_an_error(self):
+        used = []
+
+        def broken():
+            used.append(connections['default'])  # the worker thread's own wrapper, not the proxy
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1 / 0')
+
+        with self.assertRaises(DatabaseError):
+            self.gather(self.tenants[0], broken)
+        self.assertIsNone(used[0].connection)
+        self.assertEqual(self.gather(self.tenants[1], User.objects.count)[0], [5])
+
+
+class MeetingAttendanceTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        meetings = [
+            ('2024-01-10', 'completed', ['Dr. Smith', 'Dr. Jones']),
+            ('2024-03-05', 'completed', ['Dr. Smith', 'Dr. Smith']),
+            ('2024-06-01', 'completed', ['Dr. Jones', 'Prof. Lee']),
+            ('2025-02-01', 'completed', ['Dr. Smith']),
+            ('2025-09-01', 'upcoming', ['Dr. Smith', 'Prof. Lee']),
+            ('2024-04-04', 'completed', None),
+            ('2024-04-05', 'completed', {'not': 'a list'}),
+        ]
+        for date, status, participants in meetings:
+            Meeting.objects.create(title='Council', date=date, time='10:00', location='Hall', status=status,
+                                   participants=participants, department='CS' if date < '2025' else 'Math')
+
+    def test_participant_filter(self):
+        for url in ('/api/meetings/', '/api/dean/meetings/'):
+            body = self.client.get(url, {'participant': 'Prof. Lee', 'page_size': 50}).json()
+            self.assertEqual(sorted(m['date'] for m in body['results']), ['2024-06-01', '2025-09-01'])
+        self.assertEqual(self.client.get('/api/meetings/', {'participant': 'Dr.'}).json()['count'], 0)
+
+    def test_report_counts_completed_meetings_per_person(self):
+        body = self.client.get('/api/meetings/attendance/').json()
+        self.assertEqual(body['meetings'], 6)
+        self.assertEqual(body['participants'], [
+            {'participant': 'Dr. Smith', 'attended': 3, 'first_attended': '2024-01-10',
+             'last_attended': '2025-02-01', 'attendance_rate': 0.5},
+            {'participant': 'Dr. Jones', 'attended': 2, 'first_attended': '2024-01-10',
+             'last_attended': '2024-06-01', 'attendance_rate': 2 / 6},
+            {'participant': 'Prof. Lee', 'attended': 1, 'first_attended': '2024-06-01',
+             'last_attended': '2024-06-01', 'attendance_rate': 1 / 6},
+        ])
+
+    def test_report_filters(self):
+        body = self.client.get('/api/dean/meetings/attendance/',
+                               {'from': '2024-02-01', 'to': '2024-12-31', 'participant': 'Dr. Smith'}).json()
+        self.assertEqual((body['from'], body['to'], body['meetings']), ('2024-02-01', '2024-12-31', 4))
+        self.assertEqual([(row['participant'], row['attended']) for row in body['participants']], [('Dr. Smith', 1)])
+        body = self.client.get('/api/meetings/attendance/', {'department': 'Math'}).json()
+        self.assertEqual([(row['participant'], row['attended']) for row in body['participants']], [('Dr. Smith', 1)])
+        self.assertEqual(self.client.get('/api/meetings/attendance/', {'from': 'May'}).status_code, 400)
+
+
+class SearchTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', role='teacher')
+        self.probation = Meeting.objects.create(
+            title='Probation review', date='2024-05-02', time='10:00', location='Hall', status='completed',
+            agenda='Students on academic probation', minutes='Probation extended for <b>two</b> students with GPA < 2 & absences.')
+        self.budget = Meeting.objects.create(
+            title='Budget', date='2024-06-01', time='10:00', location='Hall', status='completed',
+            agenda='Library budget', description='Mentions probation once')
+        self.plan = StudyPlan.objects.create(
+            teacher=teacher, subject_name='Statistics', plan_content='Week 3: students on probation retake the quiz')
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_ranks_hits_across_meetings_and_study_plans(self):
+        body = self.search(q='probation')
+        self.assertEqual(body['count'], 3)
+        results = body['results']
+        # Title (weight A) and repeated matches rank the probation meeting first
+        self.assertEqual((results[0]['type'], results[0]['id'], results[0]['title'], results[0]['date']),
+                         ('meeting', self.probation.pk, 'Probation review', '2024-05-02'))
+        self.assertEqual({(r['type'], r['id']) for r in results[1:]},
+                         {('meeting', self.budget.pk), ('study_plan', self.plan.pk)})
+        self.assertEqual([r['rank'] for r in results], sorted((r['rank'] for r in results), reverse=True))
+        self.assertEqual(self.search(q='probation', type='study_plan')['results'][0]['title'], 'Statistics')
+
+    def test_web_search_syntax_and_stemming(self):
+        self.assertEqual({r['id'] for r in self.search(q='"academic probation"')['results']}, {self.probation.pk})
+        self.assertEqual(self.search(q='probation -library')['count'], 2)
+        self.assertEqual(self.search(q='retakes')['results'][0]['id'], self.plan.pk)
+        self.assertEqual(self.search(q='nonexistent')['count'], 0)
+
+    def test_snippets_are_escaped_and_highlighted(self):
+        snippet = self.search(q='extended')['results'][0]['snippet']
+        self.assertIn('<mark>extended</mark>', snippet)
+        self.assertIn('GPA &lt; 2 &amp; absences', snippet)
+        self.assertNotIn('<b>', snippet)
+
+    def test_vectors_follow_updates_and_bulk_writes(self):
+        Meeting.objects.filter(pk=self.budget.pk).update(minutes='Accreditation visit planned')
+        StudyPlan.objects.bulk_create([StudyPlan(teacher=self.plan.teacher, subject_name='Accreditation')])
+        self.assertEqual({r['type'] for r in self.search(q='accreditation')['results']}, {'meeting', 'study_plan'})
+        self.plan.plan_content = 'Nothing relevant'
+        self.plan.save()
+        self.assertEqual(self.search(q='retake')['count'], 0)
+
+    def test_search_vector_is_not_loaded_or_serialized(self):
+        self.assertNotIn('search_vector', Meeting.objects.get(pk=self.probation.pk).__dict__)
+        self.assertNotIn('search_vector', self.client.get(f'/api/meetings/{self.probation.pk}/').json())
+
+    def test_pagination(self):
+        Meeting.objects.bulk_create(
+            Meeting(title=f'Probation {i}', date='2024-01-01', time='10:00', location='Hall', status='upcoming')
+            for i in range(12))
+        first = self.search(q='probation', page_size=10)
+        self.assertEqual((first['count'], len(first['results'])), (15, 10))
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 5)
+        seen = {(r['type'], r['id']) for r in first['results'] + second['results']}
+        self.assertEqual(len(seen), 15)
+        self.assertEqual(second['count'], 15)
+        self.assertIsNone(second['next'])
+        self.assertEqual(self.client.get('/api/search/', {'q': 'probation', 'page': 3}).status_code, 404)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'probation', 'page': 'x'}).status_code, 404)
+        self.assertEqual(self.search(q='nonexistent', page=1)['results'], [])
+
+    def test_validation_and_permissions(self):
+        self.assertEqual(self.client.get('/api/search/').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'x', 'type': 'schedule'}).status_code, 400)
+        self.client.force_login(self.plan.teacher)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'probation'}).status_code, 403)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_search', meetings=30, plans=20, batch=25, repeat=2, stdout=out)
+        self.assertIn('"academic probation"', out.getvalue())
+        self.assertEqual(Meeting.objects.count(), 2)
+        self.assertFalse(User.objects.filter(username='search-benchmark').exists())
+
+
+class DecisionSummaryTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_students(2)
+        self.first, self.second = User.objects.filter(role='student').order_by('id')
+
+    def summary(self, user):
+        student = Student.objects.get(user=user)
+        return student.warnings_count, student.latest_decision_type, student.latest_decision_at
+
+    def issue(self, user, decision_type='first-warning'):
+        return AcademicDecision.objects.create(student=user, decision_type=decision_type, issued_by=self.dean)
+
+    def test_follows_creates_updates_and_deletes(self):
+        first = self.issue(self.first)
+        self.assertEqual(self.summary(self.first), (1, 'first-warning', first.issued_at))
+        second = self.issue(self.first, 'second-warning')
+        self.assertEqual(self.summary(self.first), (2, 'second-warning', second.issued_at))
+        second.delete()
+        self.assertEqual(self.summary(self.first), (1, 'first-warning', first.issued_at))
+        # Moving a decision to another student updates both
+        first = AcademicDecision.objects.get(pk=first.pk)
+        first.student = self.second
+        first.save()
+        self.assertEqual(self.summary(self.first), (0, None, None))
+        self.assertEqual(self.summary(self.second), (1, 'first-warning', first.issued_at))
+        AcademicDecision.objects.all().delete()
+        self.assertEqual(self.summary(self.second), (0, None, None))
+
+    def test_summary_is_written_with_the_decision(self):
+        with mock.patch('profiles.standing.refresh_summaries', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.issue(self.first)
+        self.assertFalse(AcademicDecision.objects.exists())
+
+    def test_api_issue_paths(self):
+        self.client.post('/api/dean/academic-decisions/issue/',
+                         {'student': self.first.pk, 'decision_type': 'dismissal'})
+        self.client.post('/api/dean/academic-decisions/issue-bulk/',
+                         {'students': [self.first.pk, self.second.pk], 'decision_type': 'first-warning'},
+                         content_type='application/json')
+        self.assertEqual(self.summary(self.first)[:2], (2, 'first-warning'))
+        self.assertEqual(self.summary(self.second)[:2], (1, 'first-warning'))
+        rows = self.client.get('/api/dean/academic-decisions/students/', {'warnings': 2}).json()['results']
+        self.assertEqual([row['id'] for row in rows], [self.first.pk])
+
+    def test_repair_command(self):
+        self.issue(self.first)
+        self.issue(self.second, 'second-warning')
+        # Bypasses the model
+        AcademicDecision.objects.filter(student=self.second).update(student=self.first)
+        Student.objects.update(warnings_count=7)
+        out = io.StringIO()
+        call_command('repair_decision_summaries', batch_size=1, stdout=out)
+        self.assertIn('2 students', out.getvalue())
+        self.assertEqual(self.summary(self.first)[:2], (2, 'second-warning'))
+        self.assertEqual(self.summary(self.second), (0, None, None))
+
+
+class GpaTests(TenantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.make_students(2)
+        self.first, self.second = User.objects.filter(role='student').order_by('id')
+
+    def gpas(self, user):
+        student = Student.objects.get(user=user)
+        return student.gpa, student.term_gpa
+
+    def grade(self, user, course, credits, year, semester, letter):
+        enrollment = Enrollment.objects.create(student=user, course_code=course, credit_hours=credits,
+                                               year=year, semester=semester)
+        return Grade.objects.create(enrollment=enrollment, letter=letter, graded_by=self.dean)
+
+    def test_compute_matches_scalar_reference(self):
+        rng = random.Random(7)
+        rows = [
+            (rng.randint(1, 300), gpa.term_key(rng.randint(2018, 2025), rng.choice(gpa.SEMESTERS)),
+             rng.choice([0, 1, 1.5, 3, 4]), rng.choice(list(Grade.POINTS.values())))
+            for _ in range(5000)
+        ]
+        terms = gpa.compute(gpa.GradeArrays.from_rows(rows))
+        reference = gpa.scalar_gpas(rows)
+        self.assertEqual(list(zip(terms.student.tolist(), terms.term.tolist())), sorted(reference))
+        for student, term, credits, term_gpa, cumulative in zip(
+                terms.student.tolist(), terms.term.tolist(), terms.credits.tolist(),
+                terms.term_gpa.tolist(), terms.cumulative_gpa.tolist()):
+            expected = reference[student, term]
+            self.assertAlmostEqual(credits, expected[0])
+            for value, expected_value in zip((term_gpa, cumulative), expected[1:]):
+                if math.isnan(expected_value):
+                    self.assertTrue(math.isnan(value))
+                else:
+                    self.assertAlmostEqual(value, expected_value, places=9)
+        # The reference itself, by hand: a term GPA of (3 x 4.0 + 1 x 2.0) / 4, then a zero-credit term
+        reference = gpa.scalar_gpas([(1, 20240, 3, 4.0), (1, 20240, 1, 2.0), (1, 20242, 0, 3.0)])
+        self.assertEqual(reference[1, 20240], (4, 3.5, 3.5))
+        credits, term_gpa, cumulative = reference[1, 20242]
+        self.assertEqual((credits, cumulative), (0, 3.5))
+        self.assertTrue(math.isnan(term_gpa))
+        self.assertEqual(gpa.term_label(gpa.term_key(2024, 'fall')), (2024, 'fall'))
+
+    def test_grades_update_the_student(self):
+        self.grade(self.first, 'HIST101', 3, 2023, 'fall', 'D')
+        math_grade = self.grade(self.first, 'MATH201', 3, 2024, 'spring', 'A')
+        self.grade(self.first, 'PHYS201', 4, 2024, 'spring', 'B')
+        # Neither pass/withdrawn grades nor zero-credit courses count
+        self.grade(self.first, 'ART100', 2, 2024, 'spring', 'P')
+        self.grade(self.first, 'LAB201', 0, 2024, 'spring', 'A')
+        self.grade(self.first, 'CHEM301', 3, 2024, 'fall', 'W')
+        self.assertEqual(self.gpas(self.first), (round(27 / 10, 2), round(24 / 7, 2)))
+        latest = self.grade(self.first, 'HIST301', 3, 2024, 'fall', 'C')
+        # (3 + 12 + 12 + 6) / 13; fall 2023 sorts before spring 2024
+        self.assertEqual(self.gpas(self.first), (2.54, 2.0))
+        math_grade.letter = 'F'
+        math_grade.save()
+        self.assertEqual(self.gpas(self.first), (round(21 / 13, 2), 2.0))
+        latest.enrollment.delete()
+        self.assertEqual(self.gpas(self.first), (round(15 / 10, 2), round(12 / 7, 2)))
+        # Only the student whose grade changed is recomputed
+        self.assertEqual(self.gpas(self.second), (1.5, None))
+
+    def test_losing_the_last_grade_clears_the_gpa(self):
+        only = self.grade(self.first, 'MATH201', 3, 2024, 'spring', 'A')
+        self.assertEqual(self.gpas(self.first), (4.0, 4.0))
+        only.letter = 'W'
+        only.save()
+        self.assertEqual(self.gpas(self.first), (None, None))
+        only.letter = 'B'
+        only.save()
+        self.assertEqual(self.gpas(self.first), (3.0, 3.0))
+        only.delete()
+        self.assertEqual(self.gpas(self.first), (None, None))
+        self.grade(self.first, 'PHYS201', 4, 2024, 'spring', 'C').enrollment.delete()
+        self.assertEqual(self.gpas(self.first), (None, None))
+        # A hand-entered GPA is not derived, so it is never cleared
+        self.assertEqual(self.gpas(self.second), (1.5, None))
+
+    def test_moves_recompute_both_students(self):
+        moved = self.grade(self.first, 'MATH201', 3, 2024, 'spring', 'A')
+        self.grade(self.first, 'PHYS201', 3, 2024, 'spring', 'C')
+        target = Enrollment.objects.create(student=self.second, course_code='MATH202', credit_hours=3,
+                                           year=2024, semester='spring')
+        grade = Grade.objects.get(pk=moved.pk)
+        grade.enrollment = target
+        grade.save()
+        self.assertEqual(self.gpas(self.first), (2.0, 2.0))
+        self.assertEqual(self.gpas(self.second), (4.0, 4.0))
+        enrollment = Enrollment.objects.get(pk=target.pk)
+        enrollment.student = self.first
+        enrollment.save()
+        self.assertEqual(self.gpas(self.first), (3.0, 3.0))
+        self.assertEqual(self.gpas(self.second), (None, None))
+
+    def test_stale_student_saves_keep_the_maintained_columns(self):
+        stale, hand_entered = Student.objects.get(user=self.first), Student.objects.get(user=self.second)
+        self.grade(self.first, 'MATH201', 3, 2024, 'spring', 'A')
+        AcademicDecision.objects.create(student=self.first, decision_type='first-warning', issued_by=self.dean)
+        stale.department = 'Math'
+        stale.gpa = 1.0
+        stale.save()
+        student = Student.objects.get(user=self.first)
+        self.assertEqual((student.department, student.gpa, student.term_gpa), ('Math', 4.0, 4.0))
+        self.assertEqual((student.warnings_count, student.latest_decision_type), (1, 'first-warning'))
+        # A GPA that is not derived from grades can still be entered by hand
+        hand_entered.gpa = 2.5
+        hand_entered.save()
+        self.assertEqual(self.gpas(self.second), (2.5, None))
+
+    def test_enrollment_is_written_with_the_gpa(self):
+        enrollment = self.grade(self.first, 'MATH201', 3, 2024, 'spring', 'A').enrollment
+        enrollment.credit_hours = 4
+        with mock.patch('profiles.gpa.recompute_gpas', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                enrollment.save()
+        self.assertEqual(Enrollment.objects.get(pk=enrollment.pk).credit_hours, 3)
+
+    def test_grade_is_written_with_the_gpa(self):
+        with mock.patch('profiles.gpa.recompute_gpas', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.grade(self.first, 'MATH201', 3, 2024, 'spring', 'A')
+        self.assertFalse(Grade.objects.exists())
+
+    def test_recompute_command(self):
+        enrollments = Enrollment.objects.bulk_create([
+            Enrollment(student=user, course_code='MATH201', credit_hours=3, year=2024, semester='spring')
+            for user in (self.first, self.second)
+        ])
+        # Bypasses the per-student recompute
+        Grade.objects.bulk_create([Grade(enrollment=enrollments[0], letter='A'),
+                                   Grade(enrollment=enrollments[1], letter='B')])
+        Student.objects.filter(user=self.second).update(department='Math')
+        out = io.StringIO()
+        call_command('recompute_gpas', department='CS', stdout=out)
+        self.assertIn('1 students', out.getvalue())
+        self.assertEqual(self.gpas(self.first), (4.0, 4.0))
+        self.assertEqual(self.gpas(self.second), (1.5, None))
+        call_command('recompute_gpas', stdout=out)
+        self.assertEqual(self.gpas(self.second), (3.0, 3.0))
+        # Withdrawn in bulk: the full recompute clears the GPAs derived from the old letters
+        Grade.objects.update(letter='W')
+        call_command('recompute_gpas', stdout=out)
+        self.assertEqual([self.gpas(self.first), self.gpas(self.second)], [(None, None)] * 2)
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command('benchmark_gpa', students=30, courses=10, repeat=2, stdout=out)
+        self.assertIn('Cohort recompute', out.getvalue())
+        self.assertIn('largest difference', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='gpa-benchmark').exists())
 
-# Create your tests here.
@@ -1,5 +1,5 @@
 from rest_framework.routers import DefaultRouter
-from .views import ScheduleViewSet, MeetingViewSet, StudyPlanViewSet, RecentActivityViewSet, DeanMeetingViewSet, DeanAcademicDecisionViewSet, DeanPlanApprovalViewSet, DeanDashboardStatsView, DeanRecentActivityView
+from .views import ScheduleViewSet, MeetingViewSet, StudyPlanViewSet, RecentActivityViewSet, DeanMeetingViewSet, DeanAcademicDecisionViewSet, DeanPlanApprovalViewSet, DeanDashboardView, DeanDashboardStatsView, DeanRecentActivityView, CacheStatsView, MetricsView, SearchView
 
 router = DefaultRouter()
 router.register(r'schedules', ScheduleViewSet)
@@ -12,6 +12,10 @@ router.register(r'dean/plan-approval', DeanPlanApprovalViewSet, basename='dean-p
 
 from django.urls import path
 urlpatterns = router.urls + [
+    path('dean/dashboard/', DeanDashboardView.as_view(), name='dean-dashboard'),
     path('dean/dashboard/stats/', DeanDashboardStatsView.as_view(), name='dean-dashboard-stats'),
     path('dean/dashboard/recent-activity/', DeanRecentActivityView.as_view(), name='dean-dashboard-recent-activity'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('cache/stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
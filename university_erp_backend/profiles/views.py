@@ -1,8 +1,28 @@
+import asyncio
+import datetime
+import math
+
+from asgiref.sync import sync_to_async
+
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from .models import Schedule, Meeting, StudyPlan, RecentActivity, AcademicDecision, User
 from .serializers import ScheduleSerializer, MeetingSerializer, StudyPlanSerializer, RecentActivitySerializer, AcademicDecisionSerializer
-from .permissions import IsDean, IsTeacherOrAdminOrReadOnly
+from .permissions import IsDean, IsAdmin, IsCentralAdmin, IsTeacherOrAdminOrReadOnly, HasMetricsToken
+from .stats import aget_dashboard_stats, invalidate_dashboard_stats
+from .standing import refresh_summaries
+from .asyncapi import AsyncAPIView, gather_queries
+from .activity import log_activity
+from .pagination import KeysetPagination, PageNumberOrKeysetPagination, SearchPagination
+from .exports import ExportMixin, model_columns
+from .attendance import ParticipantFilterMixin
+from . import search
+from .conditional import ConditionalGetMixin
+from .fastpath import ValuesListMixin, ValuesSerializer
+from .response_cache import ResponseCacheMixin, stats as response_cache_stats
+from .conflicts import timetable_conflicts
+from .occupancy import get_index as get_occupancy_index
+from .metrics import registry as metrics_registry
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import status
@@ -10,16 +30,52 @@ from rest_framework.views import APIView
 from django import forms
 from .models import StudyPlan, User
 from django.contrib import admin
+from django.db import transaction
+from django.http import HttpResponse
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce, NullIf
+from public_tenant.middleware import tenant_cache
 
-class ScheduleViewSet(viewsets.ModelViewSet):
+class ScheduleViewSet(ConditionalGetMixin, ResponseCacheMixin, ValuesListMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
+    values_serializer = ValuesSerializer(ScheduleSerializer)
     permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('id',)
+    export_fields = model_columns(Schedule)
+    export_filename = 'schedules'
+
+    @action(detail=False, methods=['get'], url_path='conflicts')
+    def conflicts(self, request):
+        # Whole-timetable double-booking report (one query + an in-memory sweep)
+        conflicts = timetable_conflicts(self.filter_queryset(self.get_queryset()))
+        return Response({'count': len(conflicts), 'conflicts': conflicts})
 
-class MeetingViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], url_path='free-rooms')
+    def free_rooms(self, request):
+        # e.g. ?day=Tuesday&start=10:00&end=12:00, answered from the occupancy bitmaps
+        day = request.query_params.get('day')
+        try:
+            start = datetime.time.fromisoformat(request.query_params.get('start', ''))
+            end = datetime.time.fromisoformat(request.query_params.get('end', ''))
+        except ValueError:
+            return Response({'error': 'start and end must be HH:MM'}, status=status.HTTP_400_BAD_REQUEST)
+        if day not in dict(Schedule._meta.get_field('day').choices) or start >= end:
+            return Response({'error': 'Provide a weekday and a start before end'}, status=status.HTTP_400_BAD_REQUEST)
+        rooms = get_occupancy_index().free_rooms(day, start, end)
+        return Response({'day': day, 'start': start, 'end': end, 'rooms': rooms})
+
+class MeetingViewSet(ConditionalGetMixin, ResponseCacheMixin, ValuesListMixin, ExportMixin, ParticipantFilterMixin,
+                     viewsets.ModelViewSet):
     queryset = Meeting.objects.all()
     serializer_class = MeetingSerializer
+    values_serializer = ValuesSerializer(MeetingSerializer)
     permission_classes = [IsAuthenticated]
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-date', '-id')
+    export_fields = model_columns(Meeting)
+    export_filename = 'meetings'
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -34,13 +90,17 @@ class MeetingViewSet(viewsets.ModelViewSet):
             data['signature'] = dean_name
         serializer = self.get_serializer(instance, data=data, partial=partial)
         serializer.is_valid(raise_exception=True)
+        if serializer.validated_data.get('signedByDean') and not instance.signedByDean:
+            instance._activity_description = f'Signed meeting "{instance.title}"'
         self.perform_update(serializer)
         return Response(serializer.data)
 
-class DeanMeetingViewSet(viewsets.ModelViewSet):
+class DeanMeetingViewSet(ResponseCacheMixin, ParticipantFilterMixin, viewsets.ModelViewSet):
     queryset = Meeting.objects.all()
     serializer_class = MeetingSerializer
     permission_classes = [IsDean]
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-date', '-id')
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
@@ -55,13 +115,22 @@ class DeanMeetingViewSet(viewsets.ModelViewSet):
             data['signature'] = dean_name
         serializer = self.get_serializer(instance, data=data, partial=partial)
         serializer.is_valid(raise_exception=True)
+        if serializer.validated_data.get('signedByDean') and not instance.signedByDean:
+            instance._activity_description = f'Signed meeting "{instance.title}"'
         self.perform_update(serializer)
         return Response(serializer.data)
 
-class StudyPlanViewSet(viewsets.ModelViewSet):
-    queryset = StudyPlan.objects.all()
+class StudyPlanViewSet(ConditionalGetMixin, ValuesListMixin, ExportMixin, viewsets.ModelViewSet):
+    queryset = StudyPlan.objects.select_related('teacher')
     serializer_class = StudyPlanSerializer
+    values_serializer = ValuesSerializer(StudyPlanSerializer, extra={'department': 'teacher__department'})
+    # teacher_username and department come from the teacher's row
+    related_version_fields = ('teacher__updated_at',)
     permission_classes = [IsTeacherOrAdminOrReadOnly]
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+    export_fields = model_columns(StudyPlan, teacher_username='teacher__username', department='teacher__department')
+    export_filename = 'study-plans'
 
     def perform_create(self, serializer):
         # Automatically set the teacher to the logged-in user
@@ -69,57 +138,116 @@ class StudyPlanViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         # Only show study plans for the logged-in user, or all for admin
+        # teacher is selected up front because the serializer reads its username and department
         if self.request.user.is_staff: # or self.request.user.is_coordinator if you add that field
-            return StudyPlan.objects.all()
-        return StudyPlan.objects.filter(teacher=self.request.user)
+            return self.queryset.all()
+        return self.queryset.filter(teacher=self.request.user)
 
 class RecentActivityViewSet(viewsets.ReadOnlyModelViewSet): # Read-only as activities are logged, not created via API
     queryset = RecentActivity.objects.all()
     serializer_class = RecentActivitySerializer
     permission_classes = [IsAuthenticated]
+    # The log only grows: page by (timestamp, id) instead of COUNT + OFFSET
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-id')
 
     def get_queryset(self):
         # In a real scenario, you might filter activities per user or per department
         # For simplicity, returning all or filtering by logged-in user (if user field is set)
         return RecentActivity.objects.all()
 
-class DeanAcademicDecisionViewSet(viewsets.ModelViewSet):
-    queryset = AcademicDecision.objects.all()
+class DeanAcademicDecisionViewSet(ExportMixin, viewsets.ModelViewSet):
+    queryset = AcademicDecision.objects.select_related('student', 'issued_by')
     serializer_class = AcademicDecisionSerializer
     permission_classes = [IsDean]
+    export_fields = model_columns(AcademicDecision, student_username='student__username',
+                                  issued_by_username='issued_by__username')
+    export_filename = 'academic-decisions'
+
+    # Most decisions a single bulk request may issue
+    bulk_issue_limit = 1000
+
+    # ?ordering= values for the students list -> ORDER BY (id breaks ties)
+    student_orderings = {
+        'id': ('id',),
+        'gpa': ('student_gpa', 'id'),
+        '-gpa': ('-student_gpa', 'id'),
+        'warnings': ('student_profile__warnings_count', 'id'),
+        '-warnings': ('-student_profile__warnings_count', 'id'),
+        'latest_decision': ('student_profile__latest_decision_at', 'id'),
+        '-latest_decision': (F('student_profile__latest_decision_at').desc(nulls_last=True), 'id'),
+    }
+
+    def students_needing_attention_queryset(self, params):
+        # Filter students with GPA < threshold (e.g., 2.0, 2.5, 3.0)
+        # GPA, warnings and department are filtered in SQL; students without a
+        # profile count as GPA 0.0 in department 'N/A' with no warnings, as before.
+        # ValueError for a non-numeric gpa or warnings; callers answer 400
+        gpa_threshold = float(params.get('gpa', 2.0))
+        if not math.isfinite(gpa_threshold):
+            raise ValueError('gpa must be a finite number')
+        warnings_count = params.get('warnings', None)
+        if warnings_count is not None:
+            warnings_count = int(warnings_count)
+        department = params.get('department', None)
+        # Predicates are written against the raw columns (not the Coalesce
+        # annotations) so the student gpa/department/warnings indexes stay usable.
+        gpa_filter = Q(student_profile__gpa__lt=gpa_threshold)
+        if gpa_threshold > 0.0:
+            gpa_filter |= Q(student_profile__gpa__isnull=True)
+        students = (
+            User.objects.filter(gpa_filter, is_staff=False, role='student')
+            .annotate(
+                student_gpa=Coalesce('student_profile__gpa', Value(0.0)),
+                student_department=Coalesce(NullIf('student_profile__department', Value('')), Value('N/A')),
+                # Maintained on Student by profiles.standing instead of counted per request
+                prev_warnings=Coalesce('student_profile__warnings_count', Value(0)),
+            )
+        )
+        if warnings_count is not None:
+            warnings_filter = Q(student_profile__warnings_count=warnings_count)
+            if warnings_count == 0:
+                warnings_filter |= Q(student_profile__isnull=True)
+            students = students.filter(warnings_filter)
+        if department == 'N/A':
+            students = students.filter(
+                Q(student_profile__department__isnull=True) | Q(student_profile__department='')
+            )
+        elif department is not None:
+            students = students.filter(student_profile__department=department)
+        return students.order_by(*self.student_orderings[params.get('ordering') or 'id'])
 
     @action(detail=False, methods=['get'], url_path='students')
     def students_needing_attention(self, request):
-        # Filter students with GPA < threshold (e.g., 2.0, 2.5, 3.0)
-        gpa_threshold = float(request.query_params.get('gpa', 2.0))
-        warnings_count = request.query_params.get('warnings', None)
-        department = request.query_params.get('department', None)
-        students = User.objects.filter(is_staff=False, role='student')
-        filtered = []
-        for student in students:
-            print(f"User: {student.username}, role: {student.role}, is_staff: {student.is_staff}")
-            student_profile = getattr(student, 'student_profile', None)
-            if student_profile:
-                print(f"  GPA: {student_profile.gpa}, Department: {student_profile.department}")
-            else:
-                print("  No student profile found!")
-            gpa = student_profile.gpa if student_profile and student_profile.gpa is not None else 0.0
-            dept = student_profile.department if student_profile and student_profile.department else 'N/A'
-            prev_warnings = AcademicDecision.objects.filter(student=student).count()
-            meets_gpa = gpa < gpa_threshold
-            meets_warnings = warnings_count is None or prev_warnings == int(warnings_count)
-            meets_department = department is None or dept == department
-            print(f"  meets_gpa: {meets_gpa}, meets_warnings: {meets_warnings}, meets_department: {meets_department}")
-            if meets_gpa and meets_warnings and meets_department:
-                filtered.append({
-                    'id': student.id,
-                    'fullName': student.get_full_name(),
-                    'studentId': student.id,  # Use numeric ID
-                    'gpa': gpa,
-                    'previousWarnings': prev_warnings,
-                    'department': dept,
-                })
-        return Response(filtered)
+        if (request.query_params.get('ordering') or 'id') not in self.student_orderings:
+            return Response({'error': f'ordering must be one of: {", ".join(self.student_orderings)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            students = self.students_needing_attention_queryset(request.query_params)
+        except ValueError:
+            return Response({'error': 'gpa must be a number and warnings a whole number'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        students = students.values(
+            'id', 'first_name', 'last_name', 'student_gpa', 'student_department', 'prev_warnings',
+            'student_profile__latest_decision_type', 'student_profile__latest_decision_at',
+        )
+        page = self.paginate_queryset(students)
+        rows = [
+            {
+                'id': student['id'],
+                'fullName': f"{student['first_name']} {student['last_name']}".strip(),
+                'studentId': student['id'],  # Use numeric ID
+                'gpa': student['student_gpa'],
+                'previousWarnings': student['prev_warnings'],
+                'latestDecisionType': student['student_profile__latest_decision_type'],
+                'latestDecisionAt': student['student_profile__latest_decision_at'],
+                'department': student['student_department'],
+            }
+            for student in (page if page is not None else students)
+        ]
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
 
     @action(detail=False, methods=['post'], url_path='issue')
     def issue_decision(self, request):
@@ -131,24 +259,102 @@ class DeanAcademicDecisionViewSet(viewsets.ModelViewSet):
             student = User.objects.get(id=student_id)
         except User.DoesNotExist:
             return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
-        decision = AcademicDecision.objects.create(
+        decision = AcademicDecision(
             student=student,
             decision_type=decision_type,
             issued_by=request.user,
             notes=notes
         )
+        decision._activity_description = f'Issued {decision.get_decision_type_display()} to {student.username}'
+        decision.save()
         serializer = self.get_serializer(decision)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='issue-bulk')
+    def issue_bulk(self, request):
+        # Expects either
+        #   decisions: [{student, decision_type, notes}, ...]
+        #   students: [id, ...] with a shared decision_type and notes
+        #   filter: {gpa, warnings, department} (as in /students/) with a shared decision_type and notes
+        # Valid rows are inserted in one transaction; each row reports its own outcome.
+        decision_type = request.data.get('decision_type')
+        notes = request.data.get('notes', '')
+        if not isinstance(request.data.get('decisions', []), list) or not isinstance(request.data.get('students', []), list):
+            return Response({'error': 'decisions and students must be lists'}, status=status.HTTP_400_BAD_REQUEST)
+        if 'decisions' in request.data:
+            rows = [
+                {'student': row.get('student'), 'decision_type': row.get('decision_type', decision_type),
+                 'notes': row.get('notes', notes)}
+                for row in request.data['decisions'] if isinstance(row, dict)
+            ]
+        elif 'students' in request.data:
+            rows = [{'student': sid, 'decision_type': decision_type, 'notes': notes}
+                    for sid in request.data['students']]
+        elif 'filter' in request.data:
+            try:
+                student_ids = self.students_needing_attention_queryset(request.data['filter']).values_list('id', flat=True)
+                student_ids = list(student_ids[:self.bulk_issue_limit + 1])
+            except (AttributeError, KeyError, TypeError, ValueError):
+                return Response({'error': 'Invalid filter'}, status=status.HTTP_400_BAD_REQUEST)
+            rows = [{'student': sid, 'decision_type': decision_type, 'notes': notes} for sid in student_ids]
+        else:
+            return Response({'error': 'Provide decisions, students or filter'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.bulk_issue_limit:
+            return Response({'error': f'At most {self.bulk_issue_limit} decisions per request'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # One query validates every id
+        ids = set()
+        for row in rows:
+            try:
+                row['student'] = int(row['student'])
+                ids.add(row['student'])
+            except (TypeError, ValueError):
+                row['student'] = None
+        students = dict(User.objects.filter(id__in=ids, role='student').values_list('id', 'username'))
+        valid_types = dict(AcademicDecision.DECISION_TYPE_CHOICES)
+
+        results, decisions = [], []
+        for row in rows:
+            if row['student'] not in students:
+                results.append({'student': row['student'], 'status': 'error', 'error': 'Student not found'})
+            elif not isinstance(row['decision_type'], str) or row['decision_type'] not in valid_types:
+                results.append({'student': row['student'], 'status': 'error', 'error': 'Invalid decision_type'})
+            elif row['notes'] is not None and not isinstance(row['notes'], str):
+                results.append({'student': row['student'], 'status': 'error', 'error': 'notes must be text'})
+            else:
+                results.append({'student': row['student'], 'status': 'created'})
+                decisions.append(AcademicDecision(student_id=row['student'], decision_type=row['decision_type'],
+                                                  issued_by=request.user, notes=row['notes']))
+        if decisions:
+            with transaction.atomic():
+                AcademicDecision.objects.bulk_create(decisions, batch_size=500)
+                # bulk_create skips model signals, so cover what they would have done
+                refresh_summaries(decision.student_id for decision in decisions)
+                transaction.on_commit(invalidate_dashboard_stats)
+                for decision in decisions:
+                    log_activity(f'Issued {valid_types[decision.decision_type]} to {students[decision.student_id]}')
+        created = iter(decisions)
+        for result in results:
+            if result['status'] == 'created':
+                result['id'] = next(created).pk
+        return Response(
+            {'created': len(decisions), 'failed': len(results) - len(decisions), 'results': results},
+            status=status.HTTP_201_CREATED if decisions else status.HTTP_400_BAD_REQUEST,
+        )
+
 class DeanPlanApprovalViewSet(viewsets.ModelViewSet):
-    queryset = StudyPlan.objects.all()
+    queryset = StudyPlan.objects.select_related('teacher')
     serializer_class = StudyPlanSerializer
     permission_classes = [IsDean]
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     @action(detail=True, methods=['post'], url_path='approve')
     def approve_plan(self, request, pk=None):
         plan = self.get_object()
         plan.submission_status = 'approved'
+        plan._activity_description = f'Approved study plan "{plan.subject_name}"'
         plan.save()
         return Response({'status': 'approved'})
 
@@ -158,33 +364,109 @@ class DeanPlanApprovalViewSet(viewsets.ModelViewSet):
         notes = request.data.get('notes', '')
         plan.submission_status = 'needs_revision'
         plan.plan_content = notes
+        plan._activity_description = f'Returned study plan "{plan.subject_name}" for revision'
         plan.save()
         return Response({'status': 'needs_revision', 'notes': notes})
 
-class DeanDashboardStatsView(APIView):
+class DeanDashboardStatsView(AsyncAPIView):
     permission_classes = [IsDean]
-    def get(self, request):
-        pending_decisions = AcademicDecision.objects.filter(decision_type__in=['first-warning', 'second-warning'], student__isnull=False).count()
-        plans_to_review = StudyPlan.objects.filter(submission_status='submitted').count()
-        meetings_to_sign = Meeting.objects.filter(status='completed', signedByDean=False).count()
-        approved_plans = StudyPlan.objects.filter(submission_status='approved').count()
+
+    async def get(self, request):
+        # Served from the signal-maintained counter cache (see stats.py)
+        return Response(await aget_dashboard_stats())
+
+def activity_entries(activities):
+    return [
+        {
+            'description': a.description,
+            'timestamp': a.timestamp,
+            'user': a.user.username if a.user else None
+        }
+        for a in activities
+    ]
+
+class DeanRecentActivityView(AsyncAPIView):
+    permission_classes = [IsDean]
+    keyset_ordering = ('-timestamp', '-id')
+
+    async def get(self, request):
+        paginator = KeysetPagination()
+        activities = await sync_to_async(paginator.paginate_queryset)(
+            RecentActivity.objects.select_related('user'), request, view=self)
+        return paginator.get_paginated_response(activity_entries(activities))
+
+class DeanDashboardView(AsyncAPIView):
+    """Everything the dean dashboard loads, in one round trip; the lists are queried concurrently."""
+    permission_classes = [IsDean]
+    # Rows per list; the full lists are paginated by their own endpoints
+    bundle_size = 10
+
+    def recent_activity(self):
+        activities = RecentActivity.objects.select_related('user').order_by('-timestamp', '-id')
+        return activity_entries(activities[:self.bundle_size])
+
+    def plans_to_review(self):
+        values = StudyPlanViewSet.values_serializer
+        plans = StudyPlan.objects.filter(submission_status='submitted').order_by('-created_at', '-id')
+        return values.represent(values.values(plans)[:self.bundle_size])
+
+    def meetings_to_sign(self):
+        values = MeetingViewSet.values_serializer
+        meetings = Meeting.objects.filter(status='completed', signedByDean=False).order_by('-date', '-id')
+        return values.represent(values.values(meetings)[:self.bundle_size])
+
+    async def get(self, request):
+        stats, (activity, plans, meetings) = await asyncio.gather(
+            aget_dashboard_stats(),
+            gather_queries(self.recent_activity, self.plans_to_review, self.meetings_to_sign),
+        )
         return Response({
-            'pending_decisions': pending_decisions,
-            'plans_to_review': plans_to_review,
-            'meetings_to_sign': meetings_to_sign,
-            'approved_plans': approved_plans,
+            'stats': stats,
+            'recent_activity': activity,
+            'plans_to_review': plans,
+            'meetings_to_sign': meetings,
         })
 
-class DeanRecentActivityView(APIView):
-    permission_classes = [IsDean]
+class SearchView(APIView):
+    """
+    Ranked full-text search over meeting minutes, agendas and descriptions
+    and study plan content: GET /api/search/?q=<query>[&type=meeting|study_plan]
+    """
+    permission_classes = [IsDean | IsAdmin]
+
     def get(self, request):
-        activities = RecentActivity.objects.all()[:10]
-        data = [
-            {
-                'description': a.description,
-                'timestamp': a.timestamp,
-                'user': a.user.username if a.user else None
-            }
-            for a in activities
-        ]
-        return Response(data)
\ No newline at end of file
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        kinds = tuple(search.SOURCES)
+        if request.query_params.get('type'):
+            if request.query_params['type'] not in search.SOURCES:
+                return Response({'error': f'type must be one of: {", ".join(search.SOURCES)}'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            kinds = (request.query_params['type'],)
+        query = search.search_query(text)
+        paginator = SearchPagination()
+        rows = paginator.paginate(
+            lambda offset, limit: search.ranked_page(query, kinds, offset, limit), request)
+        return paginator.get_paginated_response(search.hits(rows, query))
+
+class CacheStatsView(APIView):
+    """
+    Hit ratios and sizes of this process's response and tenant caches, for
+    sizing them. Both cover every tenant the process serves.
+    """
+    permission_classes = [IsCentralAdmin | HasMetricsToken]
+
+    def get(self, request):
+        return Response({'response_cache': response_cache_stats.as_dict(), 'tenant_cache': tenant_cache.stats()})
+
+class MetricsView(APIView):
+    """
+    Request, SQL and cache metrics of this process in the Prometheus text format.
+    The series of every tenant served by the process are in it, so only central
+    admins and scrapers may read it.
+    """
+    permission_classes = [IsCentralAdmin | HasMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(metrics_registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,69 @@
+"""University-wide numbers across every tenant.
+
+rollup() aggregates each tenant schema on a worker pool and stores one
+TenantStats row per tenant in the public schema with a single upsert, so
+the analytics API never has to visit the tenant schemas.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from django_tenants.utils import get_public_schema_name, schema_context
+
+from profiles.models import StudyPlan, AcademicDecision, Meeting
+from profiles.stats import WARNING_TYPES
+
+from .models import Client, TenantStats
+from .pool import map_schemas
+
+WORKERS = getattr(settings, 'TENANT_ROLLUP_WORKERS', 4)
+
+# model -> {TenantStats field: filter}; one conditional aggregate per table
+AGGREGATES = {
+    StudyPlan: {
+        'plans_total': Q(),
+        'plans_submitted': ~Q(submission_status='not_submitted'),
+        'plans_to_review': Q(submission_status='submitted'),
+        'plans_approved': Q(submission_status='approved'),
+    },
+    AcademicDecision: {
+        'warnings_issued': Q(decision_type__in=WARNING_TYPES),
+    },
+    Meeting: {
+        'meetings_to_sign': Q(status='completed', signedByDean=False),
+    },
+}
+FIELDS = [name for filters in AGGREGATES.values() for name in filters]
+
+
+def tenant_counts(schema_name):
+    with schema_context(schema_name):
+        counts = {}
+        for model, filters in AGGREGATES.items():
+            counts.update(model.objects.aggregate(**{name: Count('pk', filter=q) for name, q in filters.items()}))
+        return counts
+
+
+def rollup(workers=WORKERS):
+    """Refreshes TenantStats for every tenant; returns {schema name: error} for those that failed."""
+    tenants = dict(
+        Client.objects.exclude(schema_name=get_public_schema_name()).values_list('schema_name', 'id')
+    )
+    rows, errors = [], {}
+    for schema_name, counts, error in map_schemas(tenant_counts, sorted(tenants), workers):
+        if error:
+            # Keep the tenant's previous numbers rather than zeroing them
+            errors[schema_name] = error
+        else:
+            rows.append(TenantStats(tenant_id=tenants[schema_name], computed_at=timezone.now(), **counts))
+    TenantStats.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['tenant'], update_fields=FIELDS + ['computed_at'],
+    )
+    return errors
+
+
+def totals(stats):
+    summed = {name: sum(getattr(row, name) for row in stats) for name in FIELDS}
+    summed['plan_submission_rate'] = (
+        summed['plans_submitted'] / summed['plans_total'] if summed['plans_total'] else 0.0
+    )
+    return summed
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save, post_delete
 
 
 class PublicTenantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'public_tenant'
+
+    def ready(self):
+        from .middleware import clear_tenant_cache
+        from .models import Client, Domain
+
+        for model in (Client, Domain):
+            post_save.connect(clear_tenant_cache, sender=model, dispatch_uid=f'tenant-cache-save-{model.__name__}')
+            post_delete.connect(clear_tenant_cache, sender=model, dispatch_uid=f'tenant-cache-delete-{model.__name__}')
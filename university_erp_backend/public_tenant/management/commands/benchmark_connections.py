@@ -0,0 +1,99 @@
+import copy
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from profiles.benchmarks import percentile
+from public_tenant.models import Client
+
+MODES = {
+    # mode -> (engine, pooled)
+    'per-request': ('django_tenants.postgresql_backend', False),
+    'pooled': ('public_tenant.postgresql_backend', True),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays --requests short requests, each against a random tenant schema, once opening a "
+        "connection per request (plain django-tenants) and once through the tenant-aware pool. "
+        "Reports p50/p95 request latency, SET search_path statements per request and connections "
+        "opened. Each request switches tenant, runs one query and closes its connection the way "
+        "Django does at the end of a request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per mode.')
+        parser.add_argument('--threads', type=int, default=1, help='Concurrent request threads.')
+        parser.add_argument('--schemas', nargs='*', help='Tenant schemas to spread requests over (default: all).')
+        parser.add_argument('--pool-size', type=int, default=None,
+                            help="Pool max_size (default: the POOL setting's, or 20).")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        schemas = options['schemas'] or list(
+            Client.objects.exclude(schema_name='public').values_list('schema_name', flat=True))
+        if not schemas:
+            raise CommandError('No tenant schemas; create some with seed_tenants or pass --schemas')
+        settings_dict = connections['default'].settings_dict
+        pool = dict(settings_dict.get('POOL') or {})
+        if options['pool_size']:
+            pool['max_size'] = options['pool_size']
+
+        self.stdout.write(f'{"mode":<12} {"p50 ms":>8} {"p95 ms":>8} {"SET/request":>12} {"connections":>12}')
+        results = {}
+        for mode, (engine, pooled) in MODES.items():
+            results[mode] = self.run_mode(settings_dict, engine, pool if pooled else None, schemas, options)
+            latencies, sets, opened = results[mode]
+            self.stdout.write(f'{mode:<12} {percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f} '
+                              f'{sets / len(latencies):>12.2f} {opened:>12}')
+        before, after = (percentile(results[mode][0], 50) for mode in MODES)
+        self.stdout.write(self.style.SUCCESS(f'Pooled p50 is {before / after:.1f}x faster'))
+
+    def run_mode(self, settings_dict, engine, pool, schemas, options):
+        alias = f'benchmark-{engine}'
+        backend = load_backend(engine)
+        database = copy.deepcopy(settings_dict)
+        database['ENGINE'] = engine
+        database.pop('POOL', None)
+        if pool is not None:
+            database['POOL'] = pool
+        per_thread = max(1, options['requests'] // options['threads'])
+        lock = threading.Lock()
+        sets = 0
+
+        def count_sets(execute, sql, params, many, context):
+            nonlocal sets
+            if sql.startswith('SET search_path'):
+                with lock:
+                    sets += 1
+            return execute(sql, params, many, context)
+
+        def replay(n):
+            # Wrappers are per thread, like Django's; pooled ones share the alias's pool
+            wrapper = backend.DatabaseWrapper(copy.deepcopy(database), alias)
+            rng = random.Random(options['seed'] + n)
+            samples = []
+            with wrapper.execute_wrapper(count_sets):
+                for _ in range(per_thread):
+                    wrapper.set_schema(rng.choice(schemas))
+                    started = time.perf_counter()
+                    with wrapper.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                    wrapper.close()
+                    samples.append((time.perf_counter() - started) * 1000)
+            return samples
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            runs = [executor.submit(replay, n) for n in range(options['threads'])]
+            latencies = [sample for run in runs for sample in run.result()]
+        if pool is None:
+            return latencies, sets, len(latencies)
+        connection_pool = backend.DatabaseWrapper.tenant_pools.pop(alias)
+        connection_pool.close()
+        return latencies, sets, connection_pool.stats()['opened']
@@ -0,0 +1,81 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from public_tenant.provisioning import (
+    TEMPLATE_SCHEMA, WORKERS, migrate_schemas, pending_migrations, template_available, tenant_schemas,
+)
+
+
+def read_failures(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_failures(path, failures):
+    # Write then rename, so an interrupted run never leaves a half-written log
+    if not failures:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path + '.tmp', 'w') as f:
+        json.dump(failures, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies pending migrations to tenant schemas (and the template schema) several at a time. "
+        "Run 'migrate_schemas --shared' first. Schemas that fail are recorded in --failure-log; "
+        "--resume retries only those."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=WORKERS, help='Schemas migrated at the same time.')
+        parser.add_argument('--schema', action='append', dest='schemas', help='Only this schema (repeatable).')
+        parser.add_argument('--failure-log', default='tenant_migration_failures.json',
+                            help='JSON file recording schemas whose migration failed.')
+        parser.add_argument('--resume', action='store_true', help='Only retry the schemas in the failure log.')
+        parser.add_argument('--plan', action='store_true', help='List pending migrations without applying them.')
+
+    def handle(self, *args, **options):
+        log_path = options['failure_log']
+        failures = read_failures(log_path)
+        if options['resume']:
+            schemas = sorted(failures)
+        elif options['schemas']:
+            schemas = options['schemas']
+        else:
+            schemas = tenant_schemas() + ([TEMPLATE_SCHEMA] if template_available() else [])
+
+        pending = pending_migrations(schemas)
+        self.stdout.write(f'{len(schemas)} schemas checked, {len(pending)} with pending migrations')
+        if options['plan']:
+            for schema_name, migrations in sorted(pending.items()):
+                self.stdout.write(f'{schema_name}: ' + ', '.join(f'{app}.{name}' for app, name in migrations))
+            return
+
+        # Schemas that are already current need no retry either
+        for schema_name in set(failures) & set(schemas) - set(pending):
+            del failures[schema_name]
+        write_failures(log_path, failures)
+
+        failed = 0
+        for done, result in enumerate(migrate_schemas(sorted(pending), options['workers']), 1):
+            progress = f'[{done}/{len(pending)}] {result.schema_name}:'
+            if result.error:
+                failed += 1
+                failures[result.schema_name] = {'error': result.error, 'failed_at': timezone.now().isoformat()}
+                self.stderr.write(f'{progress} FAILED {result.error}')
+            else:
+                failures.pop(result.schema_name, None)
+                self.stdout.write(f'{progress} {len(result.applied)} migrations applied in {result.seconds:.1f}s')
+            write_failures(log_path, failures)
+
+        if failed:
+            raise CommandError(f'{failed} schemas failed; see {log_path} and rerun with --resume')
+        self.stdout.write(self.style.SUCCESS(f'{len(pending)} schemas migrated'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from public_tenant.analytics import WORKERS, rollup
+
+
+class Command(BaseCommand):
+    help = (
+        "Aggregates plan, warning and meeting counts in every tenant schema on a worker pool "
+        "and upserts them into the public TenantStats table served by /api/analytics/tenants/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=WORKERS,
+                            help='Tenant schemas aggregated at the same time (0 runs them one by one).')
+
+    def handle(self, *args, **options):
+        errors = rollup(options['workers'])
+        for schema_name, error in sorted(errors.items()):
+            self.stderr.write(f'{schema_name}: FAILED {error}')
+        if errors:
+            raise CommandError(f'{len(errors)} tenants failed; their previous numbers were kept')
+        self.stdout.write(self.style.SUCCESS('Tenant stats updated'))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django_tenants.utils import schema_context
+
+from profiles.seeding import DEFAULT_PASSWORD, seed_tenant
+from public_tenant.models import Client, Domain
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates --tenants synthetic tenants named <prefix>0, <prefix>1, ... reachable at "
+        "<schema>.<domain-suffix> and bulk-loads each with students, teachers, study plans, meetings, "
+        "decisions, schedules and activity. Every seeded account (seed-dean, seed-admin, "
+        "seed-teacher<n>, seed-student<n>) gets --password. Run create_tenant_template first so "
+        "the schemas are cloned instead of migrated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', type=int, default=1)
+        parser.add_argument('--students', type=int, default=1000, help='Students per tenant.')
+        parser.add_argument('--teachers', type=int, default=50, help='Teachers per tenant.')
+        parser.add_argument('--plans', type=int, default=500, help='Study plans per tenant.')
+        parser.add_argument('--meetings', type=int, default=300, help='Meetings per tenant.')
+        parser.add_argument('--schedules', type=int, default=400, help='Timetable slots per tenant.')
+        parser.add_argument('--activities', type=int, default=2000, help='Activity entries per tenant.')
+        parser.add_argument('--departments', type=int, default=20)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--domain-suffix', default='localhost')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD)
+        parser.add_argument('--seed', type=int, default=42, help='Tenant n is seeded with seed + n.')
+        parser.add_argument('--reset', action='store_true',
+                            help='Drop and recreate tenants that already exist instead of skipping them.')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if not prefix.isidentifier() or prefix.lower() != prefix:
+            raise CommandError('--prefix must be a lowercase identifier; it becomes the schema name')
+        for n in range(options['tenants']):
+            schema_name = f'{prefix}{n}'
+            existing = Client.objects.filter(schema_name=schema_name).first()
+            if existing and not options['reset']:
+                self.stdout.write(f'{schema_name}: exists, skipped (use --reset to recreate)')
+                continue
+            if existing:
+                existing.delete(force_drop=True)
+
+            started = time.monotonic()
+            tenant = Client(schema_name=schema_name, name=f'Benchmark University {n}')
+            tenant.save()
+            Domain.objects.create(domain=f'{schema_name}.{options["domain_suffix"]}', tenant=tenant, is_primary=True)
+            created = time.monotonic() - started
+
+            with schema_context(schema_name), transaction.atomic():
+                counts = seed_tenant(
+                    students=options['students'], teachers=options['teachers'], plans=options['plans'],
+                    meetings=options['meetings'], schedules=options['schedules'],
+                    activities=options['activities'], departments=options['departments'],
+                    password=options['password'], seed=options['seed'] + n,
+                )
+            seeded = time.monotonic() - started - created
+            self.stdout.write(
+                f'{schema_name}: schema {created:.1f}s, data {seeded:.1f}s, '
+                + ', '.join(f'{count} {name}' for name, count in counts.items())
+            )
+        self.stdout.write(self.style.SUCCESS('Seeding done'))
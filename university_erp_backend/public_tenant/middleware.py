@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django_tenants.middleware.main import TenantMainMiddleware
+
+
+class TenantLRUCache:
+    """
+    Hostname -> tenant map, bounded in size and age.
+
+    Entries are dropped in this process when a Domain or Client is saved or
+    deleted; other processes pick the change up once the TTL expires.
+    Unknown hostnames are cached as well, so junk Host headers cost one
+    lookup per TTL rather than one per request.
+    """
+    MISSING = object()
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # hostname -> (expires_at, tenant or MISSING)
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, hostname):
+        """Returns the cached tenant, MISSING for a cached unknown host, or None."""
+        with self.lock:
+            entry = self.entries.get(hostname)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[hostname]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(hostname)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, hostname, tenant):
+        with self.lock:
+            self.entries[hostname] = (time.monotonic() + self.ttl, tenant)
+            self.entries.move_to_end(hostname)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+tenant_cache = TenantLRUCache(
+    max_size=getattr(settings, 'TENANT_CACHE_MAX_SIZE', 1024),
+    ttl=getattr(settings, 'TENANT_CACHE_TTL', 60.0),
+)
+
+
+class CachedTenantMiddleware(TenantMainMiddleware):
+    """TenantMainMiddleware that resolves known hostnames without touching the database."""
+
+    def get_tenant(self, domain_model, hostname):
+        tenant = tenant_cache.get(hostname)
+        if tenant is TenantLRUCache.MISSING:
+            raise domain_model.DoesNotExist(hostname)
+        if tenant is None:
+            try:
+                tenant = super().get_tenant(domain_model, hostname)
+            except domain_model.DoesNotExist:
+                tenant_cache.set(hostname, TenantLRUCache.MISSING)
+                raise
+            tenant_cache.set(hostname, tenant)
+        return tenant
+
+
+def clear_tenant_cache(sender, **kwargs):
+    # Domain and tenant changes are rare; dropping everything keeps this simple.
+    tenant_cache.clear()
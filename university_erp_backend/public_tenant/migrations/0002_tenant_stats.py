@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('public_tenant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plans_total', models.PositiveIntegerField(default=0)),
+                ('plans_submitted', models.PositiveIntegerField(default=0)),
+                ('plans_to_review', models.PositiveIntegerField(default=0)),
+                ('plans_approved', models.PositiveIntegerField(default=0)),
+                ('warnings_issued', models.PositiveIntegerField(default=0)),
+                ('meetings_to_sign', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='public_tenant.client')),
+            ],
+        ),
+    ]
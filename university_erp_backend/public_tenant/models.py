@@ -1,11 +1,43 @@
-from django.db import models
+from django.db import models, connection
 from django_tenants.models import TenantMixin, DomainMixin
+from django_tenants.utils import schema_exists
 
 class Client(TenantMixin):
     name = models.CharField(max_length=100)
     created_on = models.DateField(auto_now_add=True)
 
+    def create_schema(self, check_if_exists=False, sync_schema=True, verbosity=1):
+        """Clones the pre-migrated template schema when there is one, instead of running every migration."""
+        from .provisioning import clone_template, template_available
+
+        if not sync_schema or not template_available():
+            return super().create_schema(check_if_exists, sync_schema, verbosity)
+        if check_if_exists and schema_exists(self.schema_name):
+            return False
+        clone_template(self.schema_name, verbosity)
+        connection.set_schema_to_public()
+        return True
+
 
 
 class Domain(DomainMixin):
-    pass
\ No newline at end of file
+    pass
+
+
+class TenantStats(models.Model):
+    """Per-tenant dashboard numbers, refreshed by the rollup_tenant_stats command."""
+    tenant = models.OneToOneField(Client, on_delete=models.CASCADE, related_name='stats')
+    plans_total = models.PositiveIntegerField(default=0)
+    plans_submitted = models.PositiveIntegerField(default=0)
+    plans_to_review = models.PositiveIntegerField(default=0)
+    plans_approved = models.PositiveIntegerField(default=0)
+    warnings_issued = models.PositiveIntegerField(default=0)
+    meetings_to_sign = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    @property
+    def plan_submission_rate(self):
+        return self.plans_submitted / self.plans_total if self.plans_total else 0.0
+
+    def __str__(self):
+        return f"{self.tenant.name} ({self.computed_at:%Y-%m-%d %H:%M})"
@@ -0,0 +1,61 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from django.db import connection, connections, close_old_connections
+
+
+def _run_in_worker(func, schema_name):
+    try:
+        return schema_name, func(schema_name), None
+    except Exception as exc:
+        return schema_name, None, f'{type(exc).__name__}: {exc}'
+    finally:
+        # Worker threads own their connections; don't leave them open.
+        connection.close()
+
+
+def _close_before_fork():
+    # A forked child inherits every open socket; one that both processes used,
+    # or that the child closed, would break the parent's session. Children
+    # connect (and start their own pools) on first use instead.
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+        conn.close_pool()
+
+
+def map_schemas(func, schema_names, workers, processes=False):
+    """
+    Calls ``func(schema_name)`` for each schema on at most ``workers``
+    threads, each with its own database connection, and yields
+    ``(schema_name, result, error)`` as each call finishes. A failing schema
+    does not stop the others. ``workers=0`` runs everything inline on the
+    current connection.
+
+    ``processes=True`` uses forked worker processes instead, for work that is
+    not thread-safe, such as the migrate command (it rebuilds the global app
+    registry state and emits post_migrate). ``func`` and its results must be
+    picklable, and the caller's connections are closed first.
+    """
+    if not workers:
+        for schema_name in schema_names:
+            try:
+                yield schema_name, func(schema_name), None
+            except Exception as exc:
+                yield schema_name, None, f'{type(exc).__name__}: {exc}'
+        return
+    if processes:
+        _close_before_fork()
+        # fork, not spawn: the children start with Django set up and the same settings
+        # (the test database included)
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+    else:
+        close_old_connections()
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tenant-worker')
+    with pool:
+        futures = {pool.submit(_run_in_worker, func, name): name for name in schema_names}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as exc:
+                # The worker process died (BrokenProcessPool) or the result could not be pickled
+                yield futures[future], None, f'{type(exc).__name__}: {exc}'
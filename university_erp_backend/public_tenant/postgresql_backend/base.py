@@ -0,0 +1,336 @@
+"""django-tenants' PostgreSQL backend with a tenant-aware connection pool.
+
+Without a pool every request opens a new connection and django-tenants
+sends SET search_path before its first query. When DATABASES[alias]['POOL']
+is set, connections come from a process-wide ConnectionPool instead. A
+connection is taken when a request first needs one and handed back when
+Django closes it at the end of the request. Each pooled connection
+remembers the search_path last set on it, so SET is only sent when the
+tenant actually changes. Checkouts prefer an idle connection that is
+already on the request's tenant.
+
+POOL options:
+
+* max_size: open connections per process.
+* timeout: seconds to wait for a free one before raising OperationalError.
+* max_idle: seconds an unused connection is kept open.
+
+CONN_MAX_AGE must stay 0: the pool, not Django, keeps connections open.
+Pooling needs psycopg2; with psycopg 3 use Django's OPTIONS['pool'].
+"""
+import threading
+import time
+from collections import deque
+
+import django.db.utils
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+from django_tenants.postgresql_backend import base as tenant_backend
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """A psycopg2 connection that knows its pool and the search_path last set on it."""
+    _pool = None
+    search_path = None
+    idle_since = 0.0
+
+
+class ConnectionPool:
+    def __init__(self, key, conn_params, configure, max_size=20, timeout=10.0, max_idle=300.0, check=False):
+        self.key = key  # the settings the connections were opened with
+        self.conn_params = conn_params
+        self.configure = configure
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check = check
+        self.condition = threading.Condition()
+        self.idle = deque()  # most recently returned last
+        self.size = 0  # open connections, idle or checked out
+        self.closed = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.condition:
+            self.checkouts = self.waits = self.timeouts = self.opened = self.discarded = 0
+            self.tenant_hits = 0
+            self.wait_seconds = self.max_wait_seconds = 0.0
+            self.peak_in_use = 0
+
+    def open(self):
+        # Connections are opened on demand; Django calls this before every getconn()
+        pass
+
+    def getconn(self, search_path=None):
+        """An open connection, preferably one already on search_path."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        stale = []
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise psycopg2.OperationalError('connection pool is closed')
+                stale += self._expire_idle()
+                conn = self._take_idle(search_path)
+                if conn is not None or self.size < self.max_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise psycopg2.OperationalError(
+                        f'no database connection free within {self.timeout}s (pool max_size={self.max_size})')
+                waited = True
+                self.condition.wait(remaining)
+            if conn is None:
+                self.size += 1  # claim the slot before connecting outside the lock
+            elapsed = time.monotonic() - started
+            self.checkouts += 1
+            self.waits += waited
+            self.wait_seconds += elapsed
+            self.max_wait_seconds = max(self.max_wait_seconds, elapsed)
+            self.peak_in_use = max(self.peak_in_use, self.size - len(self.idle))
+        for old in stale:
+            old.close()
+
+        if conn is not None and self.check and not self._healthy(conn):
+            conn.close()
+            with self.condition:
+                self.discarded += 1
+            conn = None  # reopen in the same slot
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                self._release_slot()
+                raise
+        return conn
+
+    def putconn(self, conn):
+        reusable = not self.closed and not conn.closed
+        if reusable and conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                reusable = False
+            # The rollback may have undone a SET search_path
+            conn.search_path = None
+        if not reusable:
+            conn.close()
+            with self.condition:
+                self.discarded += not self.closed
+            self._release_slot()
+            return
+        conn.idle_since = time.monotonic()
+        with self.condition:
+            self.idle.append(conn)
+            self.condition.notify()
+
+    def close(self):
+        """Closes the idle connections; checked out ones are closed when they come back."""
+        with self.condition:
+            self.closed = True
+            idle, self.idle = list(self.idle), deque()
+            self.size -= len(idle)
+            self.condition.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self.condition:
+            return {
+                'max_size': self.max_size,
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.size - len(self.idle),
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'tenant_hits': self.tenant_hits,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_seconds': self.wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds,
+                'opened': self.opened,
+                'discarded': self.discarded,
+            }
+
+    def _take_idle(self, search_path):
+        if not self.idle:
+            return None
+        if search_path is not None:
+            for i in range(len(self.idle) - 1, -1, -1):
+                if self.idle[i].search_path == search_path:
+                    conn = self.idle[i]
+                    del self.idle[i]
+                    self.tenant_hits += 1
+                    return conn
+        return self.idle.pop()
+
+    def _expire_idle(self):
+        """Drops connections idle for longer than max_idle; the caller closes them."""
+        stale = []
+        cutoff = time.monotonic() - self.max_idle
+        while self.idle and self.idle[0].idle_since < cutoff:
+            stale.append(self.idle.popleft())
+        self.size -= len(stale)
+        return stale
+
+    def _release_slot(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def _open(self):
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self.conn_params)
+        conn.autocommit = True
+        conn._pool = self
+        try:
+            self.configure(conn)
+        except Exception:
+            conn.close()
+            raise
+        with self.condition:
+            self.opened += 1
+        return conn
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+
+class SearchPathStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.sets = self.skips = 0
+
+    def count(self, sent):
+        with self.lock:
+            if sent:
+                self.sets += 1
+            else:
+                self.skips += 1
+
+    def as_dict(self):
+        with self.lock:
+            return {'sets': self.sets, 'skips': self.skips}
+
+
+search_path_stats = SearchPathStats()
+
+
+def pool_stats():
+    """alias -> stats of this process's pools."""
+    return {alias: pool.stats() for alias, pool in list(DatabaseWrapper.tenant_pools.items())}
+
+
+class DatabaseWrapper(tenant_backend.DatabaseWrapper):
+    tenant_pools = {}  # alias -> ConnectionPool, shared by every thread's wrapper
+    tenant_pools_lock = threading.Lock()
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL')
+        if not options or self.alias == NO_DB_ALIAS:
+            return super().pool
+        settings_dict = self.settings_dict
+        key = (settings_dict['NAME'], settings_dict['HOST'], settings_dict['PORT'], settings_dict['USER'])
+        pool = self.tenant_pools.get(self.alias)
+        if pool is not None and pool.key == key:
+            return pool
+        with self.tenant_pools_lock:
+            pool = self.tenant_pools.get(self.alias)
+            if pool is None or pool.key != key:
+                if settings_dict.get('CONN_MAX_AGE', 0) != 0:
+                    raise ImproperlyConfigured("Pooling doesn't support persistent connections.")
+                if is_psycopg3:
+                    raise ImproperlyConfigured("POOL needs psycopg2; with psycopg 3 use OPTIONS['pool'].")
+                if pool is not None:
+                    # The test runner switched to the test database
+                    pool.close()
+                pool = ConnectionPool(key, self.get_connection_params(), self._configure_pooled_connection,
+                                      check=settings_dict['CONN_HEALTH_CHECKS'], **options)
+                self.tenant_pools[self.alias] = pool
+        return pool
+
+    def close_pool(self):
+        if not self.settings_dict.get('POOL'):
+            return super().close_pool()
+        with self.tenant_pools_lock:
+            pool = self.tenant_pools.pop(self.alias, None)
+        if pool is not None:
+            pool.close()
+
+    @property
+    def tenant_pool(self):
+        pool = self.pool
+        return pool if isinstance(pool, ConnectionPool) else None
+
+    def get_new_connection(self, conn_params):
+        pool = self.tenant_pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED))
+        return pool.getconn(self._get_cursor_search_paths())
+
+    def _configure_pooled_connection(self, conn):
+        # What get_new_connection() and init_connection_state() do for unpooled connections
+        if 'isolation_level' in self.settings_dict['OPTIONS']:
+            conn.isolation_level = IsolationLevel(self.settings_dict['OPTIONS']['isolation_level'])
+        psycopg2.extras.register_default_jsonb(conn_or_curs=conn, loads=lambda x: x)
+        self._configure_connection(conn)
+
+    def _cursor(self, name=None):
+        self.ensure_connection()
+        if not isinstance(self.connection, PooledConnection):
+            return super()._cursor(name)
+        # Django's cursor without django-tenants' unconditional SET
+        cursor = super(tenant_backend.DatabaseWrapper, self)._cursor(name)
+        search_path = self._get_cursor_search_paths()
+        if self.connection.search_path == search_path:
+            search_path_stats.count(sent=False)
+        else:
+            # A named (server-side) cursor can only run the query it was made for
+            cursor_for_search_path = self.connection.cursor() if name else cursor
+            try:
+                cursor_for_search_path.execute(
+                    'SET search_path = {0}'.format(','.join(f"'{schema}'" for schema in search_path)))
+            except (django.db.utils.DatabaseError, psycopg2.InternalError):
+                self.connection.search_path = None
+            else:
+                self.connection.search_path = search_path
+                search_path_stats.count(sent=True)
+            finally:
+                if name:
+                    cursor_for_search_path.close()
+        self.search_path_set_schemas = self.connection.search_path
+        return cursor
+
+    def _forget_search_path(self):
+        # A rollback undoes a SET search_path sent inside the transaction
+        if isinstance(self.connection, PooledConnection):
+            self.connection.search_path = None
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._forget_search_path()
+
+    def _savepoint_rollback(self, sid):
+        try:
+            return super()._savepoint_rollback(sid)
+        finally:
+            self._forget_search_path()
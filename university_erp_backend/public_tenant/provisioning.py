@@ -0,0 +1,131 @@
+"""Tenant schema provisioning and migration.
+
+New tenants are created by cloning a template schema that already has every
+migration applied (see the create_tenant_template command) instead of
+replaying the migrations one by one. Existing tenant schemas are brought up
+to date by migrate_tenants, which migrates several schemas at once, each in
+its own worker process: the migrate command is not thread-safe.
+"""
+import io
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.recorder import MigrationRecorder
+from django_tenants.clone import CloneSchema
+from django_tenants.utils import get_public_schema_name, get_tenant_base_migrate_command_class, schema_exists
+
+from .pool import map_schemas
+
+TEMPLATE_SCHEMA = getattr(settings, 'TENANT_TEMPLATE_SCHEMA', 'tenant_template')
+WORKERS = getattr(settings, 'TENANT_MIGRATION_WORKERS', 4)
+
+
+@dataclass
+class MigrationResult:
+    schema_name: str
+    applied: list = field(default_factory=list)
+    seconds: float = 0.0
+    error: str = ''
+
+
+def expected_migrations():
+    """Every migration the project defines; migrate records all of them in each schema."""
+    return set(MigrationLoader(None, ignore_no_migrations=True).graph.nodes)
+
+
+def applied_migrations(schema_names):
+    """schema name -> set of (app, name) already applied, read with one query."""
+    applied = {name: set() for name in schema_names}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT table_schema FROM information_schema.tables "
+            "WHERE table_name = 'django_migrations' AND table_schema = ANY(%s)",
+            [list(schema_names)],
+        )
+        existing = [row[0] for row in cursor.fetchall()]
+        if existing:
+            cursor.execute(' UNION ALL '.join(
+                f'SELECT %s, app, name FROM "{name}".django_migrations' for name in existing
+            ), existing)
+            for schema_name, app, name in cursor.fetchall():
+                applied[schema_name].add((app, name))
+    return applied
+
+
+def pending_migrations(schema_names):
+    """schema name -> sorted list of migrations not applied there yet (schemas with none are left out)."""
+    expected = expected_migrations()
+    pending = {}
+    for schema_name, applied in applied_migrations(schema_names).items():
+        missing = expected - applied
+        if missing:
+            pending[schema_name] = sorted(missing)
+    return pending
+
+
+def tenant_schemas():
+    from .models import Client
+
+    return list(
+        Client.objects.exclude(schema_name=get_public_schema_name())
+        .order_by('schema_name')
+        .values_list('schema_name', flat=True)
+    )
+
+
+def migrate_schema(schema_name, verbosity=0):
+    """Applies pending migrations to one schema on the current connection."""
+    started = time.monotonic()
+    before = applied_migrations([schema_name])[schema_name]
+    output = io.StringIO()
+    # Create django_migrations in the schema itself, not in public (see django_tenants.migration_executors.base)
+    connection.set_schema(schema_name, include_public=False)
+    MigrationRecorder(connection).ensure_schema()
+    connection.set_schema(schema_name)
+    try:
+        call_command(
+            get_tenant_base_migrate_command_class()(),
+            interactive=False, verbosity=verbosity, skip_checks=True, stdout=output, stderr=output,
+        )
+    finally:
+        connection.set_schema_to_public()
+    after = applied_migrations([schema_name])[schema_name]
+    return MigrationResult(schema_name, sorted(after - before), time.monotonic() - started)
+
+
+def migrate_schemas(schema_names, workers=WORKERS):
+    """
+    Migrates the given schemas in at most ``workers`` processes at a time,
+    yielding a MigrationResult as each one finishes. A failing schema does not
+    stop the others; its result carries the error instead.
+    """
+    for schema_name, result, error in map_schemas(migrate_schema, schema_names, workers, processes=True):
+        yield result or MigrationResult(schema_name, error=error)
+
+
+def ensure_template(verbosity=0):
+    """Creates the template schema if needed and applies any pending migrations to it."""
+    if not schema_exists(TEMPLATE_SCHEMA):
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA "{TEMPLATE_SCHEMA}"')
+    return migrate_schema(TEMPLATE_SCHEMA, verbosity)
+
+
+def template_available():
+    return bool(TEMPLATE_SCHEMA) and schema_exists(TEMPLATE_SCHEMA)
+
+
+def clone_template(schema_name, verbosity=0):
+    """
+    Creates ``schema_name`` as a copy of the template schema, tables, indexes,
+    sequences and rows (content types, permissions, django_migrations)
+    included. Anything the template has not caught up with yet is then
+    migrated normally.
+    """
+    CloneSchema().clone_schema(TEMPLATE_SCHEMA, schema_name, 'DATA')
+    if pending_migrations([schema_name]):
+        migrate_schema(schema_name, verbosity)
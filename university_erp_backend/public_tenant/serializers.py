@@ -0,0 +1,16 @@
+from rest_framework import serializers
+
+from .models import TenantStats
+
+
+class TenantStatsSerializer(serializers.ModelSerializer):
+    schema_name = serializers.CharField(source='tenant.schema_name', read_only=True)
+    name = serializers.CharField(source='tenant.name', read_only=True)
+    plan_submission_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = TenantStats
+        fields = [
+            'tenant', 'schema_name', 'name', 'plans_total', 'plans_submitted', 'plans_to_review',
+            'plans_approved', 'plan_submission_rate', 'warnings_issued', 'meetings_to_sign', 'computed_at',
+        ]
@@ -1,3 +1,347 @@
-from django.test import TestCase
+import copy
+import datetime
+import io
+import json
+import os
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client as HttpClient, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django_tenants.test.cases import FastTenantTestCase
+from django_tenants.utils import schema_context
+
+from profiles import activity, metrics, occupancy
+from profiles.models import User, StudyPlan, AcademicDecision, Meeting, Schedule
+from profiles.seeding import seed_tenant
+from . import provisioning
+from .middleware import TenantLRUCache, tenant_cache
+from .models import Client, Domain, TenantStats
+from .pool import map_schemas
+from .postgresql_backend.base import DatabaseWrapper, search_path_stats
+
+
+def worker_pid(schema_name):
+    return os.getpid()
+
+
+class TenantLRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        lru = TenantLRUCache(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+        self.assertEqual(lru.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        lru = TenantLRUCache(ttl=60)
+        with mock.patch('public_tenant.middleware.time.monotonic', return_value=1000):
+            lru.set('a', 1)
+        with mock.patch('public_tenant.middleware.time.monotonic', return_value=1059):
+            self.assertEqual(lru.get('a'), 1)
+        with mock.patch('public_tenant.middleware.time.monotonic', return_value=1061):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.stats()['size'], 0)
+
+
+class CachedTenantMiddlewareTests(FastTenantTestCase):
+    def setUp(self):
+        super().setUp()
+        tenant_cache.clear()
+        self.http = HttpClient(HTTP_HOST=self.get_test_tenant_domain())
+
+    def domain_queries(self, client, url='/api/'):
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(url)
+        return [q['sql'] for q in ctx.captured_queries if 'public_tenant_domain' in q['sql']]
+
+    def test_steady_state_resolves_without_queries(self):
+        self.assertEqual(len(self.domain_queries(self.http)), 1)
+        before = tenant_cache.stats()
+        for _ in range(3):
+            self.assertEqual(self.domain_queries(self.http), [])
+        after = tenant_cache.stats()
+        self.assertEqual(after['hits'] - before['hits'], 3)
+        self.assertEqual(after['misses'], before['misses'])
+
+    def test_unknown_hosts_are_cached_too(self):
+        stranger = HttpClient(HTTP_HOST='unknown.example.com')
+        with self.settings(ALLOWED_HOSTS=['*']):
+            self.assertEqual(stranger.get('/api/').status_code, 404)
+            self.assertEqual(self.domain_queries(stranger), [])
+
+    def test_domain_changes_clear_the_cache(self):
+        self.domain_queries(self.http)
+        Domain.objects.get(domain=self.get_test_tenant_domain()).save()
+        self.assertEqual(len(self.domain_queries(self.http)), 1)
+        self.tenant.save()
+        self.assertEqual(len(self.domain_queries(self.http)), 1)
+
+
+class TenantProvisioningTests(TransactionTestCase):
+    databases = {'default'}
+
+    def create_schema(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SCHEMA "{name}"')
+
+    def setUp(self):
+        self.addCleanup(self.drop_schemas, 'mig_a', 'mig_b', 'cloned', 'cloned_b', provisioning.TEMPLATE_SCHEMA)
+        # Activity entries of the cloned tenant are written inline, not by a thread after the schema is gone
+        manual_flush = mock.patch.object(activity, 'MODE', 'after_response')
+        manual_flush.start()
+        self.addCleanup(manual_flush.stop)
+        self.failure_log = os.path.join(tempfile.mkdtemp(), 'failures.json')
+
+    def drop_schemas(self, *names):
+        connection.set_schema_to_public()
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute(f'DROP SCHEMA IF EXISTS "{name}" CASCADE')
+
+    def test_failed_schemas_are_logged_and_resumed(self):
+        self.create_schema('mig_a')
+        out, err = io.StringIO(), io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command('migrate_tenants', schemas=['mig_a', 'mig_b'], workers=2,
+                         failure_log=self.failure_log, stdout=out, stderr=err)
+        self.assertIn('mig_a: ', out.getvalue())
+        self.assertIn('mig_b: FAILED', err.getvalue())
+        with open(self.failure_log) as f:
+            self.assertEqual(list(json.load(f)), ['mig_b'])
+        self.assertEqual(provisioning.pending_migrations(['mig_a']), {})
+
+        self.create_schema('mig_b')
+        out = io.StringIO()
+        call_command('migrate_tenants', resume=True, failure_log=self.failure_log, stdout=out)
+        self.assertIn('[1/1] mig_b:', out.getvalue())
+        self.assertFalse(os.path.exists(self.failure_log))
+        self.assertEqual(provisioning.pending_migrations(['mig_a', 'mig_b']), {})
+
+    def test_schemas_are_migrated_in_parallel_processes(self):
+        self.create_schema('mig_a')
+        self.create_schema('mig_b')
+        results = list(provisioning.migrate_schemas(['mig_a', 'mig_b'], workers=2))
+        self.assertEqual(sorted(result.schema_name for result in results), ['mig_a', 'mig_b'])
+        for result in results:
+            self.assertEqual(result.error, '')
+            self.assertEqual(set(result.applied), provisioning.expected_migrations())
+        self.assertEqual(provisioning.pending_migrations(['mig_a', 'mig_b']), {})
+        pids = {pid for _, pid, _ in map_schemas(worker_pid, ['mig_a', 'mig_b'], 2, processes=True)}
+        self.assertNotIn(os.getpid(), pids)
+        # The parent reconnects after handing its connections over
+        self.assertEqual(provisioning.applied_migrations(['mig_a'])['mig_a'], provisioning.expected_migrations())
+
+    def test_new_tenants_are_cloned_from_the_template(self):
+        call_command('create_tenant_template', stdout=io.StringIO())
+        with mock.patch.object(provisioning, 'migrate_schema', wraps=provisioning.migrate_schema) as migrate:
+            Client.objects.create(schema_name='cloned', name='Cloned University')
+        migrate.assert_not_called()
+        self.assertEqual(provisioning.pending_migrations(['cloned']), {})
+        with schema_context('cloned'):
+            User.objects.create_user(username='first', email='first@example.com', role='dean')
+            self.assertEqual(User.objects.count(), 1)
+            # The search_vector triggers are cloned too
+            Meeting.objects.create(title='Accreditation', date='2024-01-01', time='10:00', location='Hall',
+                                   status='upcoming')
+            self.assertEqual(Meeting.objects.filter(search_vector='accreditation').count(), 1)
+        self.assertTrue(Client(schema_name='cloned_b', name='Cloned B').create_schema(check_if_exists=True))
+        self.assertFalse(Client(schema_name='cloned_b', name='Cloned B').create_schema(check_if_exists=True))
+
+    def test_seed_tenants_creates_and_fills_tenants(self):
+        self.addCleanup(self.drop_schemas, 'seeded0', 'seeded1')
+        call_command('create_tenant_template', stdout=io.StringIO())
+        sizes = dict(students=40, teachers=4, plans=20, meetings=10, schedules=15, activities=5)
+        out = io.StringIO()
+        call_command('seed_tenants', tenants=2, prefix='seeded', stdout=out, **sizes)
+        self.assertEqual(
+            sorted(Domain.objects.filter(tenant__schema_name__startswith='seeded').values_list('domain', flat=True)),
+            ['seeded0.localhost', 'seeded1.localhost'],
+        )
+        for schema_name in ('seeded0', 'seeded1'):
+            with schema_context(schema_name):
+                self.assertEqual(User.objects.filter(role='student').count(), 40)
+                self.assertEqual(StudyPlan.objects.count(), 20)
+                self.assertTrue(User.objects.get(username='seed-dean').check_password('seed-password'))
+
+        call_command('seed_tenants', tenants=1, prefix='seeded', stdout=out, **sizes)
+        self.assertIn('seeded0: exists, skipped', out.getvalue())
+        self.addCleanup(occupancy._indexes.clear)
+        with schema_context('seeded0'):
+            StudyPlan.objects.update(subject_name='Changed')
+            self.assertEqual(self.free_rooms(), self.expected_free_rooms())
+        call_command('seed_tenants', tenants=1, prefix='seeded', reset=True, stdout=io.StringIO(),
+                     **dict(sizes, schedules=60))
+        with schema_context('seeded0'):
+            self.assertEqual(StudyPlan.objects.exclude(subject_name='Changed').count(), 20)
+            self.assertEqual(Schedule.objects.count(), 60)
+            # This process's index was built before the reset; the reseeded timetable replaces it
+            self.assertEqual(self.free_rooms(), self.expected_free_rooms())
+
+    def free_rooms(self):
+        return occupancy.get_index().free_rooms('Monday', datetime.time(9), datetime.time(12))
+
+    def expected_free_rooms(self):
+        busy = Schedule.objects.filter(day='Monday', start_time__lt='12:00', end_time__gt='09:00')
+        return sorted(set(Schedule.objects.values_list('room', flat=True))
+                      - set(busy.values_list('room', flat=True)))
+
+
+class ConnectionPoolTests(TransactionTestCase):
+    databases = {'default'}
+    alias = 'pool-test'
+
+    def setUp(self):
+        self.addCleanup(self.close_pool)
+
+    def close_pool(self):
+        pool = DatabaseWrapper.tenant_pools.pop(self.alias, None)
+        if pool is not None:
+            pool.close()
+
+    def wrapper(self, **pool):
+        database = copy.deepcopy(connections['default'].settings_dict)
+        database['POOL'] = {'max_size': 4, **pool}
+        wrapper = DatabaseWrapper(database, self.alias)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def requests(self, wrapper, *schemas):
+        """Serves one request per schema the way Django does; returns the SET statements sent."""
+        sent = []
+
+        def record(execute, sql, params, many, context):
+            if sql.startswith('SET search_path'):
+                sent.append(sql)
+            return execute(sql, params, many, context)
+
+        with wrapper.execute_wrapper(record):
+            for schema in schemas:
+                wrapper.set_schema(schema)
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                wrapper.close()
+        return sent
+
+    def test_search_path_is_only_sent_when_the_tenant_changes(self):
+        wrapper = self.wrapper()
+        sent = self.requests(wrapper, 'alpha', 'alpha', 'beta', 'beta', 'alpha')
+        self.assertEqual(sent, ["SET search_path = 'alpha','public'", "SET search_path = 'beta','public'",
+                                "SET search_path = 'alpha','public'"])
+        stats = wrapper.tenant_pool.stats()
+        self.assertEqual((stats['opened'], stats['checkouts'], stats['in_use'], stats['idle']), (1, 5, 0, 1))
+
+    def test_checkouts_prefer_a_connection_on_the_tenant(self):
+        first, second = self.wrapper(), self.wrapper()
+        for wrapper, schema in ((first, 'alpha'), (second, 'beta')):
+            wrapper.set_schema(schema)
+            wrapper.ensure_connection()
+            wrapper.cursor().close()
+        first.close()
+        second.close()
+        self.assertEqual(self.requests(self.wrapper(), 'alpha', 'beta'), [])
+        self.assertEqual(first.tenant_pool.stats()['tenant_hits'], 2)
+
+    def test_rollback_forgets_the_search_path(self):
+        wrapper = self.wrapper()
+        self.requests(wrapper, 'public')
+        wrapper.set_schema('alpha')
+        wrapper.set_autocommit(False)
+        wrapper.cursor().close()
+        wrapper.rollback()
+        wrapper.set_autocommit(True)
+        before = search_path_stats.as_dict()['sets']
+        with wrapper.cursor() as cursor:
+            cursor.execute('SHOW search_path')
+            self.assertEqual(cursor.fetchone()[0], 'alpha, public')
+        self.assertEqual(search_path_stats.as_dict()['sets'], before + 1)
+
+    def test_checkouts_wait_for_a_free_connection_then_time_out(self):
+        pool = self.wrapper(max_size=1, timeout=0.5).tenant_pool
+        held = pool.getconn()
+        threading.Timer(0.05, pool.putconn, [held]).start()
+        self.assertIs(pool.getconn(), held)
+        pool.timeout = 0.05
+        with self.assertRaises(OperationalError):
+            self.wrapper().ensure_connection()
+        pool.putconn(held)
+        stats = pool.stats()
+        self.assertEqual((stats['waits'], stats['timeouts'], stats['opened'], stats['idle']), (1, 1, 1, 1))
+
+    def test_metrics_and_benchmark(self):
+        self.requests(self.wrapper(), 'public')
+        series = f'{{alias="{self.alias}"}}'
+        lines = metrics.pool_lines()
+        self.assertIn(f'erp_db_pool_checkouts_total{series} 1', lines)
+        self.assertIn(f'erp_db_pool_idle_connections{series} 1', lines)
+
+        out = io.StringIO()
+        call_command('benchmark_connections', schemas=['alpha', 'beta'], requests=20, threads=2, stdout=out)
+        rows = {line.split()[0]: line.split() for line in out.getvalue().splitlines()[1:3]}
+        self.assertEqual(rows['per-request'][-1], '20')
+        self.assertLessEqual(int(rows['pooled'][-1]), 2)
+
+
+class TenantRollupTests(FastTenantTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_tenant(students=50, teachers=3, plans=40, meetings=60)
+
+    def expected_counts(self):
+        return {
+            'plans_total': StudyPlan.objects.count(),
+            'plans_submitted': StudyPlan.objects.exclude(submission_status='not_submitted').count(),
+            'plans_approved': StudyPlan.objects.filter(submission_status='approved').count(),
+            'warnings_issued': AcademicDecision.objects.filter(
+                decision_type__in=['first-warning', 'second-warning']).count(),
+            'meetings_to_sign': Meeting.objects.filter(status='completed', signedByDean=False).count(),
+        }
+
+    def test_rollup_upserts_one_row_per_tenant(self):
+        call_command('rollup_tenant_stats', workers=0, stdout=io.StringIO())
+        StudyPlan.objects.filter(submission_status='approved')[:1].get().delete()
+        call_command('rollup_tenant_stats', workers=0, stdout=io.StringIO())
+
+        stats = TenantStats.objects.get()
+        self.assertEqual(stats.tenant, self.tenant)
+        for name, value in self.expected_counts().items():
+            self.assertEqual(getattr(stats, name), value, name)
+
+    def test_api_serves_the_rollup_from_the_public_schema(self):
+        call_command('rollup_tenant_stats', workers=0, stdout=io.StringIO())
+        self.addCleanup(tenant_cache.clear)
+        # The middleware leaves the connection on the public schema after the request
+        self.addCleanup(connection.set_tenant, self.tenant)
+        with schema_context('public'):
+            public = Client.objects.create(schema_name='public', name='Central administration')
+            Domain.objects.create(domain='admin.fast-test.com', tenant=public, is_primary=True)
+            admin = User.objects.create_user(username='central', email='central@example.com', role='admin')
+            http = HttpClient(HTTP_HOST='admin.fast-test.com')
+            http.force_login(admin)
+
+        with self.settings(ALLOWED_HOSTS=['*']), CaptureQueriesContext(connection) as ctx:
+            response = http.get('/api/analytics/tenants/')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertFalse([q for q in ctx.captured_queries if 'profiles_studyplan' in q['sql']
+                          or 'profiles_meeting' in q['sql'] or 'profiles_academicdecision' in q['sql']])
+        connection.set_tenant(self.tenant)
+        body = response.json()
+        self.assertEqual([row['schema_name'] for row in body['tenants']], [self.tenant.schema_name])
+        expected = self.expected_counts()
+        for name, value in expected.items():
+            self.assertEqual(body['totals'][name], value, name)
+        self.assertAlmostEqual(body['totals']['plan_submission_rate'],
+                               expected['plans_submitted'] / expected['plans_total'])
+
+    def test_tenant_admins_cannot_see_other_universities(self):
+        admin = User.objects.create_user(username='local-admin', email='local@example.com', role='admin')
+        http = HttpClient(HTTP_HOST=self.get_test_tenant_domain())
+        http.force_login(admin)
+        self.assertEqual(http.get('/api/analytics/tenants/').status_code, 403)
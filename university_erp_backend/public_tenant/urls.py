@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.urls import path
 
+from .views import TenantRollupView
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-]
\ No newline at end of file
+    path('tenants/', TenantRollupView.as_view(), name='analytics-tenants'),
+]
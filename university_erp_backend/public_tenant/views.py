@@ -1,3 +1,24 @@
-from django.shortcuts import render
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from profiles.permissions import IsCentralAdmin
+
+from .analytics import totals
+from .models import TenantStats
+from .serializers import TenantStatsSerializer
+
+
+class TenantRollupView(APIView):
+    """
+    GET /api/analytics/tenants/
+    University-wide numbers from the last rollup_tenant_stats run, read from the public schema only.
+    """
+    permission_classes = [IsCentralAdmin]
+
+    def get(self, request):
+        stats = list(TenantStats.objects.select_related('tenant').order_by('tenant__name'))
+        return Response({
+            'computed_at': max((row.computed_at for row in stats), default=None),
+            'totals': totals(stats),
+            'tenants': TenantStatsSerializer(stats, many=True).data,
+        })
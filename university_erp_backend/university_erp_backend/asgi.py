@@ -2,6 +2,10 @@
 ASGI config for university_erp_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with uvicorn workers so async views (the dean dashboard) run on the
+event loop instead of a thread per request:
+
+    gunicorn university_erp_backend.asgi:application -k uvicorn.workers.UvicornWorker
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -64,7 +65,9 @@ TENANT_APPS = [
 INSTALLED_APPS = list(SHARED_APPS) + [app for app in TENANT_APPS if app not in SHARED_APPS]
 
 MIDDLEWARE = [
-    'django_tenants.middleware.main.TenantMainMiddleware',
+    'profiles.metrics.MetricsMiddleware',  # first, so its timings cover the whole stack
+    'public_tenant.middleware.CachedTenantMiddleware',
+    'profiles.activity.ActivityMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -93,37 +96,118 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'university_erp_backend.wsgi.application'
+ASGI_APPLICATION = 'university_erp_backend.asgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# public_tenant.postgresql_backend is django-tenants' backend plus a
+# per-process connection pool (POOL) that only re-sends SET search_path when
+# a connection switches tenants. Remove POOL to open a connection per request.
 DATABASES = {
     'default': {
-        'ENGINE': 'django_tenants.postgresql_backend',
+        'ENGINE': 'public_tenant.postgresql_backend',
         'NAME': 'ERP_DB',
         'USER': 'postgres',
         'PASSWORD': 'admin',
         'HOST': 'localhost',
         'PORT': '5432',
+        'POOL': {
+            'max_size': 20,  # per process; keep workers * max_size below max_connections
+            'timeout': 10.0,
+            'max_idle': 300.0,
+        },
     }
 }
 DATABASE_ROUTERS = (
     'django_tenants.routers.TenantSyncRouter',
 )
+
+# Cache keys are prefixed with the tenant schema. Use a shared backend
+# (memcached/redis) in production so counters stay consistent across workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'KEY_FUNCTION': 'django_tenants.cache.make_key',
+        'REVERSE_KEY_FUNCTION': 'django_tenants.cache.reverse_key',
+    },
+    # Cached schedule/meeting responses (profiles.response_cache). LocMemCache is
+    # for a single process: with SERVER_WORKERS > 1 the response cache turns itself
+    # off unless this is a shared backend (Redis, Memcached, DatabaseCache...).
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'KEY_FUNCTION': 'django_tenants.cache.make_key',
+        'REVERSE_KEY_FUNCTION': 'django_tenants.cache.reverse_key',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 300  # seconds; writes invalidate entries before this
+DEAN_STATS_CACHE_TIMEOUT = 60 * 60  # safety net; counters are kept current by signals
+
+# RecentActivity entries are buffered and bulk-inserted: 'thread' flushes from
+# a background thread every ACTIVITY_LOG_FLUSH_INTERVAL, 'after_response' once a
+# response has been sent (and only then), 'sync' on every entry.
+ACTIVITY_LOG_MODE = 'thread'
+ACTIVITY_LOG_BATCH_SIZE = 200
+ACTIVITY_LOG_FLUSH_INTERVAL = 2.0  # seconds
+
+ROOM_OCCUPANCY_RESOLUTION = 5  # minutes per bit in the free-room search index
+
+# Hostname -> tenant lookups are cached in each process. Saving or deleting a
+# Client/Domain clears the local cache; other processes catch up after the TTL.
+TENANT_CACHE_MAX_SIZE = 1024
+TENANT_CACHE_TTL = 60  # seconds
+
+# New tenants are cloned from this fully migrated schema once it exists
+# (manage.py create_tenant_template); migrate_tenants keeps it current.
+TENANT_TEMPLATE_SCHEMA = 'tenant_template'
+TENANT_MIGRATION_WORKERS = 4  # processes; migrate is not thread-safe
+TENANT_ROLLUP_WORKERS = 4  # tenant schemas aggregated at once by rollup_tenant_stats
+
+# Per-request SQL/serialize/total timings (profiles.metrics), sent as a
+# Server-Timing header and aggregated for /api/metrics/. Requests slower than
+# METRICS_SLOW_REQUEST_MS log their slowest SQL. Scrapers authenticate with
+# "Authorization: Metrics <METRICS_TOKEN>"; admins of the public
+# schema can use their JWT (the metrics cover every tenant).
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SERVER_TIMING = True
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Threads (each with its own database connection) that async views such as
+# the dean dashboard use to run independent queries at the same time; 0 runs
+# them one after another on the request's connection.
+ASYNC_QUERY_WORKERS = 4
+
+# Server processes; gunicorn reads the same WEB_CONCURRENCY variable. More than
+# one needs a shared 'default' cache (profiles.deployment refuses to start
+# otherwise) because counters and auth state are cached there.
+SERVER_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+
 SIMPLE_JWT = {
     "TOKEN_OBTAIN_SERIALIZER": "profiles.serializers.CustomTokenObtainPairSerializer",
 }
+# Requests are authenticated from the access token's claims. A user's active,
+# staff and superuser flags, role and department are re-read at most this
+# often (seconds) and win over the claims; 0 trusts the claims until the token
+# expires.
+JWT_CLAIM_AUTH_REVOCATION_TTL = 60
 
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'profiles.authentication.ClaimJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication', # Optional, for browsable API
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated', # Default to require authentication
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'profiles.renderers.FastJSONRenderer',  # orjson when installed, same output as JSONRenderer
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }